@@ -7,9 +7,97 @@ load_dotenv()  # Load from .env
 class Settings:
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     MONGO_DB_NAME: str = os.getenv("MONGO_DB_NAME", "zk_loci")
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    MONGO_HEALTH_INTERVAL_SECONDS: float = float(os.getenv("MONGO_HEALTH_INTERVAL_SECONDS", "10"))
 
     OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    # e.g. http://127.0.0.1:8001/v1 for scripts/fake_openai_server.py
+    OPENAI_BASE_URL: str | None = os.getenv("OPENAI_BASE_URL") or None
+
+    # Shared LLM scheduler (llm/scheduler.py)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))  # 0 = no limit
+    LLM_INTENT_DEADLINE_SECONDS: float = float(os.getenv("LLM_INTENT_DEADLINE_SECONDS", "5"))
+    LLM_ANSWER_DEADLINE_SECONDS: float = float(os.getenv("LLM_ANSWER_DEADLINE_SECONDS", "20"))
+    LLM_HEDGE_AFTER_SECONDS: float = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "3"))  # 0 = off
+    LLM_MAX_ATTEMPTS: int = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+    LLM_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "30"))
+
+    # Optional JSON file with router keyword tables (see llm/router.py)
+    ROUTER_CONFIG_PATH: str | None = os.getenv("ROUTER_CONFIG_PATH") or None
+
+    # Intent extraction cache (empty INTENT_CACHE_PATH = in-memory only)
+    INTENT_CACHE_SIZE: int = int(os.getenv("INTENT_CACHE_SIZE", "1024"))
+    INTENT_CACHE_TTL_SECONDS: int = int(os.getenv("INTENT_CACHE_TTL_SECONDS", "3600"))
+    INTENT_CACHE_PATH: str | None = os.getenv("INTENT_CACHE_PATH") or None
+
+    # Rule-based intent fast path; below this confidence the LLM is used
+    INTENT_RULES_MIN_CONFIDENCE: float = float(os.getenv("INTENT_RULES_MIN_CONFIDENCE", "0.7"))
+
+    # Provider-name resolution index (services/provider_index.py): new
+    # requests are picked up this often; fuzzy matches below the score
+    # are left as written
+    PROVIDER_INDEX_REFRESH_SECONDS: int = int(os.getenv("PROVIDER_INDEX_REFRESH_SECONDS", "30"))
+    PROVIDER_MATCH_MIN_SCORE: float = float(os.getenv("PROVIDER_MATCH_MIN_SCORE", "0.6"))
+
+    # "raw" aggregates proofResults per query, "rollups" reads the
+    # incrementally maintained counters from services/rollups.py,
+    # "snapshot" answers in-process from services/snapshot.py
+    STATS_SOURCE: str = os.getenv("STATS_SOURCE", "raw")
+    ROLLUPS_WATCH: bool = os.getenv("ROLLUPS_WATCH", "false").lower() == "true"
+
+    # Columnar snapshots (python -m scripts.export_snapshot) and how often
+    # each worker pulls proofs inserted since the last export
+    SNAPSHOT_DIR: str = os.getenv("SNAPSHOT_DIR", "snapshots")
+    SNAPSHOT_DELTA_SECONDS: int = int(os.getenv("SNAPSHOT_DELTA_SECONDS", "5"))
+    # How far below its watermark each delta poll re-reads, for proofs
+    # committed after later _ids were already seen
+    SNAPSHOT_DELTA_OVERLAP_SECONDS: int = int(os.getenv("SNAPSHOT_DELTA_OVERLAP_SECONDS", "60"))
+
+    # Stats responses keep the top STATS_MAX_REQUESTS requests by
+    # STATS_REQUEST_SORT (0 = all); the rest are paged via /analytics/requests
+    STATS_MAX_REQUESTS: int = int(os.getenv("STATS_MAX_REQUESTS", "200"))
+    STATS_REQUEST_SORT: str = os.getenv("STATS_REQUEST_SORT", "proofs")
+    STATS_CURSOR_BATCH_SIZE: int = int(os.getenv("STATS_CURSOR_BATCH_SIZE", "500"))
+    REQUESTS_PAGE_MAX: int = int(os.getenv("REQUESTS_PAGE_MAX", "500"))
+
+    # Most provider x locality x window combinations in one comparison query
+    COMPARISON_MAX_CELLS: int = int(os.getenv("COMPARISON_MAX_CELLS", "24"))
+
+    # Stats sent to the answer prompt are compacted to this many tokens
+    ANSWER_STATS_TOKEN_BUDGET: int = int(os.getenv("ANSWER_STATS_TOKEN_BUDGET", "800"))
+    ANSWER_STATS_TOP_K: int = int(os.getenv("ANSWER_STATS_TOP_K", "10"))
+
+    # Default answer mode when a request does not pick one: "llm",
+    # "template" (llm/answer_templates.py, LLM only for planning
+    # questions) or "auto" (templates for simple, well-covered questions)
+    ANSWER_MODE: str = os.getenv("ANSWER_MODE", "llm")
+    # "auto" only uses a template when at least this many proofs back it
+    ANSWER_TEMPLATE_MIN_PROOFS: int = int(os.getenv("ANSWER_TEMPLATE_MIN_PROOFS", "20"))
+
+    # Serve trend queries from the proofResultsTS time-series mirror
+    TRENDS_TIMESERIES: bool = os.getenv("TRENDS_TIMESERIES", "false").lower() == "true"
+
+    # HyperLogLog unique-donor sketches (services/user_sketches.py)
+    USER_SKETCHES: bool = os.getenv("USER_SKETCHES", "false").lower() == "true"
+
+    # /analytics/query/batch
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+    # POST /proofs/bulk
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+    INGEST_MAX_CONCURRENCY: int = int(os.getenv("INGEST_MAX_CONCURRENCY", "4"))
+    INGEST_MAX_PROOFS: int = int(os.getenv("INGEST_MAX_PROOFS", "100000"))
+
+    # Answer cache, keyed on question + intent + stats fingerprint
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+    ANSWER_CACHE_TTL_SECONDS: int = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
 
     @property
     def has_openai_key(self) -> bool:
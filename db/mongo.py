@@ -1,6 +1,8 @@
 # db/mongo.py
 
 import logging
+import threading
+import time
 from typing import Optional
 
 from pymongo import MongoClient
@@ -10,34 +12,186 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
-DB_AVAILABLE = False
-client: Optional[MongoClient] = None
-db = None
-requests_coll = None
-proofs_coll = None
-users_coll = None
-
-try:
-    if settings.MONGO_URI:
-        client = MongoClient(
-            settings.MONGO_URI,
-            serverSelectionTimeoutMS=5000,  # 5s
-        )
-        # Force a ping to check connectivity
+# The client is created lazily on first use and never pings at import
+# time, so worker startup does not wait on MongoDB. Availability is
+# tracked by a background health checker (start_health_checker) that
+# flips it both ways: a MongoDB that comes back is picked up without a
+# restart, and one that goes away sends requests to the mock stats.
+
+_client: Optional[MongoClient] = None
+_client_lock = threading.Lock()
+
+# Callables run (in the health-checker thread) whenever MongoDB becomes
+# available, e.g. to create collections that must exist before writes.
+_on_connect: list = []
+
+_health = {
+    "available": False,
+    "lastCheck": None,
+    "lastError": None,
+    "latencyMs": None,
+}
+
+
+def client_options() -> dict:
+    """Connection-pool and timeout settings shared by sync and async clients."""
+    return {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+    }
+
+
+def get_client() -> Optional[MongoClient]:
+    """Create the MongoClient on first use (no network I/O happens here)."""
+    global _client
+    if _client is None and settings.MONGO_URI:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(settings.MONGO_URI, connect=False, **client_options())
+    return _client
+
+
+def get_db():
+    client = get_client()
+    return client[settings.MONGO_DB_NAME] if client is not None else None
+
+
+def get_collection(name: str):
+    database = get_db()
+    return database[name] if database is not None else None
+
+
+def on_connect(fn):
+    """Register `fn()` to run each time MongoDB goes from unavailable to available."""
+    _on_connect.append(fn)
+    return fn
+
+
+def is_available() -> bool:
+    return _health["available"]
+
+
+def health_status() -> dict:
+    return dict(_health)
+
+
+def check_health() -> bool:
+    """Ping MongoDB once and update availability. Blocking; call off the event loop."""
+    client = get_client()
+    was_available = _health["available"]
+
+    if client is None:
+        _health.update(available=False, lastCheck=time.time(),
+                       lastError="MONGO_URI is empty; MongoDB disabled.", latencyMs=None)
+        return False
+
+    start = time.perf_counter()
+    try:
         client.admin.command("ping")
-        db = client[settings.MONGO_DB_NAME]
-        requests_coll = db["requests"]
-        proofs_coll = db["proofResults"]
-        users_coll = db.get_collection("users")
-        DB_AVAILABLE = True
+        _health.update(available=True, lastCheck=time.time(), lastError=None,
+                       latencyMs=round((time.perf_counter() - start) * 1000, 2))
+    except PyMongoError as e:
+        _health.update(available=False, lastCheck=time.time(), lastError=str(e),
+                       latencyMs=None)
+
+    if _health["available"] and not was_available:
         logger.info("Connected to MongoDB successfully.")
-    else:
-        logger.warning("MONGO_URI is empty; MongoDB disabled.")
-except PyMongoError as e:
-    logger.error(f"MongoDB connection failed: {e}")
-    DB_AVAILABLE = False
-    client = None
-    db = None
-    requests_coll = None
-    proofs_coll = None
-    users_coll = None
+        ensure_indexes()
+        for fn in _on_connect:
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"on_connect hook {fn.__name__} failed: {e}")
+    elif was_available and not _health["available"]:
+        logger.error(f"MongoDB connection lost: {_health['lastError']}")
+    return _health["available"]
+
+
+def start_health_checker() -> threading.Event:
+    """Ping MongoDB every MONGO_HEALTH_INTERVAL_SECONDS in a daemon thread."""
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.is_set():
+            check_health()
+            stop_event.wait(settings.MONGO_HEALTH_INTERVAL_SECONDS)
+
+    threading.Thread(target=run, name="mongo-health", daemon=True).start()
+    return stop_event
+
+
+# ---- Indexes used by the analytics queries ----
+
+REQUIRED_INDEXES = {
+    "requests": [
+        ("providerName", 1),
+        ("useCase", 1),
+        ("createdAt", 1),
+    ],
+    "proofResults": [
+        ("requestId", 1),
+        ("result", 1),
+        ("userId", 1),
+    ],
+    "dailyRollups": [
+        ("providerName", 1),
+        ("useCase", 1),
+        ("day", 1),
+    ],
+    "userSketches": [
+        ("_id.k", 1),
+        ("_id.p", 1),
+        ("_id.c", 1),
+        ("_id.d", 1),
+    ],
+}
+
+# Indexes for the time-window scans over raw proofs (trends without the
+# time-series mirror, windowed comparisons), next to the compound ones above
+WINDOW_INDEXES = {
+    "proofResults": [("createdAt", 1)],
+}
+
+# Unique keys used for idempotent writes (bulk proof ingestion, counters)
+UNIQUE_INDEXES = {
+    "proofResults": [("proofId", 1)],
+    "requests": [("requestId", 1)],
+    "users": [("userId", 1)],
+}
+
+
+def ensure_indexes() -> bool:
+    """
+    Create (if missing) and verify the compound and time-window indexes
+    the stats pipelines rely on and the unique keys used for idempotent
+    writes.
+    Safe to call on every startup.
+
+    Returns True if all indexes are present afterwards.
+    """
+    if not is_available():
+        return False
+
+    indexes = [(name, keys, False) for name, keys in REQUIRED_INDEXES.items()]
+    indexes += [(name, keys, False) for name, keys in WINDOW_INDEXES.items()]
+    indexes += [(name, keys, True) for name, keys in UNIQUE_INDEXES.items()]
+
+    ok = True
+    for coll_name, keys, unique in indexes:
+        coll = get_collection(coll_name)
+        try:
+            coll.create_index(keys, unique=unique)
+            existing = [
+                [tuple(k) for k in info["key"]]
+                for info in coll.index_information().values()
+            ]
+            if keys not in existing:
+                logger.warning(f"Index {keys} missing on {coll_name}.")
+                ok = False
+        except PyMongoError as e:
+            logger.error(f"Could not ensure index on {coll_name}: {e}")
+            ok = False
+    return ok
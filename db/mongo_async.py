@@ -0,0 +1,38 @@
+# db/mongo_async.py
+
+import threading
+from typing import Optional
+
+from pymongo import AsyncMongoClient
+
+from config import settings
+from db.mongo import client_options
+
+# Async counterpart of db/mongo.py, used by the async request path.
+# Like the sync client it is created lazily and does no I/O up front;
+# availability is shared with db.mongo.is_available(), which the
+# background health checker keeps current.
+
+_async_client: Optional[AsyncMongoClient] = None
+_client_lock = threading.Lock()
+
+
+def get_async_client() -> Optional[AsyncMongoClient]:
+    global _async_client
+    if _async_client is None and settings.MONGO_URI:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncMongoClient(
+                    settings.MONGO_URI, connect=False, **client_options()
+                )
+    return _async_client
+
+
+def get_async_collection(name: str):
+    client = get_async_client()
+    return client[settings.MONGO_DB_NAME][name] if client is not None else None
+
+
+async def close_async_db():
+    if _async_client is not None:
+        await _async_client.close()
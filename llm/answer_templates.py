@@ -0,0 +1,203 @@
+# llm/answer_templates.py
+
+import re
+from typing import Optional
+
+from config import settings
+
+# Local answer generator for common question shapes. Follows the tone
+# rules of answer_prompt in llm/verification_answer.py: plain language,
+# 3-6 sentences, numbers framed as recent zk-loci records, no talk of
+# databases, and never a blunt "0 donors". Planning / strategy questions
+# need judgement (donor ranges, outreach sizes) and always go to the LLM.
+
+_PLANNING_RE = re.compile(
+    r"\b(?:plan(?:ning)?|strateg(?:y|ies|ic)|recommend\w*|suggest\w*|advise|"
+    r"should\s+(?:we|i)|how\s+(?:many|much)\s+\w+\s+(?:should|to|do\s+we\s+need)|"
+    r"new\s+(?:drive|campaign)|next\s+(?:drive|campaign)|forecast\w*|predict\w*|"
+    r"expect\w*|improve|increase|boost|why)\b",
+    re.IGNORECASE,
+)
+
+# Who the verified people are, by use case: (singular, plural).
+PARTICIPANTS = {
+    "blood_donation": ("donor", "donors"),
+    "workplace_attendance": ("attendee", "attendees"),
+}
+DEFAULT_PARTICIPANTS = ("participant", "participants")
+
+# Headline sentence keyed on intent shape: (cohort given, provider given).
+# A cohort is a locality and/or blood type.
+HEADLINES = {
+    (True, True): (
+        "{where}{provider} verified {successful} of {total} {cohort}{people} "
+        "over the last {window}, a {rate} success rate."
+    ),
+    (True, False): (
+        "{where}{successful} of {total} {cohort}{people} verified successfully "
+        "over the last {window}, a {rate} success rate."
+    ),
+    (False, True): (
+        "{provider} recorded {successful} successful {person} verifications out of "
+        "{total} over the last {window}, a {rate} success rate."
+    ),
+    (False, False): (
+        "Across all campaigns, {successful} of {total} {person} verifications "
+        "succeeded over the last {window}, a {rate} success rate."
+    ),
+}
+
+SOURCE_OBSERVED = "These figures come from recent records in the zk-loci backend."
+SOURCE_LIMITED = (
+    "Direct records are limited for this period, so treat this as an early "
+    "signal rather than a final count."
+)
+TARGET_MET = "That meets the target of {target} {people}."
+TARGET_SHORT = "That is {pct} of the target of {target} {people}, so {gap} more are needed."
+UNIQUE_DONORS = "We estimate that around {unique} different people took part."
+TREND_UP = "Activity is up {pct} compared with the previous {window}."
+TREND_DOWN = "Activity is down {pct} compared with the previous {window}."
+TREND_FLAT = "Activity is about level with the previous {window}."
+
+
+def is_planning_question(question: str) -> bool:
+    return bool(_PLANNING_RE.search(question or ""))
+
+
+def _participants(intent: dict, stats: dict) -> tuple:
+    use_case = intent.get("useCase") or stats.get("useCase")
+    if use_case is None and intent.get("bloodType"):
+        use_case = "blood_donation"
+    return PARTICIPANTS.get(use_case, DEFAULT_PARTICIPANTS)
+
+
+def _window(days: int) -> str:
+    return "day" if days == 1 else f"{days} days"
+
+
+def _pct(x: float) -> str:
+    return f"{round(x * 100)}%"
+
+
+def _trend_sentence(trend: dict, window: str) -> Optional[str]:
+    change = ((trend or {}).get("change") or {}).get("totalProofs")
+    if change is None:
+        return None
+    if abs(change) < 0.05:
+        return TREND_FLAT.format(window=window)
+    template = TREND_UP if change > 0 else TREND_DOWN
+    return template.format(pct=_pct(abs(change)), window=window)
+
+
+def render_template_answer(question: str, intent: dict, stats: dict,
+                           min_proofs: int = 1) -> Optional[str]:
+    """
+    Briefing rendered from `stats`, or None when no template fits
+    (planning / strategy questions, fewer than `min_proofs` proofs, or no
+    successful verification, which the LLM reframes instead of stating).
+    """
+    if is_planning_question(question):
+        return None
+    total = stats.get("totalProofs") or 0
+    if total < max(min_proofs, 1):
+        return None
+    successful = stats.get("successfulProofs") or 0
+    if not successful:
+        return None
+
+    days = intent.get("timeWindowDays") or stats.get("timeWindowDays") or 7
+    window = _window(days)
+    locality = intent.get("locality")
+    blood_type = intent.get("bloodType")
+    provider = intent.get("providerName")
+    person, people = _participants(intent, stats)
+
+    headline = HEADLINES[(bool(locality or blood_type), bool(provider))]
+    sentences = [headline.format(
+        where=f"In {locality}, " if locality else "",
+        provider=provider or "",
+        cohort=f"{blood_type} " if blood_type else "",
+        person=person,
+        people=people,
+        successful=successful,
+        total=total,
+        window=window,
+        rate=_pct(successful / total),
+    )]
+    if sentences[0][0].islower():
+        sentences[0] = sentences[0][0].upper() + sentences[0][1:]
+
+    sentences.append(
+        SOURCE_OBSERVED if total >= settings.ANSWER_TEMPLATE_MIN_PROOFS else SOURCE_LIMITED
+    )
+
+    target = intent.get("targetCount")
+    if target:
+        if successful >= target:
+            sentences.append(TARGET_MET.format(target=target, people=people))
+        else:
+            sentences.append(TARGET_SHORT.format(
+                pct=_pct(successful / target), target=target, gap=target - successful,
+                people=people))
+
+    unique = (stats.get("uniqueDonors") or {}).get("uniqueUsers")
+    if unique:
+        sentences.append(UNIQUE_DONORS.format(unique=unique))
+
+    trend = _trend_sentence(stats.get("trend"), window)
+    if trend:
+        sentences.append(trend)
+
+    return " ".join(sentences)
+
+
+def template_answer_for_mode(question: str, intent: dict, stats: dict,
+                             mode: str = None) -> Optional[str]:
+    """
+    Template answer for the requested mode, or None to use the LLM.
+
+    "template" renders whenever a template fits; "auto" additionally
+    requires enough proofs that the numbers speak for themselves.
+    """
+    mode = mode or settings.ANSWER_MODE
+    if mode == "template":
+        return render_template_answer(question, intent, stats)
+    if mode == "auto":
+        return render_template_answer(
+            question, intent, stats, min_proofs=settings.ANSWER_TEMPLATE_MIN_PROOFS
+        )
+    return None
+
+
+COMPARISON_ROW = "{who}{where} over the last {window}: {successful} of {total} verifications succeeded ({rate})."
+NO_RECORDS = (
+    "Direct records are limited for this request right now, so we cannot give "
+    "a reliable figure yet. Please check back shortly."
+)
+
+
+def stats_only_answer(intent: dict, stats: dict) -> str:
+    """
+    Plain briefing straight from the numbers, for when the LLM cannot
+    answer in time. Planning questions get the observed figures only.
+    """
+    answer = render_template_answer("", intent, stats)
+    if answer is not None:
+        return answer
+
+    table = stats.get("comparison")
+    if table and table.get("rows"):
+        sentences = []
+        for row in table["rows"][:6]:
+            r = dict(zip(table["columns"], row))
+            sentences.append(COMPARISON_ROW.format(
+                who=r.get("provider") or "All campaigns",
+                where=f" in {r['locality']}" if r.get("locality") else "",
+                window=_window(r.get("windowDays") or 7),
+                successful=r.get("successfulProofs", 0),
+                total=r.get("totalProofs", 0),
+                rate=_pct(r.get("successRate") or 0.0),
+            ))
+        return " ".join(sentences)
+
+    return NO_RECORDS
@@ -0,0 +1,210 @@
+# llm/cache.py
+
+import atexit
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Persisted writes are batched: the writer thread flushes at most this
+# long after a set, in one transaction.
+_FLUSH_SECONDS = 1.0
+
+# Every cache created, for /metrics and /analytics/cache reporting
+all_caches: list = []
+
+# Punctuation that never changes the meaning of a dashboard question.
+# "+" and "-" are kept because they are part of blood types (B+, O-).
+_PUNCT_RE = re.compile(r"[?!.,;:'\"`()\[\]{}]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop cosmetic punctuation and collapse whitespace."""
+    q = unicodedata.normalize("NFKC", question or "").lower()
+    q = _PUNCT_RE.sub(" ", q)
+    return _SPACE_RE.sub(" ", q).strip()
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache with a per-entry TTL.
+
+    Entries may carry a tag (e.g. a provider name) so related entries can
+    be dropped together with invalidate_tag().
+
+    If `persist_path` is set, entries are written behind to a SQLite file
+    and reloaded on startup so a restarted worker does not start cold.
+    set() only queues the row; a background thread commits queued rows
+    in batches, so callers on the event loop never wait on SQLite.
+    Values must be JSON-serializable when persistence is enabled.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024,
+                 ttl_seconds: float = 3600, persist_path: Optional[str] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._tags: dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: dict = {}  # key -> (value json, expires, tag), or None to delete
+        self._pending_lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._wake = threading.Event()
+
+        if persist_path:
+            self._open_store(persist_path)
+        if self._conn is not None:
+            threading.Thread(target=self._write_behind, name=f"cache-{name}", daemon=True).start()
+            atexit.register(self.flush)
+        all_caches.append(self)
+
+    # ---- persistence ----
+
+    def _open_store(self, path: str):
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " name TEXT, key TEXT, value TEXT, expires REAL, tag TEXT,"
+                " PRIMARY KEY (name, key))"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(cache)")]
+            if "tag" not in columns:
+                self._conn.execute("ALTER TABLE cache ADD COLUMN tag TEXT")
+            self._conn.execute(
+                "DELETE FROM cache WHERE name = ? AND expires < ?",
+                (self.name, time.time()),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT key, value, expires, tag FROM cache WHERE name = ?"
+                " ORDER BY expires DESC LIMIT ?",
+                (self.name, self.max_size),
+            ).fetchall()
+            for key, value, expires, tag in reversed(rows):
+                self._data[key] = (expires, json.loads(value))
+                self._tags[key] = tag
+            logger.info(f"Loaded {len(rows)} '{self.name}' cache entries from {path}.")
+        except sqlite3.Error as e:
+            logger.error(f"Cache persistence disabled for '{self.name}': {e}")
+            self._conn = None
+
+    def _store(self, key: str, expires: float, value: Any, tag: Optional[str]):
+        if self._conn is None:
+            return
+        try:
+            row = (json.dumps(value), expires, tag)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not persist '{self.name}' cache entry: {e}")
+            return
+        with self._pending_lock:
+            self._pending[key] = row
+        self._wake.set()
+
+    def _unstore(self, keys: list):
+        if self._conn is None or not keys:
+            return
+        with self._pending_lock:
+            for k in keys:
+                self._pending[k] = None
+        self._wake.set()
+
+    def flush(self):
+        """Commit queued writes now (the writer thread does this in the background)."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        upserts = [(self.name, k, *row) for k, row in pending.items() if row is not None]
+        deletes = [(self.name, k) for k, row in pending.items() if row is None]
+        with self._store_lock:
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (name, key, value, expires, tag)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    upserts,
+                )
+                self._conn.executemany("DELETE FROM cache WHERE name = ? AND key = ?", deletes)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist {len(pending)} '{self.name}' cache writes: {e}")
+
+    def _write_behind(self):
+        while True:
+            self._wake.wait()
+            time.sleep(_FLUSH_SECONDS)  # let a burst of sets share one commit
+            self._wake.clear()
+            self.flush()
+
+    # ---- cache API ----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires, value = entry
+                if expires >= time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self._tags.pop(key, None)
+                self._unstore([key])
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, tag: Optional[str] = None):
+        expires = time.time() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._tags[key] = tag
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.max_size:
+                old_key, _ = self._data.popitem(last=False)
+                self._tags.pop(old_key, None)
+                evicted.append(old_key)
+        self._unstore(evicted)
+        self._store(key, expires, value, tag)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with `tag`; returns how many were removed."""
+        with self._lock:
+            keys = [k for k, t in self._tags.items() if t == tag]
+            for k in keys:
+                self._data.pop(k, None)
+                self._tags.pop(k, None)
+            self._unstore(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._unstore(list(self._data))
+            self._data.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxSize": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,264 @@
+# llm/intent_rules.py
+
+import re
+import threading
+
+from services.provider_index import ProviderIndex, provider_index
+
+# Deterministic intent extractor for the common dashboard question shapes,
+# e.g. "B+ donors in L1 last 7 days", and comparisons such as "Institutions
+# A and B over the last 7 and 30 days". It returns the same keys as the LLM
+# extractor plus a confidence score; callers fall back to the LLM when the
+# score is below settings.INTENT_RULES_MIN_CONFIDENCE.
+
+_WORD = r"(?<![a-z0-9])"
+_END = r"(?![a-z0-9])"
+
+_BLOOD_TYPE_RE = re.compile(
+    _WORD + r"(ab|a|b|o)(\+|-)(?![a-z0-9+\-])", re.I
+)
+# Spelled-out signs need an upper-case group so "a positive trend" is ignored.
+_BLOOD_TYPE_WORDS_RE = re.compile(
+    r"(?<![A-Za-z0-9])(AB|A|B|O)\s(positive|negative)(?![A-Za-z0-9])", re.I
+)
+_LOCALITY_RE = re.compile(_WORD + r"(?:l|locality\s+)(\d+)" + _END, re.I)
+_INSTITUTION_RE = re.compile(_WORD + r"institution\s+([a-z0-9])" + _END, re.I)
+
+# Comparison lists: "Institutions A and B", "last 7 and 30 days"
+_LIST_SEP = r"\s*(?:,|&|and|or|vs\.?|versus)\s*"
+_INSTITUTION_LIST_RE = re.compile(
+    _WORD + r"institutions\s+([a-z0-9])((?:" + _LIST_SEP + r"[a-z0-9]" + _END + r")+)", re.I
+)
+_LIST_ITEM_RE = re.compile(_WORD + r"([a-z0-9])" + _END, re.I)
+
+_USE_CASE_PATTERNS = [
+    ("blood_donation", re.compile(
+        _WORD + r"(blood|donors?|donations?|drives?)" + _END, re.I)),
+    ("workplace_attendance", re.compile(
+        _WORD + r"(attendance|on-site|office|staff|employees?)" + _END, re.I)),
+]
+
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+_WINDOW_N_RE = re.compile(
+    _WORD + r"(?:last|past|previous)\s+(\d+)\s*-?\s*(day|week|month|year)s?" + _END, re.I
+)
+_WINDOW_LIST_RE = re.compile(
+    _WORD + r"(?:last|past|previous)\s+(\d+)((?:" + _LIST_SEP + r"\d+)+)\s*-?\s*"
+    r"(day|week|month|year)s?" + _END, re.I
+)
+_WINDOW_N_ALT_RE = re.compile(_WORD + r"(\d+)\s*-?\s*(day|week|month)s?" + _END, re.I)
+_WINDOW_ONE_RE = re.compile(
+    _WORD + r"(?:last|past|this|previous)\s+(day|week|month|year)" + _END, re.I
+)
+_WINDOW_HOURS_RE = re.compile(_WORD + r"(?:last|past)\s+24\s*h(?:ours|rs)?" + _END, re.I)
+_WINDOW_WORDS = {
+    "today": 1,
+    "yesterday": 2,
+}
+_WINDOW_WORD_RE = re.compile(_WORD + r"(today|yesterday)" + _END, re.I)
+
+_TARGET_RE = re.compile(
+    _WORD + r"(?:target|goal|aim)\s*(?:of|is|:|=)?\s*(\d+)" + _END
+    + r"|" + _WORD + r"(\d+)\s+(?:donors?|people|participants)\s+(?:target|goal)" + _END,
+    re.I,
+)
+
+# Words that, if left unexplained, suggest the rules missed something.
+_TIME_HINT_RE = re.compile(
+    _WORD + r"(since|between|from|ago|until|days?|weeks?|months?|years?|"
+    r"january|february|march|april|may|june|july|august|september|october|"
+    r"november|december)" + _END, re.I
+)
+_TARGET_HINT_RE = re.compile(_WORD + r"(target|goal|aim|quota)" + _END, re.I)
+_NUMBER_RE = re.compile(r"\d+")
+_CAPITALIZED_RE = re.compile(r"(?<![A-Za-z0-9])[A-Z][a-zA-Z]+")
+_IGNORED_CAPITALIZED = {"I", "How", "What", "Which", "Who", "When", "Where",
+                        "Why", "Show", "Give", "Tell", "Compare", "Please",
+                        "Did", "Do", "Does", "Is", "Are", "Was", "Were", "Can",
+                        "Could", "Should", "In", "For", "The", "Of"}
+
+
+class _Gazetteer:
+    """
+    Provider-name pattern compiled from services.provider_index, the one
+    catalog of stored names (kept current by its own refresher).
+
+    pattern() never does I/O: it returns the pattern compiled from the
+    index, recompiling only when the index has grown since.
+    """
+
+    def __init__(self, index: ProviderIndex):
+        self.index = index
+        self._size = None
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _compile(self, names: list):
+        names = sorted(names, key=len, reverse=True)
+        canonical = {n.lower(): n for n in names}
+        pattern = re.compile(
+            _WORD + "(" + "|".join(re.escape(n) for n in names) + ")" + _END, re.I
+        )
+        self._state = (pattern, canonical)  # swapped in one assignment
+
+    def pattern(self):
+        if len(self.index) != self._size:
+            with self._lock:
+                names = self.index.names()
+                if len(names) != self._size:
+                    self._compile(names)
+                    self._size = len(names)
+        return self._state
+
+
+gazetteer = _Gazetteer(provider_index)
+
+
+def _overlaps(span: tuple, spans: list) -> bool:
+    return any(span[0] < end and start < span[1] for start, end in spans)
+
+
+def _unique(values: list) -> list:
+    return list(dict.fromkeys(v for v in values if v))
+
+
+def _window_days_list(question: str, spans: list) -> list:
+    """All windows in comparison phrasings ("last 7 and 30 days",
+    "last 7 days vs last 30 days"); empty when there is at most one."""
+    windows = []
+    for m in _WINDOW_LIST_RE.finditer(question):
+        unit = _UNIT_DAYS[m.group(3).lower()]
+        windows += [int(n) * unit for n in [m.group(1)] + _NUMBER_RE.findall(m.group(2))]
+        spans.append(m.span())
+    if not windows and len(_WINDOW_N_RE.findall(question)) < 2:
+        return []
+    for m in _WINDOW_N_RE.finditer(question):
+        if not _overlaps(m.span(), spans):
+            windows.append(int(m.group(1)) * _UNIT_DAYS[m.group(2).lower()])
+            spans.append(m.span())
+    return _unique(windows)
+
+
+def _window_days(question: str, spans: list):
+    for regex in (_WINDOW_N_RE, _WINDOW_N_ALT_RE):
+        m = regex.search(question)
+        if m:
+            spans.append(m.span())
+            return int(m.group(1)) * _UNIT_DAYS[m.group(2).lower()]
+    m = _WINDOW_HOURS_RE.search(question)
+    if m:
+        spans.append(m.span())
+        return 1
+    m = _WINDOW_ONE_RE.search(question)
+    if m:
+        spans.append(m.span())
+        return _UNIT_DAYS[m.group(1).lower()]
+    m = _WINDOW_WORD_RE.search(question)
+    if m:
+        spans.append(m.span())
+        return _WINDOW_WORDS[m.group(1).lower()]
+    return None
+
+
+def _normalize_blood_type(group: str, sign: str) -> str:
+    sign = sign.lower()
+    return group.upper() + ("+" if sign in ("+", "positive") else "-")
+
+
+def extract_intent_rules(question: str) -> tuple[dict, float]:
+    """
+    Extract intent fields with compiled patterns.
+
+    Returns (intent, confidence) where confidence is in [0, 1]. Confidence
+    drops when the question has leftovers the rules could not explain
+    (unknown capitalized names, stray numbers, unparsed time or target
+    phrases), since those are exactly what the LLM would pick up.
+    """
+    q = question or ""
+    spans: list = []
+
+    provider_re, canonical = gazetteer.pattern()
+    providers = []
+    for m in provider_re.finditer(q):
+        providers.append(canonical.get(m.group(1).lower(), m.group(1)))
+        spans.append(m.span())
+    for m in _INSTITUTION_LIST_RE.finditer(q):
+        letters = [m.group(1)] + _LIST_ITEM_RE.findall(m.group(2))
+        providers += [f"Institution {x.upper()}" for x in letters]
+        spans.append(m.span())
+    for m in _INSTITUTION_RE.finditer(q):
+        if not _overlaps(m.span(), spans):
+            providers.append(f"Institution {m.group(1).upper()}")
+            spans.append(m.span())
+    providers = _unique(providers)
+    provider_name = providers[0] if providers else None
+
+    blood_type = None
+    m = _BLOOD_TYPE_RE.search(q)
+    if m is None:
+        m = _BLOOD_TYPE_WORDS_RE.search(q)
+        if m and not m.group(1).isupper():
+            m = None
+    if m:
+        blood_type = _normalize_blood_type(m.group(1), m.group(2))
+        spans.append(m.span())
+
+    localities = []
+    for m in _LOCALITY_RE.finditer(q):
+        localities.append(f"L{m.group(1)}")
+        spans.append(m.span())
+    localities = _unique(localities)
+    locality = localities[0] if localities else None
+
+    use_case = None
+    for name, regex in _USE_CASE_PATTERNS:
+        if regex.search(q):
+            use_case = name
+            break
+    if use_case is None and blood_type:
+        use_case = "blood_donation"
+
+    target_count = None
+    m = _TARGET_RE.search(q)
+    if m:
+        target_count = int(m.group(1) or m.group(2))
+        spans.append(m.span())
+
+    windows = _window_days_list(q, spans)
+    time_window_days = windows[0] if windows else _window_days(q, spans)
+
+    # Plural keys are only set for comparisons (two or more values).
+    intent = {
+        "providerName": provider_name,
+        "useCase": use_case,
+        "timeWindowDays": time_window_days,
+        "targetCount": target_count,
+        "locality": locality,
+        "bloodType": blood_type,
+        "providerNames": providers if len(providers) > 1 else None,
+        "localities": localities if len(localities) > 1 else None,
+        "timeWindowsDays": windows if len(windows) > 1 else None,
+    }
+
+    # ---- confidence ----
+    if not any([provider_name, use_case, locality, blood_type]):
+        return intent, 0.0
+
+    leftover = list(q)
+    for start, end in spans:
+        leftover[start:end] = " " * (end - start)
+    leftover = "".join(leftover)
+
+    confidence = 1.0
+    unknown_names = [w for w in _CAPITALIZED_RE.findall(leftover)
+                     if w not in _IGNORED_CAPITALIZED]
+    if unknown_names:
+        confidence -= 0.5
+    if _NUMBER_RE.search(leftover):
+        confidence -= 0.3
+    if time_window_days is None and _TIME_HINT_RE.search(leftover):
+        confidence -= 0.4
+    if target_count is None and _TARGET_HINT_RE.search(leftover):
+        confidence -= 0.3
+
+    return intent, round(max(confidence, 0.0), 2)
@@ -34,9 +34,111 @@
 #     return label
 # app/llm/router.py
 
+import json
+import logging
+import re
+from typing import Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTE = "generic"
+
+# Keyword tables per route. Override without code edits by pointing
+# ROUTER_CONFIG_PATH at a JSON file of the same shape:
+#   {"verification_analytics": ["blood", "donor", ...], ...}
+DEFAULT_ROUTES = {
+    "verification_analytics": [
+        # blood donation
+        "blood", "donor", "donors", "donation", "donations",
+        "b+", "b-", "a+", "a-", "o+", "o-", "ab+", "ab-",
+        "donation drive", "donation campaign",
+        # government campaigns
+        "locality", "l1", "l2", "institution a", "institution b",
+        "turnout", "campaign", "campaigns", "participation",
+        "drive", "drives", "target", "how many people", "how many donors",
+    ],
+}
+
+
+class RouteEngine:
+    """
+    Keyword router compiled once into a single regex.
+
+    Keywords only match on word boundaries ("l1" does not match inside
+    "l10" or "fl1ght"). Each route gets a score in [0, 1) that grows with
+    the number of distinct keywords hit: n / (n + 1).
+    """
+
+    def __init__(self, routes: dict, default: str = DEFAULT_ROUTE):
+        self.default = default
+        self._keyword_route: dict[str, str] = {}
+        for route, keywords in routes.items():
+            for k in keywords:
+                self._keyword_route[self._norm(k)] = route
+
+        alternation = "|".join(
+            re.escape(k).replace(r"\ ", r"\s+")
+            for k in sorted(self._keyword_route, key=len, reverse=True)
+        )
+        self._pattern = re.compile(
+            r"(?<![a-z0-9])(?:" + alternation + r")(?![a-z0-9])"
+        ) if alternation else None
+        routes_with_keywords = set(self._keyword_route.values())
+        self._single_route = (
+            routes_with_keywords.pop() if len(routes_with_keywords) == 1 else None
+        )
+
+    @staticmethod
+    def _norm(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def scores(self, question: str) -> dict:
+        """Score every route that matched at least one keyword."""
+        if self._pattern is None:
+            return {}
+        hits: dict[str, set] = {}
+        keyword_route = self._keyword_route
+        for keyword in self._pattern.findall((question or "").lower()):
+            if keyword not in keyword_route:
+                keyword = self._norm(keyword)  # multi-space variant
+            hits.setdefault(keyword_route[keyword], set()).add(keyword)
+        return {route: len(kws) / (len(kws) + 1) for route, kws in hits.items()}
+
+    def route(self, question: str) -> str:
+        if self._single_route is not None:
+            # Only one route to pick: the first hit decides, no scoring.
+            if self._pattern.search((question or "").lower()):
+                return self._single_route
+            return self.default
+        scores = self.scores(question)
+        if not scores:
+            return self.default
+        return max(scores, key=scores.get)
+
+    def route_many(self, questions: list) -> list:
+        """Route a batch of questions (log replay, batch endpoint)."""
+        return list(map(self.route, questions))
+
+
+def load_routes(path: Optional[str]) -> dict:
+    if not path:
+        return DEFAULT_ROUTES
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load router config {path}: {e}; using defaults.")
+        return DEFAULT_ROUTES
+
+
+route_engine = RouteEngine(load_routes(settings.ROUTER_CONFIG_PATH))
+
+
 def route_question(question: str) -> str:
     """
-    Very simple rule-based router for the demo.
+    Rule-based router for the demo.
 
     If the question looks like it's about donors, blood donation,
     localities, institutions, campaigns, or turnout,
@@ -44,20 +146,8 @@ def route_question(question: str) -> str:
 
     Otherwise, route it to 'generic'.
     """
-    q = (question or "").lower()
-
-    blood_keywords = [
-        "blood", "donor", "donors", "b+", "o+", "o-", "ab+", "ab-",
-        "donation drive", "donation campaign"
-    ]
-    gov_campaign_keywords = [
-        "locality", "l1", "l2", "institution a", "institution b",
-        "turnout", "campaign", "participation", "drive", "target",
-        "how many people", "how many donors"
-    ]
+    return route_engine.route(question)
 
-    if any(k in q for k in blood_keywords + gov_campaign_keywords):
-        return "verification_analytics"
 
-    # fallback
-    return "generic"
+def route_many(questions: list) -> list:
+    return route_engine.route_many(questions)
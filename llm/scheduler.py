@@ -0,0 +1,243 @@
+# llm/scheduler.py
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from config import settings
+from services.metrics import Counter, register
+
+# Every LLM call in the async pipeline goes through one scheduler:
+#
+# - a global semaphore caps in-flight completions across all chains,
+# - a tokens-per-minute bucket, debited with the tokens each completion
+#   actually used (TokenUsageHandler), holds new calls back after a burst
+#   instead of letting them run into provider rate limits,
+# - per-call deadlines, with a hedged second attempt when the first is
+#   slow (only if a concurrency slot is free) and jittered retries when it
+#   fails with a transient error (timeout, transport error, 429, 5xx).
+#
+# Transient failures surface as LLMUnavailable, which callers catch to
+# degrade (rule-based intent, stats-only answer) rather than failing the
+# request. Other errors (4xx: bad request, auth) are not retried and
+# propagate unchanged.
+
+llm_calls = register(Counter(
+    "zkloci_llm_calls_total",
+    "LLM scheduler events by chain (ok, hedge, retry, rate_limited, deadline, error).",
+    ("chain", "outcome"),
+))
+
+
+class LLMUnavailable(Exception):
+    """The LLM did not answer within the deadline or kept failing."""
+
+
+_TRANSPORT_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError"}
+
+
+def _is_rate_limit(e: Exception) -> bool:
+    return getattr(e, "status_code", None) == 429 or type(e).__name__ == "RateLimitError"
+
+
+def _is_transient(e: Exception) -> bool:
+    """Timeouts, transport errors, 429 and 5xx: worth another attempt."""
+    if isinstance(e, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _TRANSPORT_ERRORS for cls in type(e).__mro__):
+        return True
+    status = getattr(e, "status_code", None)
+    return _is_rate_limit(e) or (isinstance(status, int) and status >= 500)
+
+
+class TokenBucket:
+    """
+    Tokens-per-minute budget refilled continuously. Calls are admitted
+    while the balance is positive; completions debit what they actually
+    used, so a burst can push the balance below zero and later calls wait
+    until it refills. tokens_per_minute=0 disables the limit.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = float(tokens_per_minute)
+        self.balance = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()  # usage callbacks may run in executor threads
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.capacity, self.balance + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def debit(self, tokens: int):
+        with self._lock:
+            self._refill()
+            self.balance -= tokens
+
+    def drain(self):
+        """Provider said 429: stop admitting until the bucket refills a bit."""
+        with self._lock:
+            self._refill()
+            self.balance = min(self.balance, -self.rate)
+
+    def wait_seconds(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            return 0.0 if self.balance > 0 else (1 - self.balance) / self.rate
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, tokens_per_minute: int,
+                 hedge_after_seconds: float, max_attempts: int):
+        self.max_concurrency = max_concurrency
+        self.hedge_after = hedge_after_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.bucket = TokenBucket(tokens_per_minute)
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def record_usage(self, tokens: int):
+        """TokenUsageHandler hook: debit the tokens a completion used."""
+        self.bucket.debit(tokens)
+
+    async def _admit(self):
+        while True:
+            wait = self.bucket.wait_seconds()
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    async def _call(self, chain: str, fn: Callable[[], Awaitable[Any]]):
+        await self._admit()
+        try:
+            return await fn()
+        except Exception as e:
+            if _is_rate_limit(e):
+                llm_calls.inc(chain=chain, outcome="rate_limited")
+                self.bucket.drain()
+            raise
+
+    async def _attempt(self, chain: str, fn: Callable[[], Awaitable[Any]],
+                       slot_held: bool = False):
+        if slot_held:
+            return await self._call(chain, fn)
+        async with self._slots:
+            return await self._call(chain, fn)
+
+    async def _race(self, chain: str, fn: Callable[[], Awaitable[Any]]):
+        tasks: set = set()
+        attempts = 0
+        last_error = None
+
+        def start(slot_held: bool = False):
+            nonlocal attempts
+            attempts += 1
+            task = asyncio.ensure_future(self._attempt(chain, fn, slot_held))
+            if slot_held:
+                # Released however the task ends, even cancelled before it ran.
+                task.add_done_callback(lambda _: self._slots.release())
+            tasks.add(task)
+
+        start()
+        try:
+            while tasks:
+                can_hedge = self.hedge_after > 0 and attempts < self.max_attempts
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if self._slots.locked():
+                        # Every slot is busy: a hedge would only queue behind
+                        # other calls and add load. Check again later.
+                        continue
+                    # Slow call: race a second one on a free slot (taken
+                    # without waiting), keep whichever finishes first.
+                    await self._slots.acquire()
+                    llm_calls.inc(chain=chain, outcome="hedge")
+                    start(slot_held=True)
+                    continue
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        llm_calls.inc(chain=chain, outcome="ok")
+                        return task.result()
+                    last_error = task.exception()
+                    if not _is_transient(last_error):
+                        llm_calls.inc(chain=chain, outcome="error")
+                        raise last_error
+                if not tasks and attempts < self.max_attempts:
+                    llm_calls.inc(chain=chain, outcome="retry")
+                    await asyncio.sleep(random.uniform(0.5, 1.5) * 0.2 * 2 ** attempts)
+                    start()
+            llm_calls.inc(chain=chain, outcome="error")
+            raise LLMUnavailable(f"{chain} LLM call failed: {last_error}") from last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, chain: str, fn: Callable[[], Awaitable[Any]], deadline: float) -> Any:
+        """
+        Run one LLM call (`fn` creates a fresh coroutine per attempt) under
+        the global limits and return the first successful result.
+
+        Raises LLMUnavailable once `deadline` seconds have passed or every
+        attempt failed with a transient error; any other error is raised
+        as is on the first failure.
+        """
+        try:
+            return await asyncio.wait_for(self._race(chain, fn), deadline)
+        except asyncio.TimeoutError:
+            llm_calls.inc(chain=chain, outcome="deadline")
+            raise LLMUnavailable(f"{chain} LLM call exceeded {deadline}s") from None
+
+    async def stream(self, chain: str, make_stream: Callable[[], AsyncIterator],
+                     deadline: float) -> AsyncIterator:
+        """
+        Yield chunks from a streaming call holding one concurrency slot.
+
+        `deadline` bounds the wait for each chunk (the first one included);
+        streams are not hedged or retried since chunks may already be out.
+        A stall or transient error raises LLMUnavailable, as in run().
+        """
+        async with self._slots:
+            await self._admit()
+            chunks = make_stream().__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), deadline)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        llm_calls.inc(chain=chain, outcome="deadline")
+                        raise LLMUnavailable(f"{chain} LLM stream stalled for {deadline}s") from None
+                    yield chunk
+                llm_calls.inc(chain=chain, outcome="ok")
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                if _is_rate_limit(e):
+                    llm_calls.inc(chain=chain, outcome="rate_limited")
+                    self.bucket.drain()
+                llm_calls.inc(chain=chain, outcome="error")
+                if _is_transient(e):
+                    raise LLMUnavailable(f"{chain} LLM stream failed: {e}") from e
+                raise
+            finally:
+                aclose = getattr(chunks, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    hedge_after_seconds=settings.LLM_HEDGE_AFTER_SECONDS,
+    max_attempts=settings.LLM_MAX_ATTEMPTS,
+)
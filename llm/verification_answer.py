@@ -1,7 +1,7 @@
 # app/llm/verification_answer.py
 
-import json
-from datetime import datetime, date
+import asyncio
+import hashlib
 
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
@@ -9,6 +9,13 @@ from langchain_core.output_parsers import StrOutputParser
 
 # from app.config import settings
 from config import settings  # NOT from app.config
+from llm.cache import LRUCache, normalize_question
+from llm.answer_templates import stats_only_answer, template_answer_for_mode
+from llm.scheduler import LLMUnavailable, llm_scheduler
+from services.stats_compaction import compact_stats
+from services.metrics import TokenUsageHandler, answer_source
+from models.serialization import dumps_str
+from services.singleflight import SingleFlight
 
 
 # ---- LLM client for answering government health queries ----
@@ -17,6 +24,11 @@ llm_answer = ChatOpenAI(
     model=settings.OPENAI_MODEL,
     temperature=0.2,
     api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+    max_retries=0,  # retries and hedging are done by llm_scheduler
+    stream_usage=True,  # usage on streamed completions too, for the token bucket
+    callbacks=[TokenUsageHandler("answer", on_usage=llm_scheduler.record_usage)],
 )
 
 # ---- Prompt template ----
@@ -36,7 +48,7 @@ Your goals:
 
 You receive:
 - The officer's question (natural language).
-- Structured intent (JSON) with fields like providerName, useCase, timeWindowDays, targetCount.
+- Structured intent (JSON) with fields like providerName, useCase, timeWindowDays, targetCount (and providerNames, localities, timeWindowsDays for comparisons).
 - Aggregated stats from the zk-loci backend (JSON) with fields like:
   - locality (e.g. "L1", "L2")
   - institution (e.g. "Institution A", "Institution B")
@@ -45,6 +57,10 @@ You receive:
   - totalProofs, successfulProofs
   - successRate
   - targetCount
+  - requestCount, requestDistribution (spread of per-request results) and topRequests (the largest requests)
+  - uniqueDonors (optional): estimated distinct donors in the window (approximate, ~2% error)
+  - trend (optional): proofs per hour/day/week for the current window and the previous one, with relative change
+  - comparison (optional): a table (columns + rows) with one row per provider / locality / time window being compared; walk through the differences side by side
   - and possibly observed_count / estimated_count / mode in future extensions.
 
 Rules:
@@ -81,30 +97,174 @@ Aggregated stats from zk-loci backend (JSON):
 
 answer_chain = answer_prompt | llm_answer | StrOutputParser()
 
+# Identical question + intent + stats always produce the same briefing,
+# so the stats fingerprint is part of the key: new proofs change the
+# fingerprint and naturally bypass older entries.
+answer_cache = LRUCache(
+    "answer",
+    max_size=settings.ANSWER_CACHE_SIZE,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+)
 
-def _clean_for_json(obj):
-    """Recursively convert datetimes (and other non-JSON types) into strings."""
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    if isinstance(obj, dict):
-        return {k: _clean_for_json(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_clean_for_json(x) for x in obj]
-    # If later you have ObjectId or other custom types, handle them here.
-    return obj
-
+# Same key as the cache: concurrent misses share one LLM call.
+answer_flight = SingleFlight("answer")
 
-def build_verification_answer(question: str, intent: dict, stats: dict) -> str:
-    """Build a natural-language answer for the government officer."""
-    # Clean and JSON-serialize intent and stats BEFORE sending to the LLM
-    intent_clean = _clean_for_json(intent)
-    stats_clean = _clean_for_json(stats)
 
-    intent_json = json.dumps(intent_clean, default=str)
-    stats_json = json.dumps(stats_clean, default=str)
+def _answer_inputs(question: str, intent: dict, stats: dict) -> dict:
+    """JSON-serialize intent and stats (one orjson pass each) for the LLM."""
+    intent_json = dumps_str(intent)
+    # Bounded summary instead of every request document
+    stats_json = dumps_str(compact_stats(stats))
 
-    return answer_chain.invoke({
+    return {
         "question": question,
         "intent_json": intent_json,
         "stats_json": stats_json,
-    })
+    }
+
+
+def _answer_cache_key(inputs: dict) -> str:
+    h = hashlib.sha256()
+    for part in (normalize_question(inputs["question"]),
+                 inputs["intent_json"], inputs["stats_json"]):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _provider_tag(intent: dict, stats: dict):
+    return (stats or {}).get("providerName") or (intent or {}).get("providerName")
+
+
+def invalidate_provider_answers(provider_name: str) -> int:
+    """Forget cached answers for one provider (e.g. after new proofs)."""
+    return answer_cache.invalidate_tag(provider_name)
+
+
+def _template_answer(question: str, intent: dict, stats: dict, mode: str):
+    answer = template_answer_for_mode(question, intent, stats, mode)
+    answer_source.inc(source="llm" if answer is None else "template")
+    return answer
+
+
+async def _allm_answer(inputs: dict, key: str, intent: dict, stats: dict) -> str:
+    """Scheduled answer_chain call; stats-only briefing (not cached) if it times out."""
+    try:
+        answer = await llm_scheduler.run(
+            "answer",
+            lambda: answer_chain.ainvoke(inputs),
+            deadline=settings.LLM_ANSWER_DEADLINE_SECONDS,
+        )
+    except LLMUnavailable:
+        answer_source.inc(source="fallback")
+        return stats_only_answer(intent, stats)
+    answer_cache.set(key, answer, tag=_provider_tag(intent, stats))
+    return answer
+
+
+async def abuild_verification_answer(question: str, intent: dict, stats: dict,
+                                     mode: str = None) -> str:
+    """
+    Build a natural-language answer for the government officer.
+
+    `mode` ("auto" | "llm" | "template", default settings.ANSWER_MODE)
+    decides whether a local template may answer instead of the LLM.
+    """
+    answer = _template_answer(question, intent, stats, mode)
+    if answer is not None:
+        return answer
+
+    inputs = _answer_inputs(question, intent, stats)
+    key = _answer_cache_key(inputs)
+    cached = answer_cache.get(key)
+    if cached is not None:
+        return cached
+
+    return await answer_flight.do(key, lambda: _allm_answer(inputs, key, intent, stats))
+
+
+async def abuild_verification_answers(items: list, modes: list = None) -> list:
+    """
+    Batch variant of abuild_verification_answer.
+
+    `items` is a list of (question, intent, stats) tuples, `modes` an
+    optional answer mode per item. Template and cached answers are served
+    directly; the rest are scheduled LLM calls (at most
+    BATCH_MAX_CONCURRENCY at a time), with identical prompts sent only once.
+    Returns one answer string or Exception per item, in input order.
+    """
+    results: list = [None] * len(items)
+    pending: dict = {}  # cache key -> (question, intent, stats, inputs, indexes)
+
+    modes = modes or [None] * len(items)
+    for i, (question, intent, stats) in enumerate(items):
+        answer = _template_answer(question, intent, stats, modes[i])
+        if answer is not None:
+            results[i] = answer
+            continue
+        inputs = _answer_inputs(question, intent, stats)
+        key = _answer_cache_key(inputs)
+        cached = answer_cache.get(key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        entry = pending.setdefault(key, (intent, stats, inputs, []))
+        entry[3].append(i)
+
+    if pending:
+        keys = list(pending)
+        limit = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+        async def _one(key):
+            intent, stats, inputs, _ = pending[key]
+            async with limit:
+                return await _allm_answer(inputs, key, intent, stats)
+
+        answers = await asyncio.gather(*(_one(k) for k in keys), return_exceptions=True)
+        for key, answer in zip(keys, answers):
+            for i in pending[key][3]:
+                results[i] = answer
+
+    return results
+
+
+async def astream_verification_answer(question: str, intent: dict, stats: dict,
+                                     mode: str = None):
+    """
+    Yield the answer as text chunks from the chain's streaming interface.
+
+    A template or cached answer is yielded as a single chunk. The full answer is only
+    cached if the stream completes, so a cancelled generation (client
+    went away) never leaves a truncated briefing in the cache. If the LLM
+    fails before the first chunk, the stats-only briefing is yielded; if it
+    fails after some chunks went out, LLMUnavailable is raised so the
+    caller can mark the answer as incomplete.
+    """
+    answer = _template_answer(question, intent, stats, mode)
+    if answer is not None:
+        yield answer
+        return
+
+    inputs = _answer_inputs(question, intent, stats)
+    key = _answer_cache_key(inputs)
+    cached = answer_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        async for chunk in llm_scheduler.stream(
+            "answer", lambda: answer_chain.astream(inputs),
+            deadline=settings.LLM_ANSWER_DEADLINE_SECONDS,
+        ):
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+    except LLMUnavailable:
+        answer_source.inc(source="fallback")
+        if parts:
+            raise
+        yield stats_only_answer(intent, stats)
+        return
+    answer_cache.set(key, "".join(parts), tag=_provider_tag(intent, stats))
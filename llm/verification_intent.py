@@ -1,14 +1,27 @@
 # app/llm/verification_intent.py
-import json
+import asyncio
+
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from config import settings
+from models.serialization import loads
+from llm.cache import LRUCache, normalize_question
+from llm.intent_rules import extract_intent_rules
+from llm.scheduler import LLMUnavailable, llm_scheduler
+from services.provider_index import resolve_intent
+from services.singleflight import SingleFlight
+from services.metrics import TokenUsageHandler, intent_source
 
 llm_intent = ChatOpenAI(
     model=settings.OPENAI_MODEL,
     temperature=0.0,
     api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+    max_retries=0,  # retries and hedging are done by llm_scheduler
+    stream_usage=True,  # usage on streamed completions too, for the token bucket
+    callbacks=[TokenUsageHandler("intent", on_usage=llm_scheduler.record_usage)],
 )
 
 intent_prompt = ChatPromptTemplate.from_template("""
@@ -19,7 +32,14 @@ Return ONLY valid JSON with these keys:
 - "useCase" (string or null)
 - "timeWindowDays" (int or null)
 - "targetCount" (int or null)
+- "locality" (string like "L1" or null)
+- "bloodType" (string like "B+" or null)
+- "providerNames" (list of strings or null)
+- "localities" (list like ["L1", "L2"] or null)
+- "timeWindowsDays" (list of ints, e.g. [7, 30] for "last 7 and 30 days", or null)
 
+Only fill the list keys when the question compares two or more values,
+and then also set the singular key to the first item.
 If something is not mentioned, use null. Do not add extra keys.
 
 Question:
@@ -28,16 +48,128 @@ Question:
 
 intent_chain = intent_prompt | llm_intent | StrOutputParser()
 
-def extract_verification_intent(question: str) -> dict:
-    raw = intent_chain.invoke({"question": question})
+# Dashboards resend the same questions with cosmetic differences, so
+# cache validated intents by normalized question.
+intent_cache = LRUCache(
+    "intent",
+    max_size=settings.INTENT_CACHE_SIZE,
+    ttl_seconds=settings.INTENT_CACHE_TTL_SECONDS,
+    persist_path=settings.INTENT_CACHE_PATH,
+)
+
+# Identical questions arriving while the first LLM call is still running
+# wait for that call instead of issuing their own.
+intent_flight = SingleFlight("intent")
+
+def _parse_intent(raw: str) -> dict:
     try:
-        data = json.loads(raw)
+        data = loads(raw)
     except Exception:
         data = {}
+    if not isinstance(data, dict):
+        data = {}
+    providers = _list_value(data.get("providerNames"), str)
+    localities = _list_value(data.get("localities"), str)
+    windows = _list_value(data.get("timeWindowsDays"), int)
     # Provide safe defaults
     return {
-        "providerName": data.get("providerName"),
+        "providerName": data.get("providerName") or (providers or [None])[0],
         "useCase": data.get("useCase"),
-        "timeWindowDays": data.get("timeWindowDays"),
+        "timeWindowDays": data.get("timeWindowDays") or (windows or [None])[0],
         "targetCount": data.get("targetCount"),
+        "locality": data.get("locality") or (localities or [None])[0],
+        "bloodType": data.get("bloodType"),
+        "providerNames": providers,
+        "localities": localities,
+        "timeWindowsDays": windows,
     }
+
+def _list_value(value, kind):
+    """Comparison list: distinct items of `kind`, or None unless two or more."""
+    if not isinstance(value, list):
+        return None
+    items = list(dict.fromkeys(v for v in value if isinstance(v, kind) and v))
+    return items if len(items) > 1 else None
+
+def _rules_intent(question: str):
+    """Return the rule-based intent if it is confident enough, else None."""
+    intent, confidence = extract_intent_rules(question)
+    if confidence >= settings.INTENT_RULES_MIN_CONFIDENCE:
+        intent_source.inc(source="rules")
+        return intent
+    return None
+
+def _fallback_intent(question: str) -> dict:
+    """Best-effort rule-based intent when the LLM is unavailable (not cached)."""
+    intent_source.inc(source="rules_fallback")
+    intent, _ = extract_intent_rules(question)
+    return intent
+
+async def _allm_intent(question: str, key: str) -> dict:
+    intent_source.inc(source="llm")
+    try:
+        raw = await llm_scheduler.run(
+            "intent",
+            lambda: intent_chain.ainvoke({"question": question}),
+            deadline=settings.LLM_INTENT_DEADLINE_SECONDS,
+        )
+    except LLMUnavailable:
+        return _fallback_intent(question)
+    intent = _parse_intent(raw)
+    intent_cache.set(key, intent)
+    return intent
+
+async def aextract_verification_intent(question: str) -> dict:
+    """
+    Intent for one question, with provider names resolved to their
+    canonical stored name (the cache keeps names as extracted, so
+    providers added later still resolve).
+    """
+    intent = _rules_intent(question)
+    if intent is not None:
+        return resolve_intent(intent)
+
+    key = normalize_question(question)
+    cached = intent_cache.get(key)
+    if cached is not None:
+        intent_source.inc(source="cache")
+        return resolve_intent(cached)
+
+    return resolve_intent(await intent_flight.do(key, lambda: _allm_intent(question, key)))
+
+async def aextract_verification_intents(questions: list) -> list:
+    """
+    Batch variant: rules and cache first, then one scheduled LLM call per
+    remaining distinct question (at most BATCH_MAX_CONCURRENCY at a time).
+
+    Returns one intent dict or Exception per question, in input order.
+    """
+    results: list = [None] * len(questions)
+    pending: dict = {}  # normalized question -> list of indexes
+
+    for i, question in enumerate(questions):
+        intent = _rules_intent(question)
+        if intent is None:
+            key = normalize_question(question)
+            cached = intent_cache.get(key)
+            if cached is None:
+                pending.setdefault(key, []).append(i)
+                continue
+            intent_source.inc(source="cache")
+            intent = cached
+        results[i] = resolve_intent(intent)
+
+    if pending:
+        keys = list(pending)
+        limit = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+        async def _one(key):
+            async with limit:
+                return await _allm_intent(questions[pending[key][0]], key)
+
+        intents = await asyncio.gather(*(_one(k) for k in keys), return_exceptions=True)
+        for key, intent in zip(keys, intents):
+            for i in pending[key]:
+                results[i] = intent if isinstance(intent, Exception) else resolve_intent(intent)
+
+    return results
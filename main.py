@@ -15,36 +15,407 @@
 # from app.llm.verification_answer import build_verification_answer
 # from app.services.verification_analytics import get_provider_campaign_stats
 
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from models.api import (
+    QueryRequest,
+    QueryResponse,
+    RequestsPageRequest,
+    TrendRequest,
+    UniqueDonorsRequest,
+)
+from models.proofs import BulkIngestResponse
+from models.serialization import FastJSONResponse, dumps_str
+from llm.answer_templates import stats_only_answer
+from llm.router import route_question, route_many
+from llm.scheduler import LLMUnavailable
+from llm.verification_intent import (
+    aextract_verification_intent,
+    aextract_verification_intents,
+    intent_cache,
+)
+from llm.verification_answer import (
+    abuild_verification_answer,
+    abuild_verification_answers,
+    astream_verification_answer,
+    answer_cache,
+    invalidate_provider_answers,
+)
+from services.verification_analytics import (
+    aget_campaign_requests_page,
+    aget_provider_campaign_stats,
+)
+from db.mongo import health_status, is_available, on_connect, start_health_checker
+from db.mongo_async import close_async_db
+from services.comparison import aget_comparison_stats, is_comparison
+from services.rollups import start_rollup_watcher
+from services.provider_index import resolve_intent, start_provider_index_refresher
+from services.snapshot import start_snapshot_refresher
+from services.trends import aget_proof_trend, ensure_timeseries_collection, wants_trend
+from services.user_sketches import aestimate_unique_users
+from services.proof_ingest import ingest_proofs, parse_proofs_body, validate_proofs
+from services import metrics
+from llm.cache import all_caches
+from config import settings
+
+
+app = FastAPI(title="zk-loci Analytics API", default_response_class=FastJSONResponse)
+
+GENERIC_ANSWER = (
+    "This question is not recognized as a zk-loci analytics query. "
+    "Please ask about verification stats, proofs, providers, or use cases."
+)
+
+
+def _query_response(**fields) -> QueryResponse:
+    """
+    QueryResponse without re-validating raw_stats: the stats come from our
+    own pipeline, and validating a large payload per request is pure
+    overhead. Pair with _respond() for single-pass serialization.
+    """
+    return QueryResponse.model_construct(**fields)
 
-from models.api import QueryRequest, QueryResponse
-from llm.router import route_question
-from llm.verification_intent import extract_verification_intent
-from llm.verification_answer import build_verification_answer
-from services.verification_analytics import get_provider_campaign_stats
 
+def _respond(content) -> FastJSONResponse:
+    if isinstance(content, list):
+        return FastJSONResponse([dict(r) for r in content])
+    return FastJSONResponse(dict(content))
+
+
+async def _query_stats(question: str, intent: dict, payload: QueryRequest) -> dict:
+    """
+    raw_stats for one analytics question, shared by the query, stream and
+    batch endpoints: comparison stats, or campaign stats (honouring detail,
+    top_k and request_sort) with uniqueDonors and, when the question asks
+    for one, the trend. Raises ValueError for an invalid comparison.
+    """
+    if is_comparison(intent):
+        with metrics.stage("comparison"):
+            return await aget_comparison_stats(intent)
+
+    with metrics.stage("stats"):
+        stats = await aget_provider_campaign_stats(
+            intent, detail=payload.detail,
+            top_k=payload.top_k, sort=payload.request_sort,
+        )
+    if settings.USER_SKETCHES:
+        with metrics.stage("unique_users"):
+            stats["uniqueDonors"] = await aestimate_unique_users(
+                intent.get("providerName"), intent.get("useCase"),
+                intent.get("timeWindowDays") or 7,
+            )
+    if wants_trend(question):
+        with metrics.stage("trend"):
+            stats["trend"] = await aget_proof_trend(intent)
+    return stats
+
+
+def _stats_key(question: str, intent: dict, payload: QueryRequest) -> tuple:
+    """Batch items with equal keys share one _query_stats call."""
+    return (
+        tuple(sorted((k, repr(v)) for k, v in intent.items())),
+        payload.detail, payload.top_k, payload.request_sort, wants_trend(question),
+    )
+
+@app.on_event("startup")
+async def startup():
+    # Nothing here waits on MongoDB: the health checker pings in the
+    # background (and creates indexes once it first sees the DB).
+    if settings.TRENDS_TIMESERIES:
+        on_connect(ensure_timeseries_collection)
+    app.state.health_checker = start_health_checker()
+    app.state.provider_index_refresher = start_provider_index_refresher()
+    if settings.ROLLUPS_WATCH:
+        app.state.rollup_watcher = start_rollup_watcher()
+    if settings.STATS_SOURCE == "snapshot":
+        app.state.snapshot_refresher = start_snapshot_refresher()
 
-app = FastAPI(title="zk-loci Analytics API")
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.health_checker.set()
+    app.state.provider_index_refresher.set()
+    if getattr(app.state, "rollup_watcher", None) is not None:
+        app.state.rollup_watcher.set()
+    if getattr(app.state, "snapshot_refresher", None) is not None:
+        app.state.snapshot_refresher.set()
+    await close_async_db()
 
 @app.get("/")
 def root():
     return {"message": "zk-loci Analytics API is running"}
 
+@app.get("/health")
+def health():
+    db_state = health_status()
+    return {
+        "status": "ok" if db_state["available"] else "degraded",
+        "db": db_state,
+    }
+
+metrics.register(metrics.CallbackMetric(
+    "zkloci_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"),
+    lambda: {
+        key: value
+        for c in all_caches
+        for key, value in (((c.name, "hit"), c.hits), ((c.name, "miss"), c.misses))
+    },
+    type="counter",
+))
+metrics.register(metrics.CallbackMetric(
+    "zkloci_db_available", "1 if MongoDB answered the last health check.", (),
+    lambda: {(): int(health_status()["available"])},
+))
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/analytics/cache")
+def cache_stats():
+    return {"intent": intent_cache.stats(), "answer": answer_cache.stats()}
+
+@app.delete("/analytics/cache/answers/{provider_name}")
+def invalidate_answers(provider_name: str):
+    return {"providerName": provider_name,
+            "invalidated": invalidate_provider_answers(provider_name)}
+
 @app.post("/analytics/query", response_model=QueryResponse)
-def analytics_query(payload: QueryRequest):
+async def analytics_query(payload: QueryRequest):
+    # Fully async: LLM calls and Mongo queries await on the event loop
+    # instead of holding a threadpool worker for the whole request.
     question = payload.question
-    route = route_question(question)
-
-    if route == "verification_analytics":
-        intent = extract_verification_intent(question)
-        stats = get_provider_campaign_stats(intent)
-        answer = build_verification_answer(question, intent, stats)
-        return QueryResponse(answer=answer, route=route, raw_stats=stats)
-
-    # generic fallback (simple echo for now)
-    return QueryResponse(
-        answer="This question is not recognized as a zk-loci analytics query. Please ask about verification stats, proofs, providers, or use cases.",
-        route="generic",
-        raw_stats=None,
+    timings = metrics.start_request_timings()
+
+    with metrics.stage("total"):
+        with metrics.stage("route"):
+            route = route_question(question)  # local rules, no I/O
+
+        if route == "verification_analytics":
+            with metrics.stage("intent"):
+                intent = await aextract_verification_intent(question)
+            try:
+                stats = await _query_stats(question, intent, payload)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            with metrics.stage("answer"):
+                answer = await abuild_verification_answer(
+                    question, intent, stats, mode=payload.answer_mode
+                )
+            response = _query_response(answer=answer, route=route, raw_stats=stats)
+        else:
+            # generic fallback (simple echo for now)
+            response = _query_response(
+                answer=GENERIC_ANSWER,
+                route="generic",
+                raw_stats=None,
+            )
+
+    if payload.debug:
+        response.timings = timings
+    return _respond(response)
+
+
+@app.post("/analytics/trend")
+async def analytics_trend(payload: TrendRequest):
+    """Per-hour/day/week proof counts with the previous window for comparison."""
+    try:
+        with metrics.stage("trend"):
+            return await aget_proof_trend(resolve_intent(payload.model_dump()), payload.granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/analytics/requests")
+async def analytics_requests(payload: RequestsPageRequest):
+    """
+    Per-request breakdown behind raw_stats, one keyset-paginated page at
+    a time: pass the returned nextCursor to get the next page.
+    """
+    limit = max(1, min(payload.limit, settings.REQUESTS_PAGE_MAX))
+    try:
+        with metrics.stage("requests_page"):
+            return await aget_campaign_requests_page(
+                resolve_intent(payload.model_dump()), payload.sort, payload.order, limit,
+                payload.cursor,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/analytics/unique-donors")
+async def analytics_unique_donors(payload: UniqueDonorsRequest):
+    """Unique donors over a window from merged HyperLogLog sketches (or exact)."""
+    intent = resolve_intent(payload.model_dump())
+    with metrics.stage("unique_users"):
+        return await aestimate_unique_users(
+            intent["providerName"], payload.useCase, payload.timeWindowDays, payload.exact
+        )
+
+@app.post("/analytics/query/batch", response_model=list[QueryResponse])
+async def analytics_query_batch(payloads: list[QueryRequest]):
+    """
+    Answer many questions in one call. Intent extraction and answer
+    generation go through batched, concurrency-limited chain calls; stats
+    are built as for /analytics/query, once per distinct intent and
+    options (concurrent identical stats queries also share one
+    aggregation, see services/singleflight.py).
+    A failing item gets `error` set instead of failing the whole batch.
+    """
+    if len(payloads) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.BATCH_MAX_ITEMS} questions).",
+        )
+
+    questions = [p.question for p in payloads]
+    routes = route_many(questions)
+    responses: list = [
+        _query_response(answer=GENERIC_ANSWER, route="generic", raw_stats=None)
+        for _ in questions
+    ]
+
+    idx = [i for i, r in enumerate(routes) if r == "verification_analytics"]
+    if not idx:
+        return _respond(responses)
+
+    with metrics.stage("batch_intent"):
+        intents = await aextract_verification_intents([questions[i] for i in idx])
+    ok = [(i, intent) for i, intent in zip(idx, intents) if not isinstance(intent, Exception)]
+    for i, intent in zip(idx, intents):
+        if isinstance(intent, Exception):
+            responses[i] = _query_response(answer="", route=routes[i], error=str(intent))
+
+    # Identical questions (and any with the same intent and stats options)
+    # share one stats computation.
+    groups: dict = {}
+    for i, intent in ok:
+        groups.setdefault(_stats_key(questions[i], intent, payloads[i]), []).append((i, intent))
+    with metrics.stage("batch_stats"):
+        group_stats = await asyncio.gather(
+            *(_query_stats(questions[items[0][0]], items[0][1], payloads[items[0][0]])
+              for items in groups.values()),
+            return_exceptions=True,
+        )
+    answerable = []
+    for items, stats in zip(groups.values(), group_stats):
+        for i, intent in items:
+            if isinstance(stats, Exception):
+                responses[i] = _query_response(answer="", route=routes[i], error=str(stats))
+            else:
+                # Items of a group get their own top-level dict.
+                answerable.append((i, intent, dict(stats)))
+    answerable.sort(key=lambda item: item[0])
+
+    with metrics.stage("batch_answer"):
+        answers = await abuild_verification_answers(
+            [(questions[i], intent, stats) for i, intent, stats in answerable],
+            modes=[payloads[i].answer_mode for i, _, _ in answerable],
+        )
+    for (i, _, stats), answer in zip(answerable, answers):
+        if isinstance(answer, Exception):
+            responses[i] = _query_response(answer="", route=routes[i], raw_stats=stats,
+                                           error=str(answer))
+        else:
+            responses[i] = _query_response(answer=answer, route=routes[i], raw_stats=stats)
+
+    return _respond(responses)
+
+
+@app.post("/proofs/bulk", response_model=BulkIngestResponse)
+async def proofs_bulk(request: Request):
+    """
+    Bulk proof ingestion. Accepts NDJSON (application/x-ndjson) or a JSON
+    array of proofResults. Invalid items are reported by index and the
+    rest are written; re-delivered proofIds are counted as duplicates.
+    """
+    if not is_available():
+        raise HTTPException(status_code=503, detail="MongoDB is not available.")
+
+    try:
+        items = parse_proofs_body(await request.body(),
+                                  request.headers.get("content-type", ""))
+    except ValueError as e:  # includes JSON decode errors
+        raise HTTPException(status_code=400, detail=f"Invalid body: {e}")
+    if len(items) > settings.INGEST_MAX_PROOFS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many proofs (max {settings.INGEST_MAX_PROOFS} per request).",
+        )
+
+    proofs, errors = validate_proofs(items)
+    with metrics.stage("ingest"):
+        inserted, duplicates = await ingest_proofs(proofs)
+
+    return BulkIngestResponse(
+        received=len(items),
+        inserted=inserted,
+        duplicates=duplicates,
+        invalid=len(errors),
+        errors=errors,
+    )
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {dumps_str(data)}\n\n"
+
+
+@app.post("/analytics/query/stream")
+async def analytics_query_stream(payload: QueryRequest, request: Request):
+    """
+    Server-Sent Events variant of /analytics/query.
+
+    Emits `route`, `intent` and `stats` as soon as each is known, then one
+    `token` event per answer chunk and a final `done` event carrying the
+    full answer. If the LLM fails part way through, the stats-only
+    briefing is streamed after what was already sent and `done` carries
+    `"fallback": true`. If the client disconnects the generator stops,
+    which closes the LLM stream and cancels the generation.
+    """
+    question = payload.question
+
+    async def events():
+        route = route_question(question)
+        yield _sse("route", {"route": route})
+
+        if route != "verification_analytics":
+            yield _sse("token", {"text": GENERIC_ANSWER})
+            yield _sse("done", {"answer": GENERIC_ANSWER, "route": "generic"})
+            return
+
+        try:
+            with metrics.stage("intent"):
+                intent = await aextract_verification_intent(question)
+            yield _sse("intent", intent)
+
+            stats = await _query_stats(question, intent, payload)
+            yield _sse("stats", stats)
+
+            parts = []
+            try:
+                async for chunk in astream_verification_answer(
+                    question, intent, stats, mode=payload.answer_mode
+                ):
+                    if await request.is_disconnected():
+                        return
+                    parts.append(chunk)
+                    yield _sse("token", {"text": chunk})
+            except LLMUnavailable:
+                fallback = f"\n\n{stats_only_answer(intent, stats)}"
+                parts.append(fallback)
+                yield _sse("token", {"text": fallback})
+                yield _sse("done", {"answer": "".join(parts), "route": route, "fallback": True})
+                return
+
+            yield _sse("done", {"answer": "".join(parts), "route": route})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
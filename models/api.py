@@ -1,11 +1,48 @@
 # app/models/api.py
 from pydantic import BaseModel
-from typing import Any, Optional
+from typing import Literal, Optional, Union
+
+from models.stats import CampaignStats, ComparisonStats
+
+RequestSort = Literal["proofs", "successfulProofs", "successRate", "uniqueUsers", "createdAt"]
 
 class QueryRequest(BaseModel):
     question: str
+    detail: bool = False  # Full request documents in raw_stats
+    debug: bool = False  # Per-stage timing breakdown in the response
+    # None uses settings.ANSWER_MODE; "template"/"auto" may answer from
+    # llm/answer_templates.py without an LLM call
+    answer_mode: Optional[Literal["auto", "llm", "template"]] = None
+    # Requests kept in raw_stats and their order (defaults from settings)
+    top_k: Optional[int] = None
+    request_sort: Optional[RequestSort] = None
 
 class QueryResponse(BaseModel):
+    # Built with model_construct() on the hot path and serialized with
+    # models.serialization, so raw_stats is not re-validated per request.
     answer: str
     route: str
-    raw_stats: Optional[Any] = None  # Optional: for debugging/analytics view
+    raw_stats: Union[CampaignStats, ComparisonStats, None] = None  # Optional: for debugging/analytics view
+    error: Optional[str] = None  # Set on per-item failures in batch responses
+    timings: Optional[dict] = None  # Stage -> milliseconds, when debug=True
+
+class TrendRequest(BaseModel):
+    providerName: Optional[str] = None
+    useCase: Optional[str] = None
+    timeWindowDays: int = 7
+    granularity: Optional[Literal["hour", "day", "week"]] = None  # auto from window
+
+class UniqueDonorsRequest(BaseModel):
+    providerName: Optional[str] = None
+    useCase: Optional[str] = None
+    timeWindowDays: Optional[int] = 7  # None or 0: all time
+    exact: bool = False  # Count distinct userIds instead of merging sketches
+
+class RequestsPageRequest(BaseModel):
+    providerName: Optional[str] = None
+    useCase: Optional[str] = None
+    timeWindowDays: int = 7
+    sort: RequestSort = "proofs"
+    order: Literal["asc", "desc"] = "desc"
+    limit: int = 50  # capped at settings.REQUESTS_PAGE_MAX
+    cursor: Optional[str] = None  # nextCursor from the previous page
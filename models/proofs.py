@@ -0,0 +1,49 @@
+# models/proofs.py
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+
+class ProofResultIn(BaseModel):
+    """One proofResults document as delivered to POST /proofs/bulk."""
+    model_config = ConfigDict(extra="allow")  # keep writer-specific fields
+
+    proofId: str
+    requestId: str
+    userId: Optional[str] = None
+    proofType: Optional[str] = None
+    result: bool
+    provider: Optional[str] = None
+    providerAddress: Optional[str] = None
+    ipfsCID: Optional[str] = None
+    ipfsUrl: Optional[str] = None
+    metadata: Optional[dict[str, Any]] = None
+    timestamp: Optional[int] = None
+    createdAt: Optional[datetime] = None
+    status: Optional[str] = None
+    transactionHash: Optional[str] = None
+    blockNumber: Optional[int] = None
+    tags: list[str] = []
+
+    @field_validator("createdAt")
+    @classmethod
+    def _naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Stored timestamps are naive UTC (datetime.utcnow()); "...Z" or
+        # "+02:00" inputs would otherwise not compare with them.
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class IngestError(BaseModel):
+    index: int
+    error: str
+
+
+class BulkIngestResponse(BaseModel):
+    received: int
+    inserted: int
+    duplicates: int
+    invalid: int
+    errors: list[IngestError] = []
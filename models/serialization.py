@@ -0,0 +1,51 @@
+# models/serialization.py
+import base64
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from bson import Decimal128, ObjectId
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+# Single-pass JSON encoding for both the LLM prompt and HTTP responses.
+# orjson handles datetime/date natively (naive datetimes stay naive, as
+# with isoformat()); Mongo types are handled in _default, which orjson
+# only calls for values it cannot encode itself.
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode("ascii")
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson and Mongo-aware defaults."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
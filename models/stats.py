@@ -0,0 +1,65 @@
+# models/stats.py
+from datetime import datetime
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+# Typed shape of the campaign stats returned by
+# services.verification_analytics and of the comparison stats returned by
+# services.comparison (either is echoed as QueryResponse.raw_stats).
+# Extra keys are allowed so optional add-ons (trend, uniqueDonors, full
+# request documents with detail=true) keep flowing through.
+
+
+class RequestProofStats(BaseModel):
+    totalProofs: int = 0
+    successfulProofs: int = 0
+
+
+class CampaignRequestStats(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    requestId: str
+    providerName: Optional[str] = None
+    useCase: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    createdAt: Optional[Union[datetime, str]] = None
+    expiresAt: Optional[Union[datetime, str]] = None
+    stats: RequestProofStats = RequestProofStats()
+    uniqueUserCount: Optional[int] = None
+
+
+class CampaignStats(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    providerName: Optional[str] = None
+    useCase: Optional[str] = None
+    locality: Optional[str] = None
+    bloodType: Optional[str] = None
+    timeWindowDays: int = 7
+    targetCount: Optional[int] = None
+    totalProofs: int = 0
+    successfulProofs: int = 0
+    successRate: float = 0.0
+    requests: list[CampaignRequestStats] = []  # top requests when truncated
+    requestCount: Optional[int] = None  # all matching requests
+    requestSort: Optional[str] = None
+    requestDistribution: Optional[dict[str, Any]] = None
+    trend: Optional[dict[str, Any]] = None
+    uniqueDonors: Optional[dict[str, Any]] = None
+
+
+class ComparisonTable(BaseModel):
+    columns: list[str]
+    rows: list[list[Any]]  # one row per (provider, locality, window) combination
+
+
+class ComparisonStats(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    providerNames: Optional[list[str]] = None
+    useCase: Optional[str] = None
+    localities: Optional[list[str]] = None
+    timeWindowsDays: list[int] = []
+    comparison: ComparisonTable
@@ -0,0 +1,204 @@
+# scripts/bench_pipeline.py
+#
+# Offline load/latency benchmark for main.app.
+#
+# Runs the FastAPI app in-process (httpx ASGITransport), with FakeChatModel
+# (reporting token usage like ChatOpenAI) in place of ChatOpenAI, against a
+# local MongoDB filled by scripts/seed_zkloci.seed_scaled(). Without a
+# reachable MongoDB it exits, unless --mock-stats asks for the demo mock
+# stats explicitly. Reports req/s, latency
+# percentiles overall and per pipeline stage, and memory, and writes the
+# results to JSON so runs can be compared. The timed pass only reads RSS:
+# tracemalloc slows every allocation, so the Python heap peak is measured
+# in a separate, untimed pass afterwards.
+#
+# Run from the repo root, e.g.:
+#   python -m scripts.bench_pipeline --mock-stats --requests 2000 --concurrency 100
+#   MONGO_URI=mongodb://localhost:27017 MONGO_DB_NAME=zk_loci_bench \
+#     python -m scripts.bench_pipeline --seed --requests-per-provider 200
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import httpx
+from langchain_core.output_parsers import StrOutputParser
+
+from config import settings
+
+DEFAULT_MIX = {
+    "How many B+ donors verified in L1 over the last 7 days?": 4,
+    "What was the turnout for the Institution A campaign this week?": 3,
+    "How did City Hospital Blood Drive do in the past 30 days?": 2,
+    "Plan a new donation drive at St Mary Clinic next month": 1,
+    "What's the weather like today?": 1,
+}
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(values[-1], 3), "mean": round(sum(values) / len(values), 3)}
+
+
+def _install_fake_llms(args):
+    from scripts.fake_llm import FakeChatModel, FAKE_INTENT_JSON
+    import llm.verification_intent as vi
+    import llm.verification_answer as va
+
+    # Same callbacks as the real clients: token metrics and the scheduler's budget.
+    vi.intent_chain = vi.intent_prompt | FakeChatModel(
+        latency_seconds=args.intent_latency, response=FAKE_INTENT_JSON,
+        callbacks=vi.llm_intent.callbacks,
+    ) | StrOutputParser()
+    va.answer_chain = va.answer_prompt | FakeChatModel(
+        latency_seconds=args.answer_latency, output_tokens=args.answer_tokens,
+        callbacks=va.llm_answer.callbacks,
+    ) | StrOutputParser()
+
+    if args.no_cache:
+        vi.intent_cache.max_size = 0
+        va.answer_cache.max_size = 0
+    if args.no_rules:
+        settings.INTENT_RULES_MIN_CONFIDENCE = 1.1
+
+
+async def _run(args, questions: list) -> dict:
+    from main import app
+    from db.mongo import check_health
+
+    db_available = await asyncio.to_thread(check_health)
+    if not db_available and not args.mock_stats:
+        raise SystemExit(f"MongoDB at {settings.MONGO_URI} ({settings.MONGO_DB_NAME}) is not "
+                         "reachable: start it (and --seed it) or pass --mock-stats.")
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies, stage_ms, errors, sizes = [], {}, 0, []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url="http://bench", timeout=None) as client:
+        async def one(question):
+            nonlocal errors
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.post("/analytics/query",
+                                         json={"question": question, "debug": True})
+                elapsed = (time.perf_counter() - start) * 1000
+            if resp.status_code != 200:
+                errors += 1
+                return
+            latencies.append(elapsed)
+            sizes.append(len(resp.content))
+            timings = resp.json().get("timings") or {}
+            for name, ms in timings.items():
+                stage_ms.setdefault(name, []).append(ms)
+            # Time outside the pipeline: validation, serialization, transport
+            stage_ms.setdefault("overhead", []).append(elapsed - timings.get("total", 0.0))
+
+        for q in questions[:args.warmup]:
+            await one(q)
+        latencies.clear()
+        stage_ms.clear()
+        sizes.clear()
+        errors = 0
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in questions))
+        wall = time.perf_counter() - start
+        results = {
+            "dbAvailable": db_available,
+            "requests": len(questions),
+            "errors": errors,
+            "wallSeconds": round(wall, 3),
+            "requestsPerSecond": round(len(latencies) / wall, 2) if wall else 0.0,
+            "latencyMs": _percentiles(latencies),
+            "stageMs": {name: _percentiles(v) for name, v in sorted(stage_ms.items())},
+            "responseBytes": _percentiles(sizes),
+            "memory": {
+                "maxRssMB": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+            },
+        }
+
+        if args.memory_requests:
+            memory_questions = questions[:args.memory_requests]
+            tracemalloc.start()
+            await asyncio.gather(*(one(q) for q in memory_questions))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results["memory"]["tracemallocPeakMB"] = round(peak / 2**20, 2)
+            results["memory"]["tracemallocRequests"] = len(memory_questions)
+
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /analytics/query pipeline.")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--mix", help="JSON file of {question: weight}")
+    parser.add_argument("--intent-latency", type=float, default=0.3)
+    parser.add_argument("--answer-latency", type=float, default=1.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--no-cache", action="store_true", help="Disable intent/answer caches")
+    parser.add_argument("--no-rules", action="store_true", help="Always use the (fake) intent LLM")
+    parser.add_argument("--memory-requests", type=int, default=200,
+                        help="Requests in the untimed tracemalloc pass (0 to skip)")
+    parser.add_argument("--mock-stats", action="store_true",
+                        help="Benchmark the demo mock stats when MongoDB is not reachable")
+    parser.add_argument("--seed", action="store_true",
+                        help="Fill MONGO_URI/MONGO_DB_NAME with seed_scaled() first")
+    parser.add_argument("--providers", type=int, default=5)
+    parser.add_argument("--requests-per-provider", type=int, default=20)
+    parser.add_argument("--proofs-per-request", type=int, default=50)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--output", default=f"bench-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    args = parser.parse_args()
+
+    if args.seed:
+        from scripts.seed_zkloci import seed_scaled
+        seed_scaled(args.providers, args.requests_per_provider, args.proofs_per_request,
+                    args.users, args.days, uri=settings.MONGO_URI, db_name=settings.MONGO_DB_NAME)
+
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix) as f:
+            mix = json.load(f)
+    rng = random.Random(0)
+    questions = rng.choices(list(mix), weights=list(mix.values()), k=args.requests)
+
+    _install_fake_llms(args)
+    results = asyncio.run(_run(args, questions))
+    results["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    results["commit"] = _git_commit()
+    results["python"] = platform.python_version()
+    results["statsSource"] = settings.STATS_SOURCE if results["dbAvailable"] else "mock"
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({k: results[k] for k in ("requestsPerSecond", "latencyMs", "stageMs")}, indent=2))
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# scripts/bench_router.py
+#
+# Micro-benchmark: compiled RouteEngine vs the original substring router.
+# Run from the repo root:  python -m scripts.bench_router
+
+import random
+import timeit
+
+from llm.router import route_engine
+
+
+def legacy_route_question(question: str) -> str:
+    """The original any(k in q ...) router, kept here for comparison."""
+    q = (question or "").lower()
+
+    blood_keywords = [
+        "blood", "donor", "donors", "b+", "o+", "o-", "ab+", "ab-",
+        "donation drive", "donation campaign"
+    ]
+    gov_campaign_keywords = [
+        "locality", "l1", "l2", "institution a", "institution b",
+        "turnout", "campaign", "participation", "drive", "target",
+        "how many people", "how many donors"
+    ]
+
+    if any(k in q for k in blood_keywords + gov_campaign_keywords):
+        return "verification_analytics"
+    return "generic"
+
+
+QUESTIONS = [
+    "How many B+ donors verified in L1 over the last 7 days?",
+    "What was the turnout for the Institution A campaign?",
+    "Plan a new donation drive in L2 with a target of 40 donors",
+    "What's the weather like in the capital today?",
+    "Summarize the latest budget circular for the finance department",
+    "Which employees were present in the office yesterday?",
+]
+
+
+def main(n_questions: int = 10_000, repeat: int = 5):
+    questions = [random.choice(QUESTIONS) for _ in range(n_questions)]
+
+    legacy = min(timeit.repeat(
+        lambda: [legacy_route_question(q) for q in questions], number=1, repeat=repeat))
+    single = min(timeit.repeat(
+        lambda: [route_engine.route(q) for q in questions], number=1, repeat=repeat))
+    batch = min(timeit.repeat(
+        lambda: route_engine.route_many(questions), number=1, repeat=repeat))
+
+    for name, secs in [("legacy", legacy), ("engine.route", single), ("engine.route_many", batch)]:
+        print(f"{name:<18} {secs * 1e6 / n_questions:8.2f} us/question")
+
+    disagreements = [q for q in QUESTIONS if legacy_route_question(q) != route_engine.route(q)]
+    for q in disagreements:
+        print(f"differs: {q!r} legacy={legacy_route_question(q)} engine={route_engine.route(q)}")
+
+
+if __name__ == "__main__":
+    main()
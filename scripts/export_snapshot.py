@@ -0,0 +1,36 @@
+# scripts/export_snapshot.py
+#
+# Export requests + proofResults into a columnar snapshot for
+# STATS_SOURCE=snapshot (see services/snapshot.py). Run from the repo root:
+#   python -m scripts.export_snapshot              # once
+#   python -m scripts.export_snapshot --every 600  # re-export every 10 minutes
+
+import argparse
+import time
+
+from config import settings
+from db.mongo import check_health
+from services.snapshot import export_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a columnar stats snapshot.")
+    parser.add_argument("--dir", default=settings.SNAPSHOT_DIR, help="snapshot root directory")
+    parser.add_argument("--every", type=int, default=0,
+                        help="re-export every N seconds (0 = export once)")
+    args = parser.parse_args()
+
+    while True:
+        if check_health():
+            started = time.perf_counter()
+            path = export_snapshot(args.dir)
+            print(f"Exported {path} in {time.perf_counter() - started:.1f}s.")
+        else:
+            print("MongoDB is not available; skipping export.")
+        if not args.every:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
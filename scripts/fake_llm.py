@@ -0,0 +1,77 @@
+# scripts/fake_llm.py
+#
+# Stand-in for ChatOpenAI used by the benchmark harness: configurable
+# latency and output size, no network.
+
+import asyncio
+import random
+import time
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_WORDS = ("donors", "turnout", "campaign", "locality", "records", "recent",
+          "verified", "success", "rate", "around", "expect", "planning")
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps `latency_seconds` (+/- jitter) and returns text."""
+
+    latency_seconds: float = 0.5
+    jitter: float = 0.2
+    output_tokens: int = 120
+    response: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-bench"
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _text(self) -> str:
+        if self.response is not None:
+            return self.response
+        return " ".join(random.choice(_WORDS) for _ in range(self.output_tokens))
+
+    @staticmethod
+    def _usage(messages, text: str) -> dict:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = max(1, len(text) // 4)
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _result(self, messages, text: str) -> ChatResult:
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay())
+        return self._result(messages, self._text())
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._result(messages, self._text())
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        text = self._text()
+        words = text.split(" ")
+        per_word = self._delay() / max(1, len(words))
+        for word in words:
+            await asyncio.sleep(per_word)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        # Usage on a final empty chunk, as ChatOpenAI does with stream_usage.
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=self._usage(messages, text)))
+
+
+FAKE_INTENT_JSON = (
+    '{"providerName": "City Hospital Blood Drive", "useCase": "blood_donation", '
+    '"timeWindowDays": 7, "targetCount": null, "locality": null, "bloodType": null, '
+    '"providerNames": null, "localities": null, "timeWindowsDays": null}'
+)
@@ -0,0 +1,119 @@
+# scripts/fake_openai_server.py
+#
+# Local OpenAI-compatible /v1/chat/completions server for exercising the
+# LLM scheduler (deadlines, hedging, 429 handling) without the real API.
+# Run from the repo root:
+#   python -m scripts.fake_openai_server --port 8001 --slow-rate 0.1 --error-rate 0.05
+# then start the app with
+#   OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake uvicorn main:app
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from models.serialization import dumps_str
+from scripts.fake_llm import FAKE_INTENT_JSON, _WORDS
+
+app = FastAPI(title="fake OpenAI")
+config = argparse.Namespace(latency_ms=300, jitter=0.3, slow_rate=0.0, slow_ms=8000,
+                            error_rate=0.0, output_tokens=80)
+
+
+def _delay() -> float:
+    if random.random() < config.slow_rate:
+        return config.slow_ms / 1000  # tail latency, what hedging is for
+    base = config.latency_ms / 1000
+    return max(0.0, base * (1 + random.uniform(-config.jitter, config.jitter)))
+
+
+def _reply(messages: list) -> str:
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    if "extract structured info" in prompt:
+        return FAKE_INTENT_JSON
+    return " ".join(random.choice(_WORDS) for _ in range(config.output_tokens))
+
+
+def _usage(messages: list, text: str) -> dict:
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = max(1, len(text) // 4)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages") or []
+    model = body.get("model", "fake")
+
+    if random.random() < config.error_rate:
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                       "code": "rate_limit_exceeded"}},
+            status_code=429, headers={"retry-after": "1"},
+        )
+
+    text = _reply(messages)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(_delay())
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": _usage(messages, text),
+        }
+
+    async def chunks():
+        words = text.split(" ")
+        per_word = _delay() / max(1, len(words))
+        for i, word in enumerate(words):
+            await asyncio.sleep(per_word)
+            delta = {"content": word if i == 0 else " " + word}
+            yield "data: " + dumps_str({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }) + "\n\n"
+        yield "data: " + dumps_str({
+            "id": completion_id, "object": "chat.completion.chunk", "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": _usage(messages, text),
+        }) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms)
+    parser.add_argument("--jitter", type=float, default=config.jitter)
+    parser.add_argument("--slow-rate", type=float, default=config.slow_rate,
+                        help="fraction of calls that take --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=config.slow_ms)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate,
+                        help="fraction of calls answered with HTTP 429")
+    parser.add_argument("--output-tokens", type=int, default=config.output_tokens)
+    args = parser.parse_args()
+    for name in vars(config):
+        setattr(config, name, getattr(args, name))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# scripts/generate_zkloci_data.py
+#
+# High-volume synthetic data generator for scale testing.
+#
+# Streams requests and proofResults into MongoDB from parallel worker
+# processes in large unordered insert_many batches (memory per worker is
+# bounded by --batch-size), then computes the denormalized requests.stats
+# and users.stats counters with server-side aggregations ($merge) and
+# rebuilds the data derived from proofResults (rollups, the trends
+# time-series mirror, unique-donor sketches), so every stats source
+# answers from the same proofs.
+#
+# Run from the repo root, e.g. 20M proofs:
+#   python -m scripts.generate_zkloci_data --providers 50 \
+#       --requests-per-provider 400 --proofs-per-request 1000 --workers 8 --drop
+
+import argparse
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from config import settings
+from db.mongo import REQUIRED_INDEXES, WINDOW_INDEXES
+from services import rollups
+from services.trends import TIMESERIES_COLL, rebuild_timeseries_mirror
+from services.user_sketches import SKETCHES, rebuild_sketches
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("MONGO_DB_NAME", "zk_loci")
+
+LOCALITIES = ["L1", "L2", "L3", "L4", "L5", "L6"]
+BLOOD_GROUPS = ["O+", "O-", "A+", "A-", "B+", "B-", "AB+", "AB-"]
+
+# Everything built from proofResults; --drop clears it with the raw data.
+DERIVED_COLLECTIONS = (
+    rollups.REQUEST_ROLLUPS, rollups.REQUEST_ROLLUP_USERS, rollups.DAILY_ROLLUPS,
+    rollups.DAILY_ROLLUP_USERS, rollups.ROLLUP_PROOFS, rollups.ROLLUP_STATE,
+    SKETCHES, TIMESERIES_COLL,
+)
+
+
+def _provider_name(i: int) -> str:
+    base = ["City Hospital Blood Drive", "Institution A", "Institution B"]
+    return base[i] if i < len(base) else f"Community Blood Drive {i}"
+
+
+def _proof_count(rng: random.Random, mean: int, distribution: str) -> int:
+    """Proofs for one request: fixed, uniform (0..2*mean) or lognormal around mean."""
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.randint(0, 2 * mean)
+    sigma = 1.0
+    return int(rng.lognormvariate(math.log(max(mean, 1)) - sigma ** 2 / 2, sigma))
+
+
+def _worker(job: dict) -> tuple:
+    """Generate and insert the requests/proofs for a range of providers."""
+    rng = random.Random(job["seed"])
+    client = MongoClient(job["uri"], w=1)
+    db = client[job["db_name"]]
+    requests_coll = db["requests"]
+    proofs_coll = db["proofResults"]
+
+    now = datetime.utcnow()
+    span_minutes = job["days"] * 1440
+    batch, request_batch = [], []
+    n_requests = n_proofs = 0
+
+    for p_idx in job["providers"]:
+        provider = _provider_name(p_idx)
+        provider_id = f"0xPROVIDER{p_idx:06d}"
+        for r_idx in range(job["requests_per_provider"]):
+            request_id = f"req-{p_idx:06d}-{r_idx:07d}"
+            created = now - timedelta(minutes=rng.randint(0, span_minutes))
+            group = rng.randrange(len(BLOOD_GROUPS))
+            # Per-request success rate drawn from Beta(a, b)
+            success_rate = rng.betavariate(job["success_alpha"], job["success_beta"])
+            request_batch.append({
+                "requestId": request_id,
+                "providerId": provider_id,
+                "providerName": provider,
+                "type": "bloodGroup",
+                "useCase": "blood_donation",
+                "locationRequirements": None,
+                "attributeRequirements": {"requiredBloodGroup": group},
+                "description": f"{BLOOD_GROUPS[group]} donors needed near {rng.choice(LOCALITIES)}",
+                "requestedData": ["blood_group"],
+                "status": "active",
+                "expiresAt": created + timedelta(days=7),
+                "createdAt": created,
+                "updatedAt": created,
+                "stats": {"totalProofs": 0, "successfulProofs": 0},
+            })
+            n_requests += 1
+
+            for i in range(_proof_count(rng, job["proofs_per_request"], job["proof_distribution"])):
+                user = f"0xUSER{rng.randrange(job['users'])}"
+                success = rng.random() < success_rate
+                # Recent requests would otherwise get proofs from the future.
+                ts = min(created + timedelta(seconds=rng.randint(0, 7 * 86400)), now)
+                batch.append({
+                    "proofId": f"{request_id}-{i:07d}",
+                    "requestId": request_id,
+                    "userId": user,
+                    "proofType": "bloodGroup",
+                    "result": success,
+                    "provider": provider,
+                    "providerAddress": provider_id,
+                    "metadata": {"requiredBloodGroup": group},
+                    "timestamp": int(ts.timestamp() * 1000),
+                    "createdAt": ts,
+                    "updatedAt": ts,
+                    "status": "verified" if success else "failed",
+                })
+                if len(batch) >= job["batch_size"]:
+                    proofs_coll.insert_many(batch, ordered=False)
+                    n_proofs += len(batch)
+                    batch = []
+
+            if len(request_batch) >= 1000:
+                requests_coll.insert_many(request_batch, ordered=False)
+                request_batch = []
+
+    if batch:
+        proofs_coll.insert_many(batch, ordered=False)
+        n_proofs += len(batch)
+    if request_batch:
+        requests_coll.insert_many(request_batch, ordered=False)
+    client.close()
+    return n_requests, n_proofs
+
+
+def compute_counters(db):
+    """Fill requests.stats and users.stats from proofResults on the server."""
+    db["requests"].create_index("requestId", unique=True)
+    db["users"].create_index("userId", unique=True)
+    success = {"$cond": [{"$eq": ["$result", True]}, 1, 0]}
+
+    db["proofResults"].aggregate([
+        {"$group": {
+            "_id": "$requestId",
+            "totalProofs": {"$sum": 1},
+            "successfulProofs": {"$sum": success},
+        }},
+        {"$project": {
+            "_id": 0,
+            "requestId": "$_id",
+            "stats": {"totalProofs": "$totalProofs", "successfulProofs": "$successfulProofs"},
+        }},
+        {"$merge": {"into": "requests", "on": "requestId",
+                    "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ], allowDiskUse=True)
+
+    now = datetime.utcnow()
+    db["proofResults"].aggregate([
+        {"$group": {
+            "_id": {"u": "$userId", "t": "$proofType"},
+            "totalProofs": {"$sum": 1},
+            "successfulProofs": {"$sum": success},
+            "lastActive": {"$max": "$createdAt"},
+            "firstSeen": {"$min": "$createdAt"},
+        }},
+        {"$group": {
+            "_id": "$_id.u",
+            "totalProofs": {"$sum": "$totalProofs"},
+            "successfulProofs": {"$sum": "$successfulProofs"},
+            "proofsByType": {"$push": {"k": "$_id.t", "v": "$totalProofs"}},
+            "lastActive": {"$max": "$lastActive"},
+            "createdAt": {"$min": "$firstSeen"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "userId": "$_id",
+            "stats": {
+                "totalProofs": "$totalProofs",
+                "successfulProofs": "$successfulProofs",
+                "proofsByType": {"$arrayToObject": "$proofsByType"},
+            },
+            "createdAt": 1,
+            "lastActive": 1,
+            "updatedAt": {"$literal": now},
+        }},
+        {"$merge": {"into": "users", "on": "userId",
+                    "whenMatched": "merge", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True)
+
+
+def generate(uri: str = MONGO_URI, db_name: str = DB_NAME, *, providers: int = 10,
+             requests_per_provider: int = 100, proofs_per_request: int = 100,
+             proof_distribution: str = "lognormal", users: int = 100_000, days: int = 90,
+             success_alpha: float = 8.0, success_beta: float = 2.0,
+             workers: int = os.cpu_count() or 4, batch_size: int = 10_000, seed: int = 42,
+             drop: bool = False):
+    """Load the synthetic dataset into `db_name`, then build indexes, counters and derived data."""
+    client = MongoClient(uri)
+    db = client[db_name]
+    if drop:
+        for name in ("requests", "proofResults", "users") + DERIVED_COLLECTIONS:
+            db[name].drop()
+
+    # Round-robin providers over workers so each gets a similar share.
+    jobs = [{
+        "uri": uri,
+        "db_name": db_name,
+        "providers": list(range(w, providers, workers)),
+        "seed": seed * 1000 + w,
+        "requests_per_provider": requests_per_provider,
+        "proofs_per_request": proofs_per_request,
+        "proof_distribution": proof_distribution,
+        "users": users,
+        "days": days,
+        "success_alpha": success_alpha,
+        "success_beta": success_beta,
+        "batch_size": batch_size,
+    } for w in range(workers)]
+    jobs = [j for j in jobs if j["providers"]]
+
+    start = time.perf_counter()
+    if len(jobs) == 1:
+        counts = [_worker(jobs[0])]
+    else:
+        with mp.Pool(len(jobs)) as pool:
+            counts = pool.map(_worker, jobs)
+    n_requests = sum(c[0] for c in counts)
+    n_proofs = sum(c[1] for c in counts)
+    load_secs = time.perf_counter() - start
+    print(f"Inserted {n_requests} requests and {n_proofs} proofs in {load_secs:.1f}s "
+          f"({n_proofs / max(load_secs, 1e-9):,.0f} proofs/s).")
+
+    # Build indexes after the bulk load: cheaper than maintaining them per insert.
+    for coll_name, keys in [*REQUIRED_INDEXES.items(), *WINDOW_INDEXES.items()]:
+        db[coll_name].create_index(keys)
+
+    start = time.perf_counter()
+    compute_counters(db)
+    print(f"Computed requests.stats and users.stats in {time.perf_counter() - start:.1f}s.")
+
+    start = time.perf_counter()
+    rebuild_derived(uri, db_name)
+    print(f"Rebuilt rollups, the time-series mirror and sketches in "
+          f"{time.perf_counter() - start:.1f}s.")
+    return n_requests, n_proofs
+
+
+def rebuild_derived(uri: str, db_name: str):
+    """Rebuild rollups, the trends mirror and sketches from proofResults."""
+    # The rebuilds go through the app's client (db.mongo), created on first use.
+    settings.MONGO_URI, settings.MONGO_DB_NAME = uri, db_name
+    rollups.rebuild_rollups()
+    rebuild_timeseries_mirror()  # $out creates the time-series collection
+    rebuild_sketches()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate large synthetic zk-loci datasets.")
+    parser.add_argument("--providers", type=int, default=10)
+    parser.add_argument("--requests-per-provider", type=int, default=100)
+    parser.add_argument("--proofs-per-request", type=int, default=100,
+                        help="Mean proofs per request")
+    parser.add_argument("--proof-distribution", choices=["fixed", "uniform", "lognormal"],
+                        default="lognormal")
+    parser.add_argument("--users", type=int, default=100_000, help="User cardinality")
+    parser.add_argument("--days", type=int, default=90, help="Time span of requests")
+    parser.add_argument("--success-alpha", type=float, default=8.0,
+                        help="Beta(alpha, beta) per-request success rate")
+    parser.add_argument("--success-beta", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="Drop the collections first")
+    args = parser.parse_args()
+    generate(**vars(args))
+
+
+if __name__ == "__main__":
+    main()
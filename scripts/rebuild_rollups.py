@@ -0,0 +1,29 @@
+# scripts/rebuild_rollups.py
+#
+# Backfill / rebuild the rollup collections (and, when enabled, the
+# time-series mirror and unique-donor sketches) from proofResults.
+# Run from the repo root:  python -m scripts.rebuild_rollups
+
+from config import settings
+from db.mongo import check_health
+from services.rollups import rebuild_rollups
+from services.trends import rebuild_timeseries_mirror
+from services.user_sketches import rebuild_sketches
+
+
+def main():
+    if not check_health():
+        print("MongoDB is not available; nothing to rebuild.")
+        return
+    rebuild_rollups()
+    print("Rebuilt requestRollups and dailyRollups successfully.")
+    if settings.TRENDS_TIMESERIES:
+        rebuild_timeseries_mirror()
+        print("Rebuilt the proofResultsTS time-series mirror.")
+    if settings.USER_SKETCHES:
+        rebuild_sketches()
+        print("Rebuilt unique-donor sketches.")
+
+
+if __name__ == "__main__":
+    main()
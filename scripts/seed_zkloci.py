@@ -1,4 +1,5 @@
 # scripts/seed_zkloci.py
+import argparse
 import os
 from datetime import datetime, timedelta
 import random
@@ -173,5 +174,37 @@ def seed():
 
     print("Seeded zk-loci mock data successfully.")
 
+def seed_scaled(n_providers: int = 5, requests_per_provider: int = 20,
+                proofs_per_request: int = 50, n_users: int = 2000,
+                days: int = 30, success_rate: float = 0.85,
+                uri: str = MONGO_URI, db_name: str = DB_NAME, seed_value: int = 42):
+    """
+    Scalable variant of seed(): a fixed number of proofs per request from
+    scripts/generate_zkloci_data, in one process, after dropping the old
+    data. Used by the benchmark harness to fill a local MongoDB.
+    """
+    from scripts.generate_zkloci_data import generate
+
+    # Beta(a, b) per-request success rates with mean `success_rate`.
+    generate(uri, db_name, providers=n_providers, requests_per_provider=requests_per_provider,
+             proofs_per_request=proofs_per_request, proof_distribution="fixed",
+             users=n_users, days=days, success_alpha=max(10 * success_rate, 0.01),
+             success_beta=max(10 * (1 - success_rate), 0.01), workers=1, seed=seed_value, drop=True)
+
+
 if __name__ == "__main__":
-    seed()
+    parser = argparse.ArgumentParser(description="Seed zk-loci mock data.")
+    parser.add_argument("--scale", action="store_true",
+                        help="Use seed_scaled() with the sizes below instead of the tiny demo set.")
+    parser.add_argument("--providers", type=int, default=5)
+    parser.add_argument("--requests-per-provider", type=int, default=20)
+    parser.add_argument("--proofs-per-request", type=int, default=50)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.scale:
+        seed_scaled(args.providers, args.requests_per_provider,
+                    args.proofs_per_request, args.users, args.days)
+    else:
+        seed()
@@ -0,0 +1,138 @@
+# services/comparison.py
+
+import re
+from datetime import datetime, timedelta
+from itertools import product
+
+from config import settings
+from db.mongo import is_available
+from db.mongo_async import get_async_collection
+from services.metrics import mongo_documents, stats_source
+from services.verification_analytics import request_stats_stages
+
+# Comparison questions ("Institution A vs B over the last 7 and 30 days")
+# answered as one matrix: every provider x locality x window combination
+# is a $facet branch over the same joined request set, so the whole table
+# costs one aggregation. Localities are only recorded in request
+# descriptions ("... donors needed near L1"), so they match on that.
+
+COLUMNS = ["provider", "locality", "windowDays", "requests",
+           "totalProofs", "successfulProofs", "successRate"]
+
+
+def is_comparison(intent: dict) -> bool:
+    return any(intent.get(k) for k in ("providerNames", "localities", "timeWindowsDays"))
+
+
+def _axes(intent: dict) -> tuple:
+    providers = intent.get("providerNames") or [intent.get("providerName")]
+    localities = intent.get("localities") or [intent.get("locality")]
+    windows = intent.get("timeWindowsDays") or [intent.get("timeWindowDays") or 7]
+    return providers, localities, windows
+
+
+def _cells(intent: dict) -> list:
+    cells = list(product(*_axes(intent)))
+    if len(cells) > settings.COMPARISON_MAX_CELLS:
+        raise ValueError(
+            f"Comparison too large ({len(cells)} combinations, "
+            f"max {settings.COMPARISON_MAX_CELLS})."
+        )
+    return cells
+
+
+def _locality_filter(locality: str) -> dict:
+    return {"description": {"$regex": rf"\b{re.escape(locality)}\b", "$options": "i"}}
+
+
+def _comparison_pipeline(intent: dict, cells: list, now: datetime) -> list:
+    providers, _, windows = _axes(intent)
+    match = {"createdAt": {"$gte": now - timedelta(days=max(windows))}}
+    if all(providers):
+        match["providerName"] = {"$in": providers}
+    if intent.get("useCase"):
+        match["useCase"] = intent["useCase"]
+
+    facets = {}
+    for i, (provider, locality, days) in enumerate(cells):
+        cell_match = {"createdAt": {"$gte": now - timedelta(days=days)}}
+        if provider:
+            cell_match["providerName"] = provider
+        if locality:
+            cell_match.update(_locality_filter(locality))
+        facets[f"c{i}"] = [
+            {"$match": cell_match},
+            {"$group": {
+                "_id": None,
+                "requests": {"$sum": 1},
+                "totalProofs": {"$sum": "$stats.totalProofs"},
+                "successfulProofs": {"$sum": "$stats.successfulProofs"},
+            }},
+        ]
+
+    # Proof counters are joined once per request (widest window), then
+    # every cell filters and sums that same set.
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "requestId": 1, "providerName": 1,
+                      "description": 1, "createdAt": 1}},
+    ] + request_stats_stages() + [
+        {"$project": {"providerName": 1, "description": 1, "createdAt": 1, "stats": 1}},
+        {"$facet": facets},
+    ]
+
+
+def _row(cell: tuple, totals: dict) -> list:
+    provider, locality, days = cell
+    total = totals.get("totalProofs", 0)
+    successful = totals.get("successfulProofs", 0)
+    return [provider, locality, days, totals.get("requests", 0), total, successful,
+            round(successful / total, 3) if total else 0.0]
+
+
+def _comparison_result(intent: dict, cells: list, cell_totals: list) -> dict:
+    providers, localities, windows = _axes(intent)
+    return {
+        "providerNames": [p for p in providers if p] or None,
+        "useCase": intent.get("useCase"),
+        "localities": [loc for loc in localities if loc] or None,
+        "timeWindowsDays": windows,
+        # Compact table for the answer prompt: one row per combination.
+        "comparison": {
+            "columns": COLUMNS,
+            "rows": [_row(c, t) for c, t in zip(cells, cell_totals)],
+        },
+    }
+
+
+def _demo_mock_totals(cell: tuple, i: int) -> dict:
+    _, _, days = cell
+    total = (40 + 9 * (i % 4)) * max(1, days // 7)
+    return {"requests": max(1, days // 7), "totalProofs": total,
+            "successfulProofs": int(total * (0.9 + 0.02 * (i % 3)))}
+
+
+async def aget_comparison_stats(intent: dict) -> dict:
+    """
+    Stats for every provider x locality x window combination in `intent`
+    from one faceted aggregation. Raises ValueError when the matrix has
+    more than COMPARISON_MAX_CELLS combinations.
+    """
+    cells = _cells(intent)
+    if not is_available():
+        stats_source.inc(source="mock")
+        return _comparison_result(
+            intent, cells, [_demo_mock_totals(c, i) for i, c in enumerate(cells)]
+        )
+
+    cursor = await get_async_collection("requests").aggregate(
+        _comparison_pipeline(intent, cells, datetime.utcnow())
+    )
+    facets = (await cursor.to_list(length=1) or [{}])[0]
+    stats_source.inc(source="comparison")
+    cell_totals = [(facets.get(f"c{i}") or [{}])[0] for i in range(len(cells))]
+    mongo_documents.inc(
+        max((t.get("requests", 0) for t in cell_totals), default=0),
+        collection="requests", kind="scanned",
+    )
+    return _comparison_result(intent, cells, cell_totals)
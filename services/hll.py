@@ -0,0 +1,87 @@
+# services/hll.py
+
+import hashlib
+import math
+
+import numpy as np
+
+# HyperLogLog sketch for approximate distinct counts (unique donors).
+#
+# With precision p the sketch has m = 2**p one-byte registers and a
+# relative standard error of about 1.04 / sqrt(m). The default p = 12
+# uses 4 KiB per sketch and gives ~1.6% standard error (~3.3% at 95%).
+# Sketches with the same precision merge losslessly (register-wise max),
+# so any set of per-day sketches can be combined into a window estimate.
+# Registers are a numpy uint8 array: merges and estimates are vectorized,
+# and count_many() estimates a whole batch of stored sketches at once.
+
+DEFAULT_PRECISION = 12
+
+
+def standard_error(precision: int = DEFAULT_PRECISION) -> float:
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _estimates(registers: np.ndarray) -> np.ndarray:
+    """Cardinality estimates for the rows of a (n, m) uint8 register array."""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.power(2.0, -registers.astype(np.float64)).sum(axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    # Small-range correction: linear counting
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.rint(np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)).astype(np.int64)
+
+
+def count_many(blobs: list, precision: int = DEFAULT_PRECISION) -> list:
+    """Estimates for stored sketches (register bytes), in one vectorized pass."""
+    m = 1 << precision
+    if any(len(b) != m for b in blobs):
+        raise ValueError(f"Expected {m} registers per sketch.")
+    registers = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), m)
+    return _estimates(registers).tolist()
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: bytes = None):
+        self.p = precision
+        self.m = 1 << precision
+        if registers:
+            self.registers = np.frombuffer(registers, dtype=np.uint8).copy()
+        else:
+            self.registers = np.zeros(self.m, dtype=np.uint8)
+        if len(self.registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(self.registers)}.")
+
+    def add(self, value: str):
+        x = _hash64(value)
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        # Position of the leftmost 1-bit in the remaining 64 - p bits
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("Cannot merge sketches with different precision.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def covers(self, other: "HyperLogLog") -> bool:
+        """True if merging `other` would not change this sketch."""
+        return bool(np.all(self.registers >= other.registers))
+
+    def count(self) -> int:
+        return int(_estimates(self.registers))
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        return cls(precision, data)
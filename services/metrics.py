@@ -0,0 +1,181 @@
+# services/metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Minimal in-process metrics with Prometheus text exposition, so the
+# pipeline can be left instrumented in production without an extra
+# dependency. Everything is a dict update under a lock.
+
+_DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    """Label value escaping from the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labels: tuple, values: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(labels, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(k, "")) for k in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (),
+                 buckets: tuple = _DEFAULT_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._values: dict = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(k, "")) for k in self.labels)
+        with self._lock:
+            v = self._values.get(key)
+            if v is None:
+                v = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    v[i] += 1
+            v[-2] += value
+            v[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, v):
+                    le = _label_str(self.labels + ("le",), key + (str(bound),))
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                inf = _label_str(self.labels + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{inf} {v[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {v[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labels, key)} {v[-1]}")
+        return lines
+
+
+class CallbackMetric:
+    """Metric whose samples are read from `fn` at scrape time."""
+
+    def __init__(self, name: str, help: str, labels: tuple,
+                 fn: Callable[[], dict], type: str = "gauge"):
+        self.name, self.help, self.labels, self.fn, self.type = name, help, labels, fn, type
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, value in sorted(self.fn().items()):
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+_registry: list = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- pipeline metrics ----
+
+stage_seconds = register(Histogram(
+    "zkloci_stage_seconds", "Time spent per /analytics/query pipeline stage.", ("stage",)))
+llm_tokens = register(Counter(
+    "zkloci_llm_tokens_total", "LLM tokens used, by chain and kind.", ("chain", "kind")))
+mongo_documents = register(Counter(
+    "zkloci_mongo_documents_total",
+    "Documents scanned and returned by stats queries.", ("collection", "kind")))
+stats_source = register(Counter(
+    "zkloci_stats_source_total", "Stats requests by data path.", ("source",)))
+intent_source = register(Counter(
+    "zkloci_intent_source_total", "Intents by extractor (rules, cache, llm).", ("source",)))
+answer_source = register(Counter(
+    "zkloci_answer_source_total", "Answers by generator (template, llm).", ("source",)))
+
+
+# ---- per-request timing breakdown ----
+
+_request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> dict:
+    """Collect stage timings for the current request/task into a dict."""
+    timings: dict = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into zkloci_stage_seconds and the request breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + elapsed * 1000, 3)
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """
+    LangChain callback that counts prompt/completion tokens per chain and
+    optionally reports each completion's total to `on_usage` (the LLM
+    scheduler's token bucket).
+    """
+
+    def __init__(self, chain: str, on_usage: Callable[[int], None] = None):
+        self.chain = chain
+        self.on_usage = on_usage
+
+    def on_llm_end(self, response, **kwargs):
+        prompt = completion = 0
+        for generations in response.generations:
+            for gen in generations:
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt += usage.get("input_tokens", 0)
+                    completion += usage.get("output_tokens", 0)
+        if not (prompt or completion):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt = usage.get("prompt_tokens", 0)
+            completion = usage.get("completion_tokens", 0)
+        llm_tokens.inc(prompt, chain=self.chain, kind="prompt")
+        llm_tokens.inc(completion, chain=self.chain, kind="completion")
+        if self.on_usage is not None:
+            self.on_usage(prompt + completion)
@@ -0,0 +1,270 @@
+# services/proof_ingest.py
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from config import settings
+from db.mongo_async import get_async_client, get_async_collection
+from models.proofs import ProofResultIn
+from models.serialization import loads
+from services.rollups import record_proofs
+from services.trends import TIMESERIES_COLL, timeseries_docs
+from services.user_sketches import aupdate_sketches
+
+logger = logging.getLogger(__name__)
+
+# Proofs are stored with countersApplied=False and claimed (set to a
+# per-batch id) in the same transaction that adds them to requests.stats
+# and users.stats, so a batch retried after a failure counts exactly the
+# proofs that were not counted yet.
+#
+# The writes that follow the counters (time-series mirror, sketches,
+# rollups) each have their own flag, stored False with the proof and set
+# True once that write succeeded. A write that fails releases its claim,
+# so the retried batch redoes it even though the counters are done.
+_SIDE_WRITES = ("mirrorApplied", "sketchesApplied", "rollupsApplied")
+_ILLEGAL_OPERATION = 20  # transactions on a standalone server
+
+# Cleared the first time the server turns out not to support transactions.
+_use_transactions = True
+
+
+def parse_proofs_body(body: bytes, content_type: str) -> list:
+    """
+    Decode a bulk body: NDJSON (one proof per line) or a JSON array
+    (also accepted wrapped as {"proofs": [...]}).
+    """
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return [loads(line) for line in body.splitlines() if line.strip()]
+
+    data = loads(body) if body.strip() else []
+    if isinstance(data, dict):
+        data = data.get("proofs", [])
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of proofs.")
+    return data
+
+
+def validate_proofs(items: list) -> tuple[list, list]:
+    """Return (valid proof documents, [{index, error}]) in input order."""
+    now = datetime.utcnow()
+    valid, errors = [], []
+    for i, item in enumerate(items):
+        try:
+            proof = ProofResultIn.model_validate(item)
+        except ValidationError as e:
+            errors.append({"index": i, "error": str(e.errors()[0].get("msg", e))})
+            continue
+        doc = proof.model_dump()
+        doc["createdAt"] = doc.get("createdAt") or now
+        doc["updatedAt"] = now
+        valid.append(doc)
+    return valid, errors
+
+
+def _counter_updates(new_proofs: list) -> tuple[list, list]:
+    """$inc updates for requests.stats and users.stats from new proofs."""
+    per_request: dict = {}
+    per_user: dict = {}
+    for p in new_proofs:
+        success = 1 if p["result"] is True else 0
+        inc = per_request.setdefault(p["requestId"], {"stats.totalProofs": 0, "stats.successfulProofs": 0})
+        inc["stats.totalProofs"] += 1
+        inc["stats.successfulProofs"] += success
+
+        user = p.get("userId")
+        if user:
+            u = per_user.setdefault(user, {"inc": {"stats.totalProofs": 0, "stats.successfulProofs": 0},
+                                           "lastActive": p["createdAt"]})
+            u["inc"]["stats.totalProofs"] += 1
+            u["inc"]["stats.successfulProofs"] += success
+            if p.get("proofType"):
+                key = f"stats.proofsByType.{p['proofType']}"
+                u["inc"][key] = u["inc"].get(key, 0) + 1
+            u["lastActive"] = max(u["lastActive"], p["createdAt"])
+
+    now = datetime.utcnow()
+    request_ops = [
+        UpdateOne({"requestId": rid}, {"$inc": inc, "$set": {"updatedAt": now}})
+        for rid, inc in per_request.items()
+    ]
+    user_ops = [
+        UpdateOne(
+            {"userId": user},
+            {"$inc": u["inc"],
+             "$max": {"lastActive": u["lastActive"]},
+             "$set": {"updatedAt": now},
+             "$setOnInsert": {"createdAt": now}},
+            upsert=True,
+        )
+        for user, u in per_user.items()
+    ]
+    return request_ops, user_ops
+
+
+async def _count_pending(proof_ids: list, session=None) -> list:
+    """
+    Claim the proofs among `proof_ids` whose counters are not applied yet
+    and add them to requests.stats / users.stats. Returns the claimed
+    proof documents.
+    """
+    proofs = get_async_collection("proofResults")
+    claim = uuid.uuid4().hex
+    await proofs.update_many(
+        {"proofId": {"$in": proof_ids}, "countersApplied": False},
+        {"$set": {"countersApplied": claim}},
+        session=session,
+    )
+    pending = await proofs.find(
+        {"proofId": {"$in": proof_ids}, "countersApplied": claim},
+        {"_id": 0, "countersApplied": 0},
+        session=session,
+    ).to_list(length=None)
+    if not pending:
+        return []
+
+    request_ops, user_ops = _counter_updates(pending)
+    await get_async_collection("requests").bulk_write(request_ops, ordered=False, session=session)
+    if user_ops:
+        await get_async_collection("users").bulk_write(user_ops, ordered=False, session=session)
+    return pending
+
+
+async def _apply_counters(proof_ids: list) -> list:
+    """
+    _count_pending in a transaction. A standalone server has none: the
+    claim then comes first, so a failure before the counter writes loses
+    those counts instead of counting them twice on retry.
+    """
+    global _use_transactions
+    if _use_transactions:
+        try:
+            async with get_async_client().start_session() as session:
+                return await session.with_transaction(lambda s: _count_pending(proof_ids, s))
+        except OperationFailure as e:
+            if e.code != _ILLEGAL_OPERATION:
+                raise
+            _use_transactions = False
+            logger.info("MongoDB does not support transactions; proof counters are claimed first.")
+    return await _count_pending(proof_ids)
+
+
+def _side_writes() -> dict:
+    """Flags of the enabled side writes, as stored on a new proof."""
+    enabled = (settings.TRENDS_TIMESERIES, settings.USER_SKETCHES,
+               # The change-stream watcher covers rollups when it is running.
+               settings.STATS_SOURCE == "rollups" and not settings.ROLLUPS_WATCH)
+    return {flag: False for flag, on in zip(_SIDE_WRITES, enabled) if on}
+
+
+async def _apply_pending(flag: str, proof_ids: list, write):
+    """
+    Claim the proofs among `proof_ids` with `flag` False and pass them to
+    `write`. On success the flag becomes True; on failure the claim is
+    released and the error re-raised, so a retry applies them again.
+    """
+    proofs = get_async_collection("proofResults")
+    claim = uuid.uuid4().hex
+    await proofs.update_many({"proofId": {"$in": proof_ids}, flag: False}, {"$set": {flag: claim}})
+    pending = await proofs.find(
+        {"proofId": {"$in": proof_ids}, flag: claim}, {"_id": 0, "countersApplied": 0, **{f: 0 for f in _SIDE_WRITES}},
+    ).to_list(length=None)
+    if not pending:
+        return
+    try:
+        await write(pending)
+    except Exception:
+        await proofs.update_many({flag: claim}, {"$set": {flag: False}})
+        raise
+    await proofs.update_many({flag: claim}, {"$set": {flag: True}})
+
+
+async def _request_meta(proofs: list) -> dict:
+    cursor = get_async_collection("requests").find(
+        {"requestId": {"$in": list({p["requestId"] for p in proofs})}},
+        {"_id": 0, "requestId": 1, "providerName": 1, "useCase": 1},
+    )
+    return {r["requestId"]: r async for r in cursor}
+
+
+async def _write_mirror(proofs: list):
+    await get_async_collection(TIMESERIES_COLL).insert_many(
+        timeseries_docs(proofs, await _request_meta(proofs)), ordered=False
+    )
+
+
+async def _write_sketches(proofs: list):
+    await aupdate_sketches(proofs, await _request_meta(proofs))
+
+
+async def _write_rollups(proofs: list):
+    await asyncio.to_thread(record_proofs, proofs)
+
+
+async def _ingest_batch(batch: list) -> int:
+    """
+    Write one batch idempotently and apply counters for the new proofs.
+
+    Each proof is an upsert on proofId with $setOnInsert, so a re-delivered
+    proof matches the existing document and is not stored twice. Counters
+    follow for the proofs not counted yet, which includes proofs stored by
+    an earlier attempt that failed before its counters were applied; the
+    time-series, sketch and rollup writes likewise for the proofs each of
+    them has not applied yet. Returns how many proofs were newly stored.
+    """
+    proofs = get_async_collection("proofResults")
+    side_writes = _side_writes()
+    result = await proofs.bulk_write(
+        [
+            UpdateOne(
+                {"proofId": p["proofId"]},
+                {"$setOnInsert": {
+                    **{k: v for k, v in p.items() if k != "proofId"},
+                    "countersApplied": False,
+                    **side_writes,
+                }},
+                upsert=True,
+            )
+            for p in batch
+        ],
+        ordered=False,
+    )
+    proof_ids = [p["proofId"] for p in batch]
+    await _apply_counters(proof_ids)
+
+    writers = {"mirrorApplied": _write_mirror, "sketchesApplied": _write_sketches,
+               "rollupsApplied": _write_rollups}
+    for flag in side_writes:
+        await _apply_pending(flag, proof_ids, writers[flag])
+    return len(result.upserted_ids)
+
+
+async def ingest_proofs(proofs: list) -> tuple[int, int]:
+    """
+    Ingest validated proof documents in bounded concurrent batches.
+
+    Returns (inserted, duplicates). Duplicates include proofIds repeated
+    within the same request body.
+    """
+    unique: dict = {}
+    for p in proofs:
+        unique.setdefault(p["proofId"], p)
+    docs = list(unique.values())
+
+    size = settings.INGEST_BATCH_SIZE
+    sem = asyncio.Semaphore(settings.INGEST_MAX_CONCURRENCY)
+
+    async def run(batch):
+        async with sem:
+            return await _ingest_batch(batch)
+
+    inserted = sum(await asyncio.gather(
+        *(run(docs[i:i + size]) for i in range(0, len(docs), size))
+    ))
+    return inserted, len(proofs) - inserted
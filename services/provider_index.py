@@ -0,0 +1,227 @@
+# services/provider_index.py
+
+import logging
+import re
+import threading
+
+from config import settings
+from db.mongo import get_collection, is_available
+from services.metrics import Counter, register
+
+logger = logging.getLogger(__name__)
+
+# In-memory resolution of the provider names an intent mentions to the
+# canonical names stored in `requests` (localities are normalized to the
+# stored "L<n>" form).
+#
+# The LLM (and operators) rarely spell a provider exactly as it is stored:
+# "City Hospital" for "City Hospital Blood Drive", "Metro office" for
+# "Metro Office Attendance". An exact providerName filter then matches
+# nothing. The index holds every distinct providerName (institutions
+# included). A question name is resolved by trigram overlap before the
+# stats query runs, and every stats path (raw, rollups, snapshot, trends,
+# comparisons) filters on the stored name it resolves to. providerId is
+# not used: one provider address runs several campaigns under different
+# names, and only the raw path could filter on it.
+#
+# The index is fed incrementally: each refresh reads only requests with
+# _id above the last one seen, so keeping it current costs one indexed
+# range scan every PROVIDER_INDEX_REFRESH_SECONDS. It is also the catalog
+# behind the rule-based intent gazetteer (llm/intent_rules.py).
+
+DEFAULT_PROVIDERS = [
+    "City Hospital Blood Drive",
+    "Metro Office Attendance",
+    "Institution A",
+    "Institution B",
+]
+
+resolutions = register(Counter(
+    "zkloci_provider_resolutions_total",
+    "Provider names resolved by the index (exact, fuzzy, miss).",
+    ("outcome",),
+))
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_LOCALITY_RE = re.compile(r"(?<![a-z0-9])(?:l|locality\s*)(\d+)(?![a-z0-9])", re.I)
+
+# Resolved names are memoized; the memo is dropped when it grows past this.
+_MEMO_SIZE = 4096
+
+
+def normalize_name(name: str) -> str:
+    return _NON_ALNUM_RE.sub(" ", (name or "").lower()).strip()
+
+
+def trigrams(name: str) -> set:
+    """Character trigrams of a normalized name, padded so short words count."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def normalize_locality(value: str):
+    """"L3", "l 3", "Locality 3" -> "L3"; None if it is not a locality."""
+    m = _LOCALITY_RE.search(value or "")
+    return f"L{m.group(1)}" if m else None
+
+
+class ProviderIndex:
+    """
+    Trigram index over provider names, refreshed incrementally from
+    `requests`. Lookups are dictionary hits for known spellings and a
+    postings-list scan over the name's trigrams otherwise.
+    """
+
+    def __init__(self, min_score: float):
+        self.min_score = min_score
+        self._names: list = []            # entry -> canonical providerName
+        self._grams: list = []            # entry -> trigram count
+        self._by_name: dict = {}          # normalized name -> entry
+        self._postings: dict = {}         # trigram -> [entry, ...]
+        self._memo: dict = {}
+        self._watermark = None
+        self._lock = threading.Lock()
+        for name in DEFAULT_PROVIDERS:
+            self._add(name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def names(self) -> list:
+        """Every indexed providerName, in the order first seen."""
+        with self._lock:
+            return list(self._names)
+
+    def _add(self, name: str):
+        key = normalize_name(name)
+        if not key or key in self._by_name:
+            return
+        entry = len(self._names)
+        grams = trigrams(key)
+        self._names.append(name)
+        self._grams.append(len(grams))
+        self._by_name[key] = entry
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry)
+
+    def refresh(self) -> int:
+        """Index requests created since the last refresh; returns how many."""
+        if not is_available():
+            return 0
+        query = {} if self._watermark is None else {"_id": {"$gt": self._watermark}}
+        cursor = get_collection("requests").find(
+            query,
+            {"providerName": 1},
+            sort=[("_id", 1)],
+            batch_size=settings.STATS_CURSOR_BATCH_SIZE,
+        )
+        seen = 0
+        for r in cursor:
+            with self._lock:
+                if r.get("providerName"):
+                    self._add(r["providerName"])
+                self._watermark = r["_id"]
+            seen += 1
+        if seen:
+            with self._lock:
+                self._memo.clear()
+            logger.info(f"Provider index: {seen} new requests, {len(self)} names.")
+        return seen
+
+    def _search(self, key: str):
+        grams = trigrams(key)
+        overlap: dict = {}
+        for gram in grams:
+            for entry in self._postings.get(gram, ()):
+                overlap[entry] = overlap.get(entry, 0) + 1
+        # Letters and numbers ("Institution B", "Ward 12") carry almost no
+        # trigram weight but are what tells providers apart: require them.
+        markers = [t for t in key.split() if len(t) <= 2 or t.isdigit()]
+        best, best_score, runner_up = None, 0.0, 0.0
+        for entry, shared in overlap.items():
+            if markers:
+                tokens = normalize_name(self._names[entry]).split()
+                if not all(t in tokens for t in markers):
+                    continue
+            # Mean of containment (how much of the question name the
+            # candidate covers: "City Hospital" in "City Hospital Blood
+            # Drive") and Dice (penalizes much longer candidates).
+            dice = 2 * shared / (len(grams) + self._grams[entry])
+            score = (shared / len(grams) + dice) / 2
+            if score > best_score:
+                best, best_score, runner_up = entry, score, best_score
+            elif score > runner_up:
+                runner_up = score
+        if best_score - runner_up < 1e-9:
+            return None, 0.0  # tie ("Institution" alone): ambiguous, do not guess
+        return best, best_score
+
+    def resolve(self, name: str):
+        """
+        Canonical providerName for a name as written in a question, or None
+        when nothing scores at least min_score.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+            entry = self._by_name.get(key)
+            outcome = "exact"
+            if entry is None:
+                entry, score = self._search(key)
+                outcome = "fuzzy" if entry is not None and score >= self.min_score else "miss"
+            result = None if outcome == "miss" else self._names[entry]
+            if len(self._memo) >= _MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = result
+        resolutions.inc(outcome=outcome)
+        return result
+
+    def resolve_intent(self, intent: dict) -> dict:
+        """
+        Copy of `intent` with provider names and localities canonicalized
+        for the stats queries. Names the index cannot match are kept as
+        written.
+        """
+        intent = dict(intent)
+        names = intent.get("providerNames")
+        if intent.get("providerName"):
+            intent["providerName"] = self.resolve(intent["providerName"]) or intent["providerName"]
+        if names:
+            # "City Hospital vs City Hospital Blood Drive" is one provider.
+            matches = list(dict.fromkeys(self.resolve(n) or n for n in names))
+            intent["providerNames"] = matches if len(matches) > 1 else None
+        if intent.get("locality"):
+            intent["locality"] = normalize_locality(intent["locality"]) or intent["locality"]
+        if intent.get("localities"):
+            intent["localities"] = [normalize_locality(x) or x for x in intent["localities"]]
+        return intent
+
+
+provider_index = ProviderIndex(settings.PROVIDER_MATCH_MIN_SCORE)
+
+
+def resolve_intent(intent: dict) -> dict:
+    return provider_index.resolve_intent(intent)
+
+
+def start_provider_index_refresher() -> threading.Event:
+    """
+    Keep provider_index current in a daemon thread, polling for new
+    requests every PROVIDER_INDEX_REFRESH_SECONDS. Set the returned event
+    to stop it.
+    """
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.is_set():
+            try:
+                provider_index.refresh()
+            except Exception as e:
+                logger.error(f"Provider index refresh failed: {e}")
+            stop_event.wait(settings.PROVIDER_INDEX_REFRESH_SECONDS)
+
+    threading.Thread(target=run, name="provider-index", daemon=True).start()
+    return stop_event
@@ -0,0 +1,403 @@
+# services/rollups.py
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+
+from config import settings
+from db.mongo import get_client, get_collection, is_available
+from db.mongo_async import get_async_collection
+
+logger = logging.getLogger(__name__)
+
+# Incrementally maintained counters so stats queries don't re-aggregate
+# raw proofResults:
+#
+#   requestRollups      _id = requestId
+#                       {providerName, useCase, totalProofs, successfulProofs, uniqueUsers}
+#   dailyRollups        _id = {p: providerName, c: useCase, d: day}
+#                       {providerName, useCase, day, totalProofs, successfulProofs, uniqueUsers}
+#
+# Unique users are kept exact with marker collections: a marker is
+# inserted once per (request, user) / (provider, use case, day, user) and
+# the uniqueUsers counter is only incremented when the insert is new.
+# Proofs themselves get a marker too (rollupProofs, _id = proofId), so a
+# batch that is applied twice (watcher restart, ingest retry) only counts
+# the proofs that were not applied before.
+
+REQUEST_ROLLUPS = "requestRollups"
+REQUEST_ROLLUP_USERS = "requestRollupUsers"
+DAILY_ROLLUPS = "dailyRollups"
+DAILY_ROLLUP_USERS = "dailyRollupUsers"
+ROLLUP_PROOFS = "rollupProofs"
+ROLLUP_STATE = "rollupState"
+
+_DUPLICATE_KEY = 11000
+_ILLEGAL_OPERATION = 20  # transactions on a standalone server
+
+# Cleared the first time the server turns out not to support transactions.
+_use_transactions = True
+
+
+def _day(ts) -> datetime:
+    ts = ts or datetime.utcnow()
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def _marker_key(marker):
+    return tuple(marker.items()) if isinstance(marker, dict) else marker
+
+
+def _insert_markers(coll, markers: list, session=None) -> set:
+    """Insert marker _ids; return the indexes of the ones that were new."""
+    if not markers:
+        return set()
+    if session is None:
+        new = set(range(len(markers)))
+        try:
+            coll.insert_many([{"_id": m} for m in markers], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                if err.get("code") != _DUPLICATE_KEY:
+                    raise
+                new.discard(err["index"])
+        return new
+
+    # A duplicate key error aborts the transaction: look the markers up first.
+    seen = {
+        _marker_key(m["_id"])
+        for m in coll.find({"_id": {"$in": markers}}, {"_id": 1}, session=session)
+    }
+    new = set()
+    for i, m in enumerate(markers):
+        if _marker_key(m) not in seen:
+            seen.add(_marker_key(m))
+            new.add(i)
+    if new:
+        coll.insert_many([{"_id": markers[i]} for i in sorted(new)], session=session)
+    return new
+
+
+def record_proofs(proofs: list):
+    """
+    Ingest hook: apply a batch of stored proofResults to the rollups.
+
+    Each proof is applied at most once (keyed on proofId), so replaying a
+    batch is safe. On a replica set the markers and counters are written
+    in one transaction. On a standalone server the proof markers go first
+    and only the proofs whose marker was new are counted: a crash between
+    the two writes loses that batch's counts (rebuild_rollups restores
+    them) but never double counts.
+    """
+    global _use_transactions
+    if not is_available() or not proofs:
+        return
+
+    if _use_transactions:
+        try:
+            with get_client().start_session() as session:
+                session.with_transaction(lambda s: _apply_proofs(proofs, s))
+            return
+        except OperationFailure as e:
+            if e.code != _ILLEGAL_OPERATION:
+                raise
+            _use_transactions = False
+            logger.info("MongoDB does not support transactions; rollups dedupe on proof markers only.")
+    _apply_proofs(proofs, None)
+
+
+def _apply_proofs(proofs: list, session):
+    new = _insert_markers(
+        get_collection(ROLLUP_PROOFS),
+        [p.get("proofId") or p.get("_id") for p in proofs],
+        session,
+    )
+    proofs = [proofs[i] for i in sorted(new)]
+    if not proofs:
+        return
+
+    request_ids = list({p["requestId"] for p in proofs if p.get("requestId")})
+    meta = {
+        r["requestId"]: r
+        for r in get_collection("requests").find(
+            {"requestId": {"$in": request_ids}},
+            {"_id": 0, "requestId": 1, "providerName": 1, "useCase": 1},
+            session=session,
+        )
+    }
+
+    request_inc: dict = {}
+    daily_inc: dict = {}
+    request_markers, request_marker_keys = [], []
+    daily_markers, daily_marker_keys = [], []
+
+    for p in proofs:
+        rid = p.get("requestId")
+        r = meta.get(rid, {})
+        provider = r.get("providerName") or p.get("provider")
+        use_case = r.get("useCase")
+        day = _day(p.get("createdAt"))
+        success = 1 if p.get("result") is True else 0
+        user = p.get("userId")
+
+        daily_key = (provider, use_case, day)
+        for counters, key in ((request_inc, rid), (daily_inc, daily_key)):
+            c = counters.setdefault(key, {"totalProofs": 0, "successfulProofs": 0, "uniqueUsers": 0})
+            c["totalProofs"] += 1
+            c["successfulProofs"] += success
+
+        if user:
+            request_markers.append({"r": rid, "u": user})
+            request_marker_keys.append(rid)
+            daily_markers.append({"p": provider, "c": use_case, "d": day, "u": user})
+            daily_marker_keys.append(daily_key)
+
+    for i in _insert_markers(get_collection(REQUEST_ROLLUP_USERS), request_markers, session):
+        request_inc[request_marker_keys[i]]["uniqueUsers"] += 1
+    for i in _insert_markers(get_collection(DAILY_ROLLUP_USERS), daily_markers, session):
+        daily_inc[daily_marker_keys[i]]["uniqueUsers"] += 1
+
+    now = datetime.utcnow()
+    get_collection(REQUEST_ROLLUPS).bulk_write([
+        UpdateOne(
+            {"_id": rid},
+            {
+                "$inc": inc,
+                "$set": {"updatedAt": now},
+                "$setOnInsert": {
+                    "providerName": meta.get(rid, {}).get("providerName"),
+                    "useCase": meta.get(rid, {}).get("useCase"),
+                },
+            },
+            upsert=True,
+        )
+        for rid, inc in request_inc.items()
+    ], ordered=False, session=session)
+    get_collection(DAILY_ROLLUPS).bulk_write([
+        UpdateOne(
+            {"_id": {"p": provider, "c": use_case, "d": day}},
+            {
+                "$inc": inc,
+                "$set": {"updatedAt": now},
+                "$setOnInsert": {"providerName": provider, "useCase": use_case, "day": day},
+            },
+            upsert=True,
+        )
+        for (provider, use_case, day), inc in daily_inc.items()
+    ], ordered=False, session=session)
+
+
+def _daily_totals_pipeline(provider_name, use_case, time_window_days: int) -> list:
+    query = {"day": {"$gte": _day(datetime.utcnow() - timedelta(days=time_window_days - 1))}}
+    if provider_name:
+        query["providerName"] = provider_name
+    if use_case:
+        query["useCase"] = use_case
+    return [
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "totalProofs": {"$sum": "$totalProofs"},
+            "successfulProofs": {"$sum": "$successfulProofs"},
+            "days": {"$sum": 1},
+        }},
+    ]
+
+
+def _daily_totals(rows: list) -> dict:
+    totals = rows[0] if rows else {}
+    return {
+        "totalProofs": totals.get("totalProofs", 0),
+        "successfulProofs": totals.get("successfulProofs", 0),
+        "days": totals.get("days", 0),
+    }
+
+
+def get_daily_totals(provider_name, use_case, time_window_days: int) -> dict:
+    """
+    Proof totals over the last `time_window_days` days (today included),
+    summed on the server from one dailyRollups document per day: O(days).
+    """
+    return _daily_totals(list(get_collection(DAILY_ROLLUPS).aggregate(
+        _daily_totals_pipeline(provider_name, use_case, time_window_days)
+    )))
+
+
+async def aget_daily_totals(provider_name, use_case, time_window_days: int) -> dict:
+    """Async variant of get_daily_totals."""
+    cursor = await get_async_collection(DAILY_ROLLUPS).aggregate(
+        _daily_totals_pipeline(provider_name, use_case, time_window_days)
+    )
+    return _daily_totals(await cursor.to_list(length=1))
+
+
+# ---- change-stream watcher ----
+
+def watch_proofs(stop_event: threading.Event, batch_size: int = 500):
+    """
+    Tail inserts on proofResults and feed them to record_proofs in batches.
+
+    Requires a replica set. The resume token is saved after every applied
+    batch so a restart continues where it stopped; a batch applied just
+    before a crash is replayed, and record_proofs skips its proofs.
+    """
+    state = get_collection(ROLLUP_STATE)
+    saved = state.find_one({"_id": "proofsWatcher"}) or {}
+    pipeline = [{"$match": {"operationType": "insert"}}]
+
+    try:
+        with get_collection("proofResults").watch(
+            pipeline, resume_after=saved.get("resumeToken"), max_await_time_ms=1000
+        ) as stream:
+            batch = []
+            while not stop_event.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    batch.append(change["fullDocument"])
+                if batch and (change is None or len(batch) >= batch_size):
+                    record_proofs(batch)
+                    state.update_one(
+                        {"_id": "proofsWatcher"},
+                        {"$set": {"resumeToken": stream.resume_token,
+                                  "updatedAt": datetime.utcnow()}},
+                        upsert=True,
+                    )
+                    batch = []
+    except PyMongoError as e:
+        logger.error(f"Rollup change stream stopped: {e}")
+
+
+def start_rollup_watcher() -> threading.Event:
+    """
+    Run watch_proofs in a daemon thread; set the returned event to stop it.
+
+    The thread waits while MongoDB is unavailable and reopens the change
+    stream (from the saved resume token) after errors.
+    """
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.is_set():
+            if is_available():
+                watch_proofs(stop_event)
+            stop_event.wait(settings.MONGO_HEALTH_INTERVAL_SECONDS)
+
+    threading.Thread(target=run, name="rollup-watcher", daemon=True).start()
+    return stop_event
+
+
+# ---- backfill / rebuild ----
+
+def rebuild_rollups():
+    """
+    Recompute every rollup collection from proofResults on the server.
+
+    Each target is replaced atomically with $out. Stop the watcher (and
+    ingest) while this runs, or proofs arriving mid-rebuild may be lost.
+    """
+    tmp_request_users = "_rollupRebuildRequestUsers"
+    tmp_daily_users = "_rollupRebuildDailyUsers"
+    valid_user = {"$not": [{"$in": [{"$ifNull": ["$_id.u", None]}, [None, ""]]}]}
+    success = {"$cond": [{"$eq": ["$result", True]}, 1, 0]}
+
+    # Per (request, user) counts -> request rollups + request markers
+    get_collection("proofResults").aggregate([
+        {"$group": {
+            "_id": {"r": "$requestId", "u": "$userId"},
+            "totalProofs": {"$sum": 1},
+            "successfulProofs": {"$sum": success},
+        }},
+        {"$out": tmp_request_users},
+    ], allowDiskUse=True)
+    get_collection(tmp_request_users).aggregate([
+        {"$group": {
+            "_id": "$_id.r",
+            "totalProofs": {"$sum": "$totalProofs"},
+            "successfulProofs": {"$sum": "$successfulProofs"},
+            "uniqueUsers": {"$sum": {"$cond": [valid_user, 1, 0]}},
+        }},
+        {"$lookup": {
+            "from": "requests",
+            "localField": "_id",
+            "foreignField": "requestId",
+            "pipeline": [{"$project": {"_id": 0, "providerName": 1, "useCase": 1}}],
+            "as": "_request",
+        }},
+        {"$set": {
+            "providerName": {"$first": "$_request.providerName"},
+            "useCase": {"$first": "$_request.useCase"},
+            "updatedAt": "$$NOW",
+        }},
+        {"$unset": "_request"},
+        {"$out": REQUEST_ROLLUPS},
+    ], allowDiskUse=True)
+    get_collection(tmp_request_users).aggregate([
+        {"$match": {"$expr": valid_user}},
+        {"$project": {"_id": 1}},
+        {"$out": REQUEST_ROLLUP_USERS},
+    ], allowDiskUse=True)
+
+    # Per (provider, use case, day, user) counts -> daily rollups + markers
+    get_collection("proofResults").aggregate([
+        {"$group": {
+            "_id": {
+                "r": "$requestId",
+                "u": "$userId",
+                "d": {"$dateTrunc": {"date": "$createdAt", "unit": "day"}},
+            },
+            "totalProofs": {"$sum": 1},
+            "successfulProofs": {"$sum": success},
+        }},
+        {"$lookup": {
+            "from": "requests",
+            "localField": "_id.r",
+            "foreignField": "requestId",
+            "pipeline": [{"$project": {"_id": 0, "providerName": 1, "useCase": 1}}],
+            "as": "_request",
+        }},
+        {"$group": {
+            "_id": {
+                "p": {"$first": "$_request.providerName"},
+                "c": {"$first": "$_request.useCase"},
+                "d": "$_id.d",
+                "u": "$_id.u",
+            },
+            "totalProofs": {"$sum": "$totalProofs"},
+            "successfulProofs": {"$sum": "$successfulProofs"},
+        }},
+        {"$out": tmp_daily_users},
+    ], allowDiskUse=True)
+    get_collection(tmp_daily_users).aggregate([
+        {"$group": {
+            "_id": {"p": "$_id.p", "c": "$_id.c", "d": "$_id.d"},
+            "totalProofs": {"$sum": "$totalProofs"},
+            "successfulProofs": {"$sum": "$successfulProofs"},
+            "uniqueUsers": {"$sum": {"$cond": [valid_user, 1, 0]}},
+        }},
+        {"$set": {
+            "providerName": "$_id.p",
+            "useCase": "$_id.c",
+            "day": "$_id.d",
+            "updatedAt": "$$NOW",
+        }},
+        {"$out": DAILY_ROLLUPS},
+    ], allowDiskUse=True)
+    get_collection(tmp_daily_users).aggregate([
+        {"$match": {"$expr": valid_user}},
+        {"$project": {"_id": 1}},
+        {"$out": DAILY_ROLLUP_USERS},
+    ], allowDiskUse=True)
+
+    get_collection("proofResults").aggregate([
+        {"$project": {"_id": {"$ifNull": ["$proofId", "$_id"]}}},
+        {"$out": ROLLUP_PROOFS},
+    ], allowDiskUse=True)
+
+    get_collection(tmp_request_users).drop()
+    get_collection(tmp_daily_users).drop()
+    # $out replaces the collection, so restore the secondary index.
+    get_collection(DAILY_ROLLUPS).create_index([("providerName", 1), ("useCase", 1), ("day", 1)])
+    logger.info("Rollups rebuilt from proofResults.")
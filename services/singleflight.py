@@ -0,0 +1,68 @@
+# services/singleflight.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from services.metrics import CallbackMetric, Counter, register
+
+# Single-flight coalescing: concurrent calls with the same key share one
+# in-flight computation. Nothing is kept after it finishes, so there is
+# no staleness window; the next call after completion starts fresh.
+
+coalesced_calls = register(Counter(
+    "zkloci_singleflight_calls_total",
+    "Calls through single-flight groups, by stage and role (leader/shared).",
+    ("stage", "role"),
+))
+
+all_flights: list = []
+
+register(CallbackMetric(
+    "zkloci_singleflight_inflight",
+    "Distinct computations currently in flight, by stage.",
+    ("stage",),
+    lambda: {(f.name,): len(f) for f in all_flights},
+))
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict = {}  # key -> [task, waiters]
+        all_flights.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn()` once per key across concurrent callers and return its
+        result (or raise its exception) to every caller.
+
+        A cancelled caller only stops waiting. The shared computation is
+        cancelled once every caller waiting on it has gone.
+        """
+        entry = self._inflight.get(key)
+        if entry is None:
+            entry = [asyncio.ensure_future(fn()), 0]
+            self._inflight[key] = entry
+            entry[0].add_done_callback(lambda _t, e=entry: self._forget(key, e))
+            coalesced_calls.inc(stage=self.name, role="leader")
+        else:
+            coalesced_calls.inc(stage=self.name, role="shared")
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if entry[1] == 1 and not task.done():
+                self._forget(key, entry)
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def _forget(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
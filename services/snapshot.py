@@ -0,0 +1,657 @@
+# services/snapshot.py
+
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from bson import ObjectId
+
+from config import settings
+from db.mongo import get_collection, is_available
+from models.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Columnar, memory-mapped snapshots of requests + proofResults so stats
+# queries (STATS_SOURCE=snapshot) are answered in-process with NumPy and
+# no Mongo round trip. Layout of one snapshot directory:
+#
+#   manifest.json          createdAt, _id watermarks, row counts, proof tail
+#   providers.npy          dictionary: code -> providerName
+#   use_cases.npy          dictionary: code -> useCase
+#   statuses.npy           dictionary: code -> status
+#   users.npy              dictionary: code -> userId (sorted)
+#   req_id.bin             UTF-8 requestIds, concatenated in request-code order
+#   req_id_end.bin         int64 end offset of each requestId in req_id.bin
+#   req_id_sorted.npy      UTF-8 requestIds as fixed-width bytes, sorted
+#   req_id_order.bin       int32 request code of each req_id_sorted entry
+#   req_description.bin    UTF-8 descriptions, concatenated
+#   req_description_end.bin int64 end offset of each description
+#   req_provider.bin       int32 provider code per request (-1 = none)
+#   req_use_case.bin       int32 use-case code per request (-1 = none)
+#   req_status.bin         int32 status code per request (-1 = none)
+#   req_created.bin        int64 createdAt (ms since epoch, UTC) per request
+#   req_expires.bin        int64 expiresAt (ms) per request
+#   req_offsets.bin        int64 CSR offsets: request i owns proofs [o[i], o[i+1])
+#   req_total.bin          int64 proofs per request
+#   req_success.bin        int64 successful proofs per request
+#   req_unique.bin         int64 distinct (non-empty) userIds per request
+#   proof_user.bin         int32 user code per proof, grouped by request (-1 = none)
+#   proof_result.bin       bool result per proof
+#   proof_ts.bin           int64 createdAt per proof (ms)
+#
+# .bin files are raw arrays (dtypes in COLUMNS) read with np.memmap. The
+# exporter appends them one cursor batch at a time and regroups proofs by
+# request through preallocated memmaps, so its memory is bounded by the
+# batch size plus the per-request and dictionary columns, not the number
+# of proofs. Readers keep the string columns mapped too: requestIds and
+# descriptions are decoded only for returned rows, and requestIds are
+# looked up with a binary search over req_id_sorted.
+#
+# Snapshots are written to a fresh directory and published by atomically
+# replacing the CURRENT pointer file, so every uvicorn worker maps the same
+# files and shares them through the page cache. Requests and proofs
+# inserted after the export are polled into a small in-memory delta and
+# merged at query time. Each poll re-reads SNAPSHOT_DELTA_OVERLAP_SECONDS
+# of _ids below the watermark, so a proof whose _id was generated before a
+# poll but committed after it is still counted; re-read proofs are
+# dropped by proofId. Polls read their cursors _DELTA_BATCH documents at
+# a time.
+
+CURRENT = "CURRENT"
+_KEEP_SNAPSHOTS = 2
+_DELTA_BATCH = 10_000
+_NO_TIME = np.iinfo(np.int64).min
+
+COLUMNS = {
+    "req_id": np.uint8,
+    "req_id_end": np.int64,
+    "req_id_order": np.int32,
+    "req_description": np.uint8,
+    "req_description_end": np.int64,
+    "req_provider": np.int32,
+    "req_use_case": np.int32,
+    "req_status": np.int32,
+    "req_created": np.int64,
+    "req_expires": np.int64,
+    "req_offsets": np.int64,
+    "req_total": np.int64,
+    "req_success": np.int64,
+    "req_unique": np.int64,
+    "proof_user": np.int32,
+    "proof_result": np.bool_,
+    "proof_ts": np.int64,
+    # proofs in cursor order, regrouped into the proof_* columns
+    "scratch_req": np.int32,
+    "scratch_user": np.int32,
+    "scratch_result": np.bool_,
+    "scratch_ts": np.int64,
+}
+_STRING_COLUMNS = ("req_id", "req_description")
+_SCRATCH = ("scratch_req", "scratch_user", "scratch_result", "scratch_ts")
+
+
+def _ms(ts) -> int:
+    if not isinstance(ts, datetime):
+        return _NO_TIME
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1000)
+
+
+def _datetime(ms: int):
+    if ms == _NO_TIME:
+        return None
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).replace(tzinfo=None)
+
+
+class _Dictionary:
+    """Dictionary encoding for low-cardinality strings (providers, use cases)."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {v: i for i, v in enumerate(self.values)}
+
+    def code(self, value, add: bool = True) -> int:
+        if not value:
+            return -1
+        c = self.codes.get(value)
+        if c is None:
+            if not add:
+                return -2  # matches nothing
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+
+# ---- export ----
+
+def _save(path: str, name: str, array):
+    np.save(os.path.join(path, f"{name}.npy"), array)
+
+
+def _column_path(path: str, name: str) -> str:
+    return os.path.join(path, f"{name}.bin")
+
+
+def _column(path: str, name: str, mode: str = "r", count: int = None):
+    """Map a raw column; mode "w+" preallocates `count` rows."""
+    dtype = COLUMNS[name]
+    if mode == "w+":
+        if not count:
+            open(_column_path(path, name), "wb").close()
+            return np.empty(0, dtype=dtype)
+        return np.memmap(_column_path(path, name), dtype=dtype, mode="w+", shape=(count,))
+    if os.path.getsize(_column_path(path, name)) == 0:
+        return np.empty(0, dtype=dtype)  # np.memmap cannot map an empty file
+    return np.memmap(_column_path(path, name), dtype=dtype, mode=mode)
+
+
+class _ColumnWriter:
+    """Raw column files opened for appending, one batch at a time."""
+
+    def __init__(self, path: str, names):
+        self.files = {n: open(_column_path(path, n), "wb") for n in names}
+        self.ends = {}
+
+    def append(self, name: str, values):
+        np.asarray(values, dtype=COLUMNS[name]).tofile(self.files[name])
+
+    def append_strings(self, name: str, values):
+        encoded = [(v or "").encode() for v in values]
+        self.files[name].write(b"".join(encoded))
+        ends = self.ends.get(name, 0) + np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        if len(ends):
+            self.ends[name] = int(ends[-1])
+        self.append(f"{name}_end", ends)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def _batches(cursor, size: int):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _latest_id(coll):
+    doc = coll.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return doc["_id"] if doc else None
+
+
+def _upto(watermark) -> dict:
+    return {"_id": {"$lte": watermark}} if watermark is not None else {"_id": None}
+
+
+def _after(watermark) -> dict:
+    return {"_id": {"$gt": watermark}} if watermark is not None else {}
+
+
+def _overlap_floor(watermark):
+    """_id SNAPSHOT_DELTA_OVERLAP_SECONDS below `watermark`, where polls resume."""
+    if not isinstance(watermark, ObjectId):
+        return watermark
+    since = watermark.generation_time - timedelta(seconds=settings.SNAPSHOT_DELTA_OVERLAP_SECONDS)
+    return ObjectId.from_datetime(since)
+
+
+def _proof_key(proof: dict) -> str:
+    return str(proof.get("proofId") or proof.get("_id"))
+
+
+def _watermark(value):
+    """Manifest watermarks are stored as strings; restore ObjectIds."""
+    return ObjectId(value) if isinstance(value, str) and ObjectId.is_valid(value) else value
+
+
+def _prune(root: str, keep: str):
+    snapshots = sorted(d for d in os.listdir(root) if d.startswith("snap-"))
+    for name in snapshots[:-_KEEP_SNAPSHOTS]:
+        if name != keep:
+            # Workers still mapping an old snapshot keep their open files.
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def export_snapshot(root: str = None, batch_size: int = 100_000) -> str:
+    """
+    Dump requests and proofResults into a new columnar snapshot and
+    publish it. Returns the snapshot directory.
+
+    One streaming pass over each collection, appended to the columns a
+    cursor batch at a time. Proofs are then regrouped by request (and by
+    user within a request) through preallocated memmaps, one batch at a
+    time, so per-request totals, successes and unique users are computed
+    without holding every proof in memory.
+    """
+    root = root or settings.SNAPSHOT_DIR
+    os.makedirs(root, exist_ok=True)
+    requests_coll = get_collection("requests")
+    proofs_coll = get_collection("proofResults")
+
+    # Watermarks first: everything at or below them is in the snapshot,
+    # everything above is picked up by the delta poller.
+    request_watermark = _latest_id(requests_coll)
+    proof_watermark = _latest_id(proofs_coll)
+
+    created = datetime.utcnow()
+    name = f"snap-{created.strftime('%Y%m%dT%H%M%S%f')}"
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    writer = _ColumnWriter(path, [*_STRING_COLUMNS, *(f"{c}_end" for c in _STRING_COLUMNS),
+                                  "req_id_order", "req_provider", "req_use_case", "req_status",
+                                  "req_created", "req_expires", *_SCRATCH])
+
+    providers, use_cases, statuses = _Dictionary(), _Dictionary(), _Dictionary()
+    request_codes = {}
+    cursor = requests_coll.find(_upto(request_watermark), _projection(), batch_size=batch_size)
+    for batch in _batches(cursor, batch_size):
+        rows = []
+        for r in batch:
+            if r.get("requestId") not in request_codes:
+                request_codes[r.get("requestId")] = len(request_codes)
+                rows.append(r)
+        writer.append_strings("req_id", [r.get("requestId") for r in rows])
+        writer.append_strings("req_description", [r.get("description") for r in rows])
+        writer.append("req_provider", [providers.code(r.get("providerName")) for r in rows])
+        writer.append("req_use_case", [use_cases.code(r.get("useCase")) for r in rows])
+        writer.append("req_status", [statuses.code(r.get("status")) for r in rows])
+        writer.append("req_created", [_ms(r.get("createdAt")) for r in rows])
+        writer.append("req_expires", [_ms(r.get("expiresAt")) for r in rows])
+    n_req = len(request_codes)
+
+    # Sorted requestIds (and their codes) for lookups by requestId.
+    id_keys = np.asarray([rid.encode() for rid in request_codes if rid], dtype=bytes)
+    id_codes = np.asarray([code for rid, code in request_codes.items() if rid], dtype=np.int32)
+    order = np.argsort(id_keys, kind="stable")
+    _save(path, "req_id_sorted", id_keys[order])
+    writer.append("req_id_order", id_codes[order])
+
+    # Proofs in cursor order; totals and successes are summed per batch.
+    # Proofs read from the overlap window below the watermark are listed
+    # in the manifest so the first delta poll does not count them again.
+    users = _Dictionary()
+    req_total = np.zeros(n_req, dtype=np.int64)
+    req_success = np.zeros(n_req, dtype=np.int64)
+    floor = _overlap_floor(proof_watermark)
+    tail = []
+    cursor = proofs_coll.find(
+        _upto(proof_watermark),
+        {"_id": 1, "proofId": 1, "requestId": 1, "userId": 1, "result": 1, "createdAt": 1},
+        batch_size=batch_size,
+    )
+    for batch in _batches(cursor, batch_size):
+        if isinstance(floor, ObjectId):
+            tail.extend([_proof_key(p), p["_id"]] for p in batch if p["_id"] > floor)
+        # Orphan proofs are skipped: no request can ever match them.
+        batch = [(request_codes[p.get("requestId")], p) for p in batch
+                 if p.get("requestId") in request_codes]
+        req = np.asarray([code for code, _ in batch], dtype=np.int32)
+        result = np.asarray([p.get("result") is True for _, p in batch], dtype=bool)
+        writer.append("scratch_req", req)
+        writer.append("scratch_user", [users.code(p.get("userId")) for _, p in batch])
+        writer.append("scratch_result", result)
+        writer.append("scratch_ts", [_ms(p.get("createdAt")) for _, p in batch])
+        req_total += np.bincount(req, minlength=n_req)
+        req_success += np.bincount(req[result], minlength=n_req)
+    writer.close()
+    n_proofs = int(req_total.sum())
+
+    # Re-code users in sorted order so the delta poller can map new
+    # userIds with a binary search over the mapped dictionary. The extra
+    # trailing -1 maps "no user" (-1) to itself.
+    user_values = np.asarray(users.values, dtype=str)
+    order = np.argsort(user_values, kind="stable")
+    sorted_users = user_values[order]
+    remap = np.full(len(order) + 1, -1, dtype=np.int32)
+    remap[order] = np.arange(len(order), dtype=np.int32)
+
+    req_offsets = np.zeros(n_req + 1, dtype=np.int64)
+    np.cumsum(req_total, out=req_offsets[1:])
+    scratch = {c: _column(path, c) for c in _SCRATCH}
+    proof_user = _column(path, "proof_user", "w+", n_proofs)
+    proof_result = _column(path, "proof_result", "w+", n_proofs)
+    proof_ts = _column(path, "proof_ts", "w+", n_proofs)
+
+    # Scatter each batch to its requests' slots (counting sort by request).
+    next_slot = req_offsets[:-1].copy()
+    for start in range(0, n_proofs, batch_size):
+        stop = min(start + batch_size, n_proofs)
+        req = np.asarray(scratch["scratch_req"][start:stop])
+        order = np.argsort(req, kind="stable")
+        req = req[order]
+        group_start = np.flatnonzero(np.r_[True, req[1:] != req[:-1]])
+        group_len = np.diff(np.r_[group_start, len(req)])
+        rank = np.arange(len(req)) - np.repeat(group_start, group_len)
+        slots = next_slot[req] + rank
+        next_slot[req[group_start]] += group_len
+        proof_user[slots] = remap[np.asarray(scratch["scratch_user"][start:stop])[order]]
+        proof_result[slots] = np.asarray(scratch["scratch_result"][start:stop])[order]
+        proof_ts[slots] = np.asarray(scratch["scratch_ts"][start:stop])[order]
+    del scratch
+    for column in _SCRATCH:
+        os.remove(_column_path(path, column))
+
+    # Sort users within each request, a run of whole requests at a time,
+    # and count the distinct ones.
+    req_unique = np.zeros(n_req, dtype=np.int64)
+    first_req = 0
+    while first_req < n_req:
+        end = int(np.searchsorted(req_offsets, req_offsets[first_req] + batch_size, side="right")) - 1
+        end = min(max(end, first_req + 1), n_req)
+        lo, hi = req_offsets[first_req], req_offsets[end]
+        req = np.repeat(np.arange(first_req, end), req_total[first_req:end])
+        user = np.asarray(proof_user[lo:hi])
+        order = np.lexsort((user, req))
+        user = user[order]
+        proof_user[lo:hi] = user
+        proof_result[lo:hi] = np.asarray(proof_result[lo:hi])[order]
+        proof_ts[lo:hi] = np.asarray(proof_ts[lo:hi])[order]
+        first = np.ones(len(user), dtype=bool)
+        first[1:] = (req[1:] != req[:-1]) | (user[1:] != user[:-1])
+        req_unique[first_req:end] = np.bincount(req[first & (user >= 0)] - first_req,
+                                                minlength=end - first_req)
+        first_req = end
+    for column in (proof_user, proof_result, proof_ts):
+        if isinstance(column, np.memmap):
+            column.flush()
+    del proof_user, proof_result, proof_ts
+
+    writer = _ColumnWriter(path, ["req_offsets", "req_total", "req_success", "req_unique"])
+    writer.append("req_offsets", req_offsets)
+    writer.append("req_total", req_total)
+    writer.append("req_success", req_success)
+    writer.append("req_unique", req_unique)
+    writer.close()
+    _save(path, "providers", np.asarray(providers.values, dtype=str))
+    _save(path, "use_cases", np.asarray(use_cases.values, dtype=str))
+    _save(path, "statuses", np.asarray(statuses.values, dtype=str))
+    _save(path, "users", sorted_users)
+    with open(os.path.join(path, "manifest.json"), "wb") as f:
+        f.write(dumps({
+            "createdAt": created,
+            "requestWatermark": request_watermark,
+            "proofWatermark": proof_watermark,
+            "requests": n_req,
+            "proofs": n_proofs,
+            "users": int(len(user_values)),
+            "proofTail": tail,
+        }))
+
+    tmp = os.path.join(root, f"{CURRENT}.tmp")
+    with open(tmp, "w") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(root, CURRENT))
+    _prune(root, name)
+    logger.info(f"Exported snapshot {name}: {n_req} requests, {n_proofs} proofs")
+    return path
+
+
+# ---- query engine ----
+
+class _Snapshot:
+    """One published snapshot, memory-mapped read-only."""
+
+    def __init__(self, path: str):
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, "manifest.json"), "rb") as f:
+            self.manifest = loads(f.read())
+        for column in ("providers", "use_cases", "statuses", "users", "req_id_sorted"):
+            setattr(self, column, np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r"))
+        for column in ("req_id", "req_id_end", "req_id_order", "req_description",
+                       "req_description_end", "req_provider", "req_use_case", "req_status",
+                       "req_created", "req_expires", "req_offsets", "req_total", "req_success",
+                       "req_unique", "proof_user", "proof_result", "proof_ts"):
+            setattr(self, column, _column(path, column))
+
+    def __len__(self):
+        return len(self.req_total)
+
+    def _string(self, column: str, i: int) -> str:
+        ends = getattr(self, f"{column}_end")
+        start = int(ends[i - 1]) if i else 0
+        return getattr(self, column)[start:int(ends[i])].tobytes().decode()
+
+    def request_codes(self, request_ids: list) -> np.ndarray:
+        """Request code of each of `request_ids`, -1 where it is not in the snapshot."""
+        keys = np.asarray([(rid or "").encode() for rid in request_ids], dtype=bytes)
+        if not len(self.req_id_sorted) or not len(keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        i = np.minimum(np.searchsorted(self.req_id_sorted, keys), len(self.req_id_sorted) - 1)
+        found = (self.req_id_sorted[i] == keys) & (keys != b"")
+        return np.where(found, self.req_id_order[i], -1)
+
+    def request(self, i: int) -> dict:
+        """Request i as projected by REQUEST_PROJECTION (missing fields left out)."""
+        doc = {
+            "requestId": self._string("req_id", i),
+            "providerName": _decode(self.providers, self.req_provider[i]),
+            "useCase": _decode(self.use_cases, self.req_use_case[i]),
+            "description": self._string("req_description", i),
+            "status": _decode(self.statuses, self.req_status[i]),
+            "createdAt": _datetime(int(self.req_created[i])),
+            "expiresAt": _datetime(int(self.req_expires[i])),
+        }
+        return {k: v for k, v in doc.items() if v not in (None, "")}
+
+
+def _decode(values, code) -> str:
+    return str(values[code]) if code >= 0 else None
+
+
+class _Delta:
+    """Requests and proofs inserted after a snapshot, kept in memory."""
+
+    def __init__(self, snap: _Snapshot):
+        self.request_watermark = _watermark(snap.manifest.get("requestWatermark"))
+        self.proof_watermark = _watermark(snap.manifest.get("proofWatermark"))
+        self.providers = _Dictionary(snap.providers.tolist())
+        self.use_cases = _Dictionary(snap.use_cases.tolist())
+        self.rows: list = []
+        self.request_codes: dict = {}
+        self.req_provider = np.empty(0, dtype=np.int32)
+        self.req_use_case = np.empty(0, dtype=np.int32)
+        self.req_created = np.empty(0, dtype=np.int64)
+        self.new_users: dict = {}  # userId -> code past the snapshot dictionary
+        self.per_request: dict = {}  # request code -> [total, successful, set(user codes)]
+        # proof key -> _id of proofs counted inside the overlap window
+        self.seen_proofs: dict = {
+            key: _watermark(_id) for key, _id in snap.manifest.get("proofTail") or ()
+        }
+
+
+class SnapshotEngine:
+    def __init__(self, root: str = None):
+        self.root = root or settings.SNAPSHOT_DIR
+        self._state = None  # (_Snapshot, _Delta), swapped as a whole
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def _current_name(self):
+        try:
+            with open(os.path.join(self.root, CURRENT)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Map a newly published snapshot, then pull proofs added since."""
+        with self._lock:
+            name = self._current_name()
+            state = self._state
+            if name and (state is None or state[0].name != name):
+                snap = _Snapshot(os.path.join(self.root, name))
+                state = (snap, _Delta(snap))
+                logger.info(f"Loaded snapshot {name}")
+            if state is not None and is_available():
+                state = (state[0], self._poll_delta(*state))
+            self._state = state
+
+    def _poll_delta(self, snap: _Snapshot, old: _Delta) -> _Delta:
+        delta = _Delta.__new__(_Delta)
+        delta.__dict__.update(old.__dict__)
+        delta.rows = list(old.rows)
+        delta.request_codes = dict(old.request_codes)
+        delta.new_users = dict(old.new_users)
+        # Copy-on-write: queries may still be reading the old entries.
+        delta.per_request = dict(old.per_request)
+        touched = set()
+
+        # Requests re-read from the overlap window are dropped by requestId.
+        cursor = get_collection("requests").find(
+            _after(_overlap_floor(delta.request_watermark)),
+            {**_projection(), "_id": 1}, batch_size=_DELTA_BATCH).sort("_id", 1)
+        n_snap = len(snap)
+        provider, use_case, created = [], [], []
+        for batch in _batches(cursor, _DELTA_BATCH):
+            delta.request_watermark = _max_id(delta.request_watermark, batch[-1]["_id"])
+            in_snapshot = snap.request_codes([r.get("requestId") for r in batch]) >= 0
+            for r, known in zip(batch, in_snapshot.tolist()):
+                r.pop("_id")
+                rid = r.get("requestId")
+                if known or rid in delta.request_codes:
+                    continue
+                delta.request_codes[rid] = n_snap + len(delta.rows)
+                delta.rows.append(r)
+                provider.append(delta.providers.code(r.get("providerName")))
+                use_case.append(delta.use_cases.code(r.get("useCase")))
+                created.append(_ms(r.get("createdAt")))
+        if provider:
+            delta.req_provider = np.concatenate([old.req_provider, np.asarray(provider, dtype=np.int32)])
+            delta.req_use_case = np.concatenate([old.req_use_case, np.asarray(use_case, dtype=np.int32)])
+            delta.req_created = np.concatenate([old.req_created, np.asarray(created, dtype=np.int64)])
+
+        cursor = get_collection("proofResults").find(
+            _after(_overlap_floor(delta.proof_watermark)),
+            {"_id": 1, "proofId": 1, "requestId": 1, "userId": 1, "result": 1},
+            batch_size=_DELTA_BATCH,
+        ).sort("_id", 1)
+        seen = dict(old.seen_proofs)
+        for batch in _batches(cursor, _DELTA_BATCH):
+            delta.proof_watermark = _max_id(delta.proof_watermark, batch[-1]["_id"])
+            codes = snap.request_codes([p.get("requestId") for p in batch]).tolist()
+            for p, code in zip(batch, codes):
+                key = _proof_key(p)
+                if key in seen:
+                    continue
+                seen[key] = p["_id"]
+                if code < 0:
+                    code = delta.request_codes.get(p.get("requestId"))
+                    if code is None:
+                        continue
+                if code not in touched:
+                    total, successful, users = delta.per_request.get(code, (0, 0, set()))
+                    delta.per_request[code] = [total, successful, set(users)]
+                    touched.add(code)
+                entry = delta.per_request[code]
+                entry[0] += 1
+                entry[1] += p.get("result") is True
+                user = self._user_code(snap, delta, p.get("userId"))
+                if user >= 0:
+                    entry[2].add(user)
+        # Proofs below the next poll's floor are never re-read.
+        floor = _overlap_floor(delta.proof_watermark)
+        delta.seen_proofs = {k: v for k, v in seen.items() if floor is None or v > floor}
+        return delta
+
+    @staticmethod
+    def _user_code(snap: _Snapshot, delta: _Delta, user_id) -> int:
+        if not user_id:
+            return -1
+        i = int(np.searchsorted(snap.users, user_id))
+        if i < len(snap.users) and snap.users[i] == user_id:
+            return i
+        return delta.new_users.setdefault(user_id, len(snap.users) + len(delta.new_users))
+
+    def campaign_rows(self, intent: dict):
+        """
+        Yield matching requests with their proof counters, shaped like the
+        rows of the raw stats pipeline (projected fields, stats,
+        uniqueUserCount).
+        """
+        snap, delta = self._state
+        days = intent.get("timeWindowDays") or 7
+        cutoff = _ms(datetime.utcnow() - timedelta(days=days))
+        provider = delta.providers.code(intent.get("providerName"), add=False)
+        use_case = delta.use_cases.code(intent.get("useCase"), add=False)
+
+        def select(req_provider, req_use_case, req_created):
+            mask = req_created >= cutoff
+            if provider != -1:
+                mask &= req_provider == provider
+            if use_case != -1:
+                mask &= req_use_case == use_case
+            return np.flatnonzero(mask)
+
+        selected = select(snap.req_provider, snap.req_use_case, snap.req_created)
+        totals = snap.req_total[selected]
+        successes = snap.req_success[selected]
+        uniques = snap.req_unique[selected]
+
+        for j, i in enumerate(selected.tolist()):
+            total, successful, unique = int(totals[j]), int(successes[j]), int(uniques[j])
+            extra = delta.per_request.get(i)
+            if extra:
+                total += extra[0]
+                successful += extra[1]
+                if extra[2]:
+                    seen = snap.proof_user[snap.req_offsets[i]:snap.req_offsets[i + 1]]
+                    new = np.fromiter(extra[2], dtype=np.int64, count=len(extra[2]))
+                    unique += int(np.count_nonzero(~np.isin(new, seen)))
+            yield _row(snap.request(i), total, successful, unique)
+
+        n_snap = len(snap)
+        for i in select(delta.req_provider, delta.req_use_case, delta.req_created).tolist():
+            total, successful, users = delta.per_request.get(n_snap + i, (0, 0, ()))
+            yield _row(delta.rows[i], total, successful, len(users))
+
+
+def _projection() -> dict:
+    from services.verification_analytics import REQUEST_PROJECTION
+    return dict(REQUEST_PROJECTION)
+
+
+def _max_id(watermark, _id):
+    return _id if watermark is None or _id > watermark else watermark
+
+
+def _row(doc: dict, total: int, successful: int, unique: int) -> dict:
+    row = dict(doc)
+    row["stats"] = {"totalProofs": total, "successfulProofs": successful}
+    row["uniqueUserCount"] = unique
+    return row
+
+
+snapshot_engine = SnapshotEngine()
+
+
+def start_snapshot_refresher() -> threading.Event:
+    """
+    Keep snapshot_engine current in a daemon thread: remap when a new
+    snapshot is published and poll the delta every SNAPSHOT_DELTA_SECONDS.
+    Set the returned event to stop it.
+    """
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.is_set():
+            try:
+                snapshot_engine.refresh()
+            except Exception as e:
+                logger.error(f"Snapshot refresh failed: {e}")
+            stop_event.wait(settings.SNAPSHOT_DELTA_SECONDS)
+
+    threading.Thread(target=run, name="snapshot-refresher", daemon=True).start()
+    return stop_event
@@ -0,0 +1,267 @@
+# services/stats_compaction.py
+
+import heapq
+import random
+from functools import lru_cache
+
+import tiktoken
+
+from config import settings
+from models.serialization import dumps_str
+
+# Turns full campaign stats into a bounded summary for the answer prompt:
+# campaign totals, a distribution of per-request results and the top-K
+# requests by volume, with K shrunk until the JSON fits a token budget
+# measured with the model's tokenizer. Trend series and comparison tables
+# are coarsened or cut the same way when they alone overflow the budget.
+
+_REQUEST_FIELDS = ("requestId", "description", "createdAt")
+_DESCRIPTION_CHARS = 80
+
+
+@lru_cache(maxsize=4)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding(settings.OPENAI_MODEL).encode(text))
+
+
+def _percentile(sorted_values: list, q: float):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1))))
+    return sorted_values[rank]
+
+
+def _distribution(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "min": _percentile(values, 0.0),
+        "p50": _percentile(values, 0.5),
+        "p90": _percentile(values, 0.9),
+        "max": _percentile(values, 1.0),
+    }
+
+
+def _request_row(r: dict) -> dict:
+    s = r.get("stats") or {}
+    total = s.get("totalProofs", 0)
+    successful = s.get("successfulProofs", 0)
+    row = {k: r.get(k) for k in _REQUEST_FIELDS if r.get(k) is not None}
+    if isinstance(row.get("description"), str):
+        row["description"] = row["description"][:_DESCRIPTION_CHARS]
+    row.update({
+        "totalProofs": total,
+        "successfulProofs": successful,
+        "successRate": round(successful / total, 3) if total else 0.0,
+        "uniqueUserCount": r.get("uniqueUserCount"),
+    })
+    return row
+
+
+def _fits(summary: dict, token_budget: int) -> bool:
+    return count_tokens(dumps_str(summary)) <= token_budget
+
+
+def _halve_trend(trend: dict) -> dict:
+    """Merge adjacent buckets pairwise; totals are unchanged."""
+    out = dict(trend)
+    for starts, series in (("bucketStarts", "current"), ("previousBucketStarts", "previous")):
+        out[starts] = trend[starts][::2]
+        out[series] = dict(trend[series])
+        for field in ("totalProofs", "successfulProofs"):
+            values = trend[series][field]
+            out[series][field] = [sum(values[i:i + 2]) for i in range(0, len(values), 2)]
+    out["bucketsPerPoint"] = trend.get("bucketsPerPoint", 1) * 2
+    return out
+
+
+def _trend_totals(trend: dict) -> dict:
+    """The trend without its per-bucket series: window totals and change only."""
+    out = {k: v for k, v in trend.items() if k not in ("bucketStarts", "previousBucketStarts")}
+    for series in ("current", "previous"):
+        out[series] = {k: trend[series][k] for k in ("total", "successful")}
+    return out
+
+
+def _compact_trend(summary: dict, token_budget: int):
+    trend = summary.get("trend")
+    if not trend or "bucketStarts" not in trend:
+        return
+    while not _fits(summary, token_budget) and len(summary["trend"]["bucketStarts"]) > 1:
+        summary["trend"] = _halve_trend(summary["trend"])
+    if not _fits(summary, token_budget):
+        summary["trend"] = _trend_totals(summary["trend"])
+
+
+def _compact_comparison(summary: dict, token_budget: int):
+    """Keep the comparison rows with the most proofs (in table order) that fit."""
+    table = summary.get("comparison")
+    if not table or _fits(summary, token_budget):
+        return
+    rows = table["rows"]
+    total = table["columns"].index("totalProofs")
+    ranked = sorted(range(len(rows)), key=lambda i: rows[i][total], reverse=True)
+
+    def with_rows(n):
+        keep = sorted(ranked[:n])
+        return {**summary, "comparison": {**table, "rows": [rows[i] for i in keep],
+                                          "rowCount": len(rows)}}
+
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _fits(with_rows(mid), token_budget):
+            lo = mid
+        else:
+            hi = mid - 1
+    summary["comparison"] = with_rows(lo)["comparison"]
+
+
+def compact_stats(stats: dict, token_budget: int = None) -> dict:
+    """
+    Return a prompt-sized summary of `stats` (never larger than the input).
+
+    The per-request list becomes `requestCount`, `requestDistribution`
+    (min/p50/p90/max of proofs and success rate per request) and
+    `topRequests`, the largest requests by proofs, with as many rows as fit
+    in `token_budget` tokens. If that is still too large the distribution
+    is dropped, trend buckets are merged pairwise (down to window totals)
+    and comparison rows with the fewest proofs are cut (`rowCount` keeps
+    the full count).
+    """
+    if token_budget is None:
+        token_budget = settings.ANSWER_STATS_TOKEN_BUDGET
+
+    requests = stats.get("requests") or []
+    # The trend gets what the request summary leaves of the budget.
+    summary = {k: v for k, v in stats.items() if k not in ("requests", "trend")}
+    if not requests and "trend" not in stats and "comparison" not in stats:
+        return summary
+    if requests:
+        rows = [_request_row(r) for r in requests]
+        rows.sort(key=lambda row: row["totalProofs"], reverse=True)
+
+        # Stats built by RequestSummary only carry the top requests and
+        # already have the count and distribution over all of them.
+        summary["requestCount"] = stats.get("requestCount") or len(rows)
+        if "requestDistribution" not in stats:
+            summary["requestDistribution"] = {
+                "totalProofs": _distribution([row["totalProofs"] for row in rows]),
+                "successRate": _distribution([row["successRate"] for row in rows]),
+            }
+
+        # Largest K in [0, top_k] whose summary fits the budget (binary search).
+        lo, hi = 0, min(len(rows), settings.ANSWER_STATS_TOP_K)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if _fits({**summary, "topRequests": rows[:mid]}, token_budget):
+                lo = mid
+            else:
+                hi = mid - 1
+        summary["topRequests"] = rows[:lo]
+
+    if "trend" in stats:
+        summary["trend"] = stats["trend"]
+    if not _fits(summary, token_budget):
+        summary.pop("requestDistribution", None)
+    _compact_trend(summary, token_budget)
+    _compact_comparison(summary, token_budget)
+    return summary
+
+
+# ---- bounded per-request accumulation ----
+
+REQUEST_SORT_KEYS = ("proofs", "successfulProofs", "successRate", "uniqueUsers", "createdAt")
+_SAMPLE_SIZE = 2048
+
+
+def request_sort_value(row: dict, sort: str):
+    """Value of `sort` (one of REQUEST_SORT_KEYS) for a per-request stats row."""
+    s = row.get("stats") or {}
+    total = s.get("totalProofs", 0)
+    if sort == "proofs":
+        return total
+    if sort == "successfulProofs":
+        return s.get("successfulProofs", 0)
+    if sort == "successRate":
+        return s.get("successfulProofs", 0) / total if total else 0.0
+    if sort == "uniqueUsers":
+        return row.get("uniqueUserCount") or 0
+    if sort == "createdAt":
+        return row.get("createdAt")
+    raise ValueError(f"Unknown sort key: {sort}")
+
+
+class RequestSummary:
+    """
+    Campaign totals over a stream of per-request rows in O(top_k) memory.
+
+    Keeps the `top_k` rows with the highest `sort` value and a fixed-size
+    reservoir sample for the distribution (exact up to _SAMPLE_SIZE
+    requests). The sample uses a fixed seed so the same rows in the same
+    order always give the same distribution, and so the same answer cache
+    fingerprint. top_k=0 keeps every row.
+    """
+
+    def __init__(self, top_k: int, sort: str = "proofs"):
+        if sort not in REQUEST_SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        self.top_k, self.sort = top_k, sort
+        self.count = self.total_proofs = self.successful_proofs = 0
+        self._heap: list = []  # (sort key, -arrival, row); smallest on top
+        self._sample: list = []  # (totalProofs, successRate)
+        self._rng = random.Random(0)
+        self._low: tuple = None  # exact per-field minimum / maximum
+        self._high: tuple = None
+
+    def add(self, row: dict):
+        s = row.get("stats") or {}
+        total, successful = s.get("totalProofs", 0), s.get("successfulProofs", 0)
+        self.count += 1
+        self.total_proofs += total
+        self.successful_proofs += successful
+
+        point = (total, round(successful / total, 3) if total else 0.0)
+        if self._low is None:
+            self._low = self._high = point
+        else:
+            self._low = (min(self._low[0], point[0]), min(self._low[1], point[1]))
+            self._high = (max(self._high[0], point[0]), max(self._high[1], point[1]))
+        if len(self._sample) < _SAMPLE_SIZE:
+            self._sample.append(point)
+        else:
+            j = self._rng.randrange(self.count)
+            if j < _SAMPLE_SIZE:
+                self._sample[j] = point
+
+        value = request_sort_value(row, self.sort)
+        item = ((value is not None, value), -self.count, row)
+        if not self.top_k or len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    @property
+    def truncated(self) -> bool:
+        return self.count > len(self._heap)
+
+    def requests(self) -> list:
+        """Kept rows, best first (ties in arrival order)."""
+        return [row for _, _, row in sorted(self._heap, reverse=True)]
+
+    def distribution(self) -> dict:
+        """Same shape as compact_stats' requestDistribution; p50/p90 from the sample."""
+        result = {}
+        for i, field in enumerate(("totalProofs", "successRate")):
+            d = _distribution([p[i] for p in self._sample])
+            if self._low is not None:
+                d["min"], d["max"] = self._low[i], self._high[i]
+            result[field] = d
+        return result
@@ -0,0 +1,240 @@
+# services/trends.py
+
+import logging
+import re
+from datetime import datetime, timedelta
+
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from config import settings
+from db.mongo import get_db, is_available
+from db.mongo_async import get_async_collection
+from services.metrics import stats_source
+
+logger = logging.getLogger(__name__)
+
+# Time-bucketed proof counts (hour / day / week) for the current window
+# and the window before it, fetched in one $facet round trip and returned
+# as dense, zero-filled arrays.
+#
+# With TRENDS_TIMESERIES=true the counts come from `proofResultsTS`, a
+# MongoDB time-series collection mirroring proofResults.createdAt with
+# the request's provider (id and name) and use case as metadata.
+
+TIMESERIES_COLL = "proofResultsTS"
+GRANULARITIES = ("hour", "day", "week")
+
+_TREND_RE = re.compile(
+    r"(?<![a-z])(trend|trends|day by day|day-by-day|daily|per day|each day|"
+    r"weekly|per week|hourly|over time|changed?|compared?|versus|vs)(?![a-z])"
+)
+
+
+def wants_trend(question: str) -> bool:
+    """True if the question asks how something changed over time."""
+    return bool(_TREND_RE.search((question or "").lower()))
+
+
+def default_granularity(time_window_days: int) -> str:
+    if time_window_days <= 2:
+        return "hour"
+    if time_window_days > 90:
+        return "week"
+    return "day"
+
+
+def _truncate(ts: datetime, unit: str) -> datetime:
+    """Python twin of $dateTrunc (UTC, weeks starting Monday)."""
+    if unit == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _step(unit: str) -> timedelta:
+    return {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}[unit]
+
+
+def _buckets(start: datetime, end: datetime, unit: str) -> list:
+    b, out = _truncate(start, unit), []
+    while b <= end:
+        out.append(b)
+        b += _step(unit)
+    return out
+
+
+def _dense(rows: list, buckets: list) -> dict:
+    by_bucket = {r["_id"]: r for r in rows}
+    total = [by_bucket.get(b, {}).get("totalProofs", 0) for b in buckets]
+    successful = [by_bucket.get(b, {}).get("successfulProofs", 0) for b in buckets]
+    return {
+        "totalProofs": total,
+        "successfulProofs": successful,
+        "total": sum(total),
+        "successful": sum(successful),
+    }
+
+
+def _change(current: int, previous: int):
+    if not previous:
+        return None
+    return round((current - previous) / previous, 4)
+
+
+def _shape_trend(intent, unit, window, current_buckets, previous_buckets,
+                 current_rows, previous_rows) -> dict:
+    current = _dense(current_rows, current_buckets)
+    previous = _dense(previous_rows, previous_buckets)
+    return {
+        "providerName": intent.get("providerName"),
+        "useCase": intent.get("useCase"),
+        "timeWindowDays": window,
+        "granularity": unit,
+        "bucketStarts": [b.isoformat() for b in current_buckets],
+        "current": current,
+        "previousBucketStarts": [b.isoformat() for b in previous_buckets],
+        "previous": previous,
+        "change": {
+            "totalProofs": _change(current["total"], previous["total"]),
+            "successfulProofs": _change(current["successful"], previous["successful"]),
+        },
+    }
+
+
+def _demo_mock_trend(intent, unit, window, current_buckets, previous_buckets) -> dict:
+    """Deterministic demo curve when MongoDB is not available."""
+    def curve(buckets, scale):
+        total = [int(scale * (6 + (i * 7) % 5)) for i in range(len(buckets))]
+        return [{"_id": b, "totalProofs": t, "successfulProofs": int(t * 0.94)}
+                for b, t in zip(buckets, total)]
+    return _shape_trend(intent, unit, window, current_buckets, previous_buckets,
+                        curve(current_buckets, 1.0), curve(previous_buckets, 0.85))
+
+
+def _window_facet(time_field: str, unit: str, start: datetime, end: datetime) -> list:
+    return [
+        {"$match": {time_field: {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {"$dateTrunc": {"date": f"${time_field}", "unit": unit, "startOfWeek": "monday"}},
+            "totalProofs": {"$sum": 1},
+            "successfulProofs": {"$sum": {"$cond": [{"$eq": ["$result", True]}, 1, 0]}},
+        }},
+    ]
+
+
+async def aget_proof_trend(intent: dict, granularity: str = None) -> dict:
+    """
+    Proof counts per bucket over the intent's window, plus the previous
+    window of the same length, with relative change. Buckets with no
+    proofs are present as zeros.
+    """
+    window = intent.get("timeWindowDays") or 7
+    unit = granularity or default_granularity(window)
+    if unit not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}")
+
+    now = datetime.utcnow()
+    start = now - timedelta(days=window)
+    prev_start = start - timedelta(days=window)
+    current_buckets = _buckets(start, now, unit)
+    previous_buckets = _buckets(prev_start, start, unit)
+
+    if not is_available():
+        stats_source.inc(source="mock")
+        return _demo_mock_trend(intent, unit, window, current_buckets, previous_buckets)
+
+    # Same request fields on both paths (the mirror keeps them in `meta`).
+    request_query = {}
+    if intent.get("providerName"):
+        request_query["providerName"] = intent["providerName"]
+    if intent.get("useCase"):
+        request_query["useCase"] = intent["useCase"]
+
+    match = {"createdAt": {"$gte": prev_start, "$lt": now}}
+    if settings.TRENDS_TIMESERIES:
+        coll = get_async_collection(TIMESERIES_COLL)
+        match.update({f"meta.{k}": v for k, v in request_query.items()})
+    else:
+        coll = get_async_collection("proofResults")
+        if request_query:
+            request_ids = await get_async_collection("requests").distinct("requestId", request_query)
+            match["requestId"] = {"$in": request_ids}
+
+    cursor = await coll.aggregate([
+        {"$match": match},
+        {"$facet": {
+            "current": _window_facet("createdAt", unit, start, now),
+            "previous": _window_facet("createdAt", unit, prev_start, start),
+        }},
+    ])
+    facets = (await cursor.to_list(length=1) or [{}])[0]
+    stats_source.inc(source="timeseries" if settings.TRENDS_TIMESERIES else "raw")
+    return _shape_trend(intent, unit, window, current_buckets, previous_buckets,
+                        facets.get("current", []), facets.get("previous", []))
+
+
+# ---- time-series mirror ----
+
+def _timeseries_options() -> dict:
+    return {"timeField": "createdAt", "metaField": "meta", "granularity": "hours"}
+
+
+def ensure_timeseries_collection():
+    """Create the proofResultsTS time-series collection if it is missing."""
+    database = get_db()
+    if database is None or not is_available():
+        return
+    try:
+        database.create_collection(TIMESERIES_COLL, timeseries=_timeseries_options())
+        logger.info(f"Created time-series collection {TIMESERIES_COLL}.")
+    except CollectionInvalid:
+        pass  # already exists
+    except PyMongoError as e:
+        logger.error(f"Could not create {TIMESERIES_COLL}: {e}")
+
+
+def timeseries_docs(proofs: list, request_meta: dict) -> list:
+    """Mirror documents for newly ingested proofs (request_meta: requestId -> request)."""
+    docs = []
+    for p in proofs:
+        r = request_meta.get(p["requestId"], {})
+        docs.append({
+            "createdAt": p["createdAt"],
+            "meta": {
+                "requestId": p["requestId"],
+                "providerName": r.get("providerName") or p.get("provider"),
+                "useCase": r.get("useCase"),
+            },
+            "result": p["result"],
+            "userId": p.get("userId"),
+        })
+    return docs
+
+
+def rebuild_timeseries_mirror():
+    """Refill proofResultsTS from proofResults with a server-side $out."""
+    database = get_db()
+    database["proofResults"].aggregate([
+        {"$lookup": {
+            "from": "requests",
+            "localField": "requestId",
+            "foreignField": "requestId",
+            "pipeline": [{"$project": {"_id": 0, "providerName": 1, "useCase": 1}}],
+            "as": "_request",
+        }},
+        {"$project": {
+            "_id": 0,
+            "createdAt": 1,
+            "result": 1,
+            "userId": 1,
+            "meta": {
+                "requestId": "$requestId",
+                "providerName": {"$ifNull": [{"$first": "$_request.providerName"}, "$provider"]},
+                "useCase": {"$first": "$_request.useCase"},
+            },
+        }},
+        {"$out": {"db": settings.MONGO_DB_NAME, "coll": TIMESERIES_COLL,
+                  "timeseries": _timeseries_options()}},
+    ], allowDiskUse=True)
@@ -0,0 +1,263 @@
+# services/user_sketches.py
+
+import logging
+from datetime import datetime, timedelta
+
+from bson import Binary
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db.mongo import get_collection, is_available
+from db.mongo_async import get_async_collection
+from services.hll import DEFAULT_PRECISION, HyperLogLog, count_many, standard_error
+
+logger = logging.getLogger(__name__)
+
+# Mergeable unique-donor sketches stored in `userSketches`, one document
+# per key:
+#   {"k": "request", "r": requestId}
+#   {"k": "provider", "p": providerName, "c": useCase}
+#   {"k": "day", "p": providerName, "c": useCase, "d": day}
+# Each holds HyperLogLog registers plus a version used for optimistic
+# read-merge-write updates, so concurrent ingest batches never lose data.
+#
+# Day sketches answer windowed unique-donor questions, provider sketches
+# all-time ones, and request sketches fill the per-request unique user
+# counts of the stats (instead of an exact $addToSet per request).
+
+SKETCHES = "userSketches"
+_MAX_RETRIES = 5
+_DUPLICATE_KEY = 11000
+
+
+def _day(ts) -> datetime:
+    ts = ts or datetime.utcnow()
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def sketch_keys(proof: dict, request: dict) -> list:
+    provider = request.get("providerName") or proof.get("provider")
+    use_case = request.get("useCase")
+    return [
+        {"k": "request", "r": proof["requestId"]},
+        {"k": "provider", "p": provider, "c": use_case},
+        {"k": "day", "p": provider, "c": use_case, "d": _day(proof.get("createdAt"))},
+    ]
+
+
+def _batch_sketches(proofs: list, request_meta: dict) -> dict:
+    """Build one in-memory sketch per key touched by the batch."""
+    sketches: dict = {}
+    keys: dict = {}
+    for p in proofs:
+        user = p.get("userId")
+        if not user:
+            continue
+        for key in sketch_keys(p, request_meta.get(p["requestId"], {})):
+            kid = tuple(key.items())
+            keys[kid] = key
+            sketches.setdefault(kid, HyperLogLog()).add(user)
+    return {kid: (keys[kid], sketch) for kid, sketch in sketches.items()}
+
+
+def _covers(doc, sketch: HyperLogLog) -> bool:
+    """True if a stored sketch already includes everything in `sketch`."""
+    return doc is not None and HyperLogLog.from_bytes(doc["registers"]).covers(sketch)
+
+
+def _merge_ops(pending: dict, stored: dict) -> list:
+    """
+    One write per pending key: a versioned update of the stored registers
+    merged with ours, or an insert-only upsert for a key not stored yet.
+    Writes that lose a race are no-ops; the caller re-reads and retries.
+    """
+    now = datetime.utcnow()
+    ops = []
+    for kid, (key, sketch) in pending.items():
+        doc = stored.get(kid)
+        if doc is None:
+            ops.append(UpdateOne({"_id": key}, {"$setOnInsert": {
+                "precision": DEFAULT_PRECISION,
+                "registers": Binary(sketch.to_bytes()),
+                "version": 1,
+                "updatedAt": now,
+            }}, upsert=True))
+        else:
+            merged = HyperLogLog.from_bytes(doc["registers"]).merge(sketch)
+            ops.append(UpdateOne(
+                {"_id": key, "version": doc["version"]},
+                {"$set": {"registers": Binary(merged.to_bytes()), "updatedAt": now},
+                 "$inc": {"version": 1}},
+            ))
+    return ops
+
+
+def _raise_unless_duplicates(e: BulkWriteError):
+    # A duplicate key is a concurrent insert of the same key: retried.
+    if any(err.get("code") != _DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+        raise e
+
+
+def _still_pending(pending: dict, docs) -> tuple:
+    stored = {tuple(doc["_id"].items()): doc for doc in docs}
+    return {kid: v for kid, v in pending.items() if not _covers(stored.get(kid), v[1])}, stored
+
+
+def _pending_query(pending: dict) -> dict:
+    return {"_id": {"$in": [key for key, _ in pending.values()]}}
+
+
+def merge_sketches(sketches: dict):
+    """
+    Merge in-memory sketches (kid -> (key, sketch)) into the stored ones:
+    one read and one bulk write per round, repeated only for keys whose
+    write lost a race with another writer.
+    """
+    coll = get_collection(SKETCHES)
+    pending = sketches
+    for _ in range(_MAX_RETRIES):
+        pending, stored = _still_pending(pending, coll.find(_pending_query(pending)))
+        if not pending:
+            return
+        try:
+            coll.bulk_write(_merge_ops(pending, stored), ordered=False)
+        except BulkWriteError as e:
+            _raise_unless_duplicates(e)
+    logger.warning(f"Gave up merging {len(pending)} user sketches after {_MAX_RETRIES} rounds.")
+
+
+async def aupdate_sketches(proofs: list, request_meta: dict):
+    """Merge a batch of new proofs into the stored sketches (ingest hook)."""
+    coll = get_async_collection(SKETCHES)
+    pending = _batch_sketches(proofs, request_meta)
+    if not pending:
+        return
+    for _ in range(_MAX_RETRIES):
+        docs = await coll.find(_pending_query(pending)).to_list(length=None)
+        pending, stored = _still_pending(pending, docs)
+        if not pending:
+            return
+        try:
+            await coll.bulk_write(_merge_ops(pending, stored), ordered=False)
+        except BulkWriteError as e:
+            _raise_unless_duplicates(e)
+    logger.warning(f"Gave up merging {len(pending)} user sketches after {_MAX_RETRIES} rounds.")
+
+
+def _request_keys(request_ids: list) -> dict:
+    return {"_id": {"$in": [{"k": "request", "r": rid} for rid in request_ids]}}
+
+
+def _request_counts(docs) -> dict:
+    docs = list(docs)
+    counts = count_many([bytes(doc["registers"]) for doc in docs])
+    return {doc["_id"]["r"]: n for doc, n in zip(docs, counts)}
+
+
+def get_request_unique_users(request_ids: list) -> dict:
+    """Estimated unique users per requestId from the request sketches."""
+    if not request_ids:
+        return {}
+    return _request_counts(get_collection(SKETCHES).find(_request_keys(request_ids), {"registers": 1}))
+
+
+async def aget_request_unique_users(request_ids: list) -> dict:
+    """Async variant of get_request_unique_users."""
+    if not request_ids:
+        return {}
+    cursor = get_async_collection(SKETCHES).find(_request_keys(request_ids), {"registers": 1})
+    return _request_counts(await cursor.to_list(length=None))
+
+
+async def aestimate_unique_users(provider_name=None, use_case=None,
+                                 time_window_days: int = 7, exact: bool = False) -> dict:
+    """
+    Unique donors over the window: merge the per-day sketches (one read of
+    at most `time_window_days` small documents), or with `exact=True`
+    count distinct userIds from proofResults on the server. A window of
+    None or 0 means all time, answered from the provider sketches.
+    """
+    start = None
+    if time_window_days:
+        start = _day(datetime.utcnow() - timedelta(days=time_window_days - 1))
+    result = {
+        "providerName": provider_name,
+        "useCase": use_case,
+        "timeWindowDays": time_window_days,
+        "exact": exact,
+    }
+    if not is_available():
+        return {**result, "uniqueUsers": None}
+
+    if exact:
+        match = {"userId": {"$nin": [None, ""]}}
+        if start is not None:
+            match["createdAt"] = {"$gte": start}
+        request_query = {k: v for k, v in (("providerName", provider_name), ("useCase", use_case)) if v}
+        if request_query:
+            match["requestId"] = {"$in": await get_async_collection("requests").distinct(
+                "requestId", request_query)}
+        cursor = await get_async_collection("proofResults").aggregate([
+            {"$match": match},
+            {"$group": {"_id": "$userId"}},
+            {"$count": "n"},
+        ], allowDiskUse=True)
+        rows = await cursor.to_list(length=1)
+        return {**result, "uniqueUsers": rows[0]["n"] if rows else 0}
+
+    if start is None:
+        query = {"_id.k": "provider"}
+    else:
+        query = {"_id.k": "day", "_id.d": {"$gte": start}}
+    if provider_name:
+        query["_id.p"] = provider_name
+    if use_case:
+        query["_id.c"] = use_case
+    merged = HyperLogLog()
+    async for doc in get_async_collection(SKETCHES).find(query, {"registers": 1}):
+        merged.merge(HyperLogLog.from_bytes(doc["registers"]))
+    return {
+        **result,
+        "uniqueUsers": merged.count(),
+        "relativeStandardError": round(standard_error(), 4),
+    }
+
+
+def rebuild_sketches(batch_size: int = 50_000, max_keys: int = 10_000):
+    """
+    Recompute every sketch by streaming proofResults once.
+
+    Sketches are built in memory and merged into the (emptied) collection
+    whenever `max_keys` of them are held, so memory stays around
+    max_keys * 4 KiB however many requests and days there are. Stop
+    ingest while this runs, or batches merged before the reset are lost.
+    """
+    meta = {
+        r["requestId"]: r
+        for r in get_collection("requests").find(
+            {}, {"_id": 0, "requestId": 1, "providerName": 1, "useCase": 1})
+    }
+    # delete_many keeps the collection and its index (drop() would not).
+    get_collection(SKETCHES).delete_many({})
+
+    sketches: dict = {}
+    merged_keys = 0
+    cursor = get_collection("proofResults").find(
+        {"userId": {"$nin": [None, ""]}},
+        {"_id": 0, "requestId": 1, "userId": 1, "createdAt": 1, "provider": 1},
+        batch_size=batch_size,
+    )
+    for p in cursor:
+        for key in sketch_keys(p, meta.get(p["requestId"], {})):
+            kid = tuple(key.items())
+            if kid not in sketches:
+                sketches[kid] = (key, HyperLogLog())
+            sketches[kid][1].add(p["userId"])
+        if len(sketches) >= max_keys:
+            merge_sketches(sketches)
+            merged_keys += len(sketches)
+            sketches = {}
+    if sketches:
+        merge_sketches(sketches)
+        merged_keys += len(sketches)
+    logger.info(f"Rebuilt user sketches ({merged_keys} sketch merges).")
@@ -1,8 +1,22 @@
 # services/verification_analytics.py
 
+import asyncio
+import base64
 from datetime import datetime, timedelta
 
-from db.mongo import requests_coll, proofs_coll, DB_AVAILABLE
+from config import settings
+from db.mongo import get_collection, is_available
+from db.mongo_async import get_async_collection
+from services.metrics import mongo_documents, stats_source
+from services.rollups import aget_daily_totals, get_daily_totals
+from services.singleflight import SingleFlight
+from services.snapshot import snapshot_engine
+from services.stats_compaction import RequestSummary, request_sort_value
+from services.user_sketches import aget_request_unique_users, get_request_unique_users
+from models.serialization import dumps, loads
+
+# Concurrent identical stats queries share one aggregation.
+stats_flight = SingleFlight("stats")
 
 
 
@@ -53,62 +67,386 @@ def _demo_mock_stats(intent: dict) -> dict:
     }
 
 
-def get_provider_campaign_stats(intent: dict) -> dict:
-    """
-    If MongoDB is available, query real collections.
-    If not, return demo mock stats so the API always works.
-    """
-    # Fallback: no DB, use mock
-    if not DB_AVAILABLE or requests_coll is None or proofs_coll is None:
-        return _demo_mock_stats(intent)
-
-    # --- Your existing real Mongo logic below (unchanged) ---
-    # If you already have an aggregation pipeline, keep it.
-    # Example skeleton:
-
+def _campaign_query(intent: dict) -> dict:
+    """Build the `requests` filter for a provider/use-case/time-window intent."""
     provider_name = intent.get("providerName")
     use_case = intent.get("useCase")
-    time_window_days = intent.get("timeWindowDays", 7)
+    time_window_days = intent.get("timeWindowDays") or 7
 
-    now = datetime.utcnow()
-    cutoff = now - timedelta(days=time_window_days)
+    cutoff = datetime.utcnow() - timedelta(days=time_window_days)
 
     query = {}
     if provider_name:
+        # Canonical stored name (services/provider_index.py), the key the
+        # rollup, snapshot and trend paths filter on as well.
         query["providerName"] = provider_name
     if use_case:
         query["useCase"] = use_case
     query["createdAt"] = {"$gte": cutoff}
+    return query
 
-    matching_requests = list(requests_coll.find(query))
 
-    # Aggregate proofs for those requests
-    request_ids = [r["requestId"] for r in matching_requests]
-    proof_query = {"requestId": {"$in": request_ids}}
+# Request fields the stats and the answer actually use. Full documents
+# (requirement blobs, _id, ...) are only fetched when detail is requested.
+REQUEST_PROJECTION = {
+    "_id": 0,
+    "requestId": 1,
+    "providerName": 1,
+    "useCase": 1,
+    "description": 1,
+    "status": 1,
+    "createdAt": 1,
+    "expiresAt": 1,
+}
 
-    proofs = list(proofs_coll.find(proof_query))
 
-    total_proofs = len(proofs)
-    successful_proofs = sum(1 for p in proofs if p.get("result") is True)
-    success_rate = (successful_proofs / total_proofs) if total_proofs else 0.0
+def _campaign_pipeline(intent: dict, detail: bool = False, unique_users: bool = True) -> list:
+    """
+    Aggregation over `requests` that joins each matching request with its
+    proof counters: either a server-side $group of its proofResults
+    (totals, successes, unique users) or, with STATS_SOURCE=rollups, its
+    single precomputed requestRollups document.
 
-    # Attach per-request stats
-    for r in matching_requests:
-        rid = r["requestId"]
-        r_proofs = [p for p in proofs if p["requestId"] == rid]
-        r["stats"] = {
-            "totalProofs": len(r_proofs),
-            "successfulProofs": sum(1 for p in r_proofs if p.get("result") is True),
-        }
-        r["uniqueUserCount"] = len({p.get("userId") for p in r_proofs if p.get("userId")})
+    Uses the requests(providerName, useCase, createdAt) and
+    proofResults(requestId, result, userId) indexes from db.mongo.
+    """
+    stages = [{"$match": _campaign_query(intent)}]
+    if not detail:
+        stages.append({"$project": REQUEST_PROJECTION})
+    return stages + request_stats_stages(unique_users)
 
-    return {
-        "providerName": provider_name,
-        "useCase": use_case,
-        "timeWindowDays": time_window_days,
+
+def request_stats_stages(unique_users: bool = True) -> list:
+    """
+    Stages that attach `stats` and `uniqueUserCount` to each request
+    (uniqueUserCount is left None on the raw path without `unique_users`).
+    """
+    if settings.STATS_SOURCE == "rollups":
+        return [
+            {"$lookup": {
+                "from": "requestRollups",
+                "localField": "requestId",
+                "foreignField": "_id",
+                "as": "_rollup",
+            }},
+            {"$set": {"_r": {"$ifNull": [{"$first": "$_rollup"}, {}]}}},
+            {"$set": {
+                "stats": {
+                    "totalProofs": {"$ifNull": ["$_r.totalProofs", 0]},
+                    "successfulProofs": {"$ifNull": ["$_r.successfulProofs", 0]},
+                },
+                "uniqueUserCount": {"$ifNull": ["$_r.uniqueUsers", 0]},
+            }},
+            {"$unset": ["_rollup", "_r"]},
+        ]
+
+    group = {
+        "_id": None,
+        "totalProofs": {"$sum": 1},
+        "successfulProofs": {"$sum": {"$cond": [{"$eq": ["$result", True]}, 1, 0]}},
+    }
+    unique_user_count = None
+    if unique_users:
+        group["users"] = {"$addToSet": "$userId"}
+        unique_user_count = {"$size": {"$filter": {
+            "input": {"$ifNull": ["$_ps.users", []]},
+            "cond": {"$not": [{"$in": ["$$this", [None, ""]]}]},
+        }}}
+    return [
+        {"$lookup": {
+            "from": "proofResults",
+            "localField": "requestId",
+            "foreignField": "requestId",
+            "pipeline": [{"$group": group}],
+            "as": "_proofStats",
+        }},
+        {"$set": {"_ps": {"$ifNull": [{"$first": "$_proofStats"}, {}]}}},
+        {"$set": {
+            "stats": {
+                "totalProofs": {"$ifNull": ["$_ps.totalProofs", 0]},
+                "successfulProofs": {"$ifNull": ["$_ps.successfulProofs", 0]},
+            },
+            "uniqueUserCount": unique_user_count,
+        }},
+        {"$unset": ["_proofStats", "_ps"]},
+    ]
+
+
+def _sketch_unique_users(sort: str = None) -> bool:
+    """
+    With USER_SKETCHES the raw path skips the exact per-request $addToSet
+    of userIds and fills uniqueUserCount for the returned rows from the
+    request sketches, unless the rows are ranked by it.
+    """
+    return (settings.USER_SKETCHES and settings.STATS_SOURCE == "raw"
+            and (sort or settings.STATS_REQUEST_SORT) != "uniqueUsers")
+
+
+def _fill_unique_users(rows: list, counts: dict):
+    for row in rows:
+        row["uniqueUserCount"] = counts.get(row.get("requestId"), 0)
+
+
+def _request_summary(top_k: int = None, sort: str = None) -> RequestSummary:
+    return RequestSummary(
+        settings.STATS_MAX_REQUESTS if top_k is None else top_k,
+        sort or settings.STATS_REQUEST_SORT,
+    )
+
+
+def _campaign_result(intent: dict, summary: RequestSummary, source: str = None,
+                     totals: dict = None) -> dict:
+    """
+    Shape the accumulated per-request aggregates into the campaign stats
+    dict. `totals` (from dailyRollups) replaces the summed request totals.
+    """
+    source = source or settings.STATS_SOURCE
+    total_proofs = summary.total_proofs
+    successful_proofs = summary.successful_proofs
+    if totals is not None:
+        total_proofs = totals["totalProofs"]
+        successful_proofs = totals["successfulProofs"]
+
+    stats_source.inc(source=source)
+    if source == "rollups":
+        mongo_documents.inc(summary.count, collection="requests", kind="returned")
+        mongo_documents.inc(summary.count, collection="requestRollups", kind="scanned")
+        if totals is not None:
+            mongo_documents.inc(totals["days"], collection="dailyRollups", kind="scanned")
+    elif source == "raw":
+        mongo_documents.inc(summary.count, collection="requests", kind="returned")
+        mongo_documents.inc(total_proofs, collection="proofResults", kind="scanned")
+    success_rate = (successful_proofs / total_proofs) if total_proofs else 0.0
+
+    stats = {
+        "providerName": intent.get("providerName"),
+        "useCase": intent.get("useCase"),
+        "timeWindowDays": intent.get("timeWindowDays") or 7,
         "targetCount": 50,  # or pull from intent if you have it
-        "requests": matching_requests,
+        "requests": summary.requests(),
+        "requestCount": summary.count,
         "totalProofs": total_proofs,
         "successfulProofs": successful_proofs,
         "successRate": success_rate,
     }
+    if summary.truncated:
+        # The rest are available page by page from /analytics/requests.
+        stats["requestSort"] = summary.sort
+        stats["requestDistribution"] = summary.distribution()
+    return stats
+
+
+def _daily_totals_args(intent: dict) -> tuple:
+    return intent.get("providerName"), intent.get("useCase"), intent.get("timeWindowDays") or 7
+
+
+def _use_snapshot(detail: bool) -> bool:
+    return settings.STATS_SOURCE == "snapshot" and not detail and snapshot_engine.ready
+
+
+def _snapshot_stats(intent: dict, top_k: int = None, sort: str = None) -> dict:
+    summary = _request_summary(top_k, sort)
+    for row in snapshot_engine.campaign_rows(intent):
+        summary.add(row)
+    return _campaign_result(intent, summary, source="snapshot")
+
+
+def get_provider_campaign_stats(intent: dict, detail: bool = False,
+                                top_k: int = None, sort: str = None) -> dict:
+    """
+    If MongoDB is available, query real collections.
+    If not, return demo mock stats so the API always works.
+
+    Only the request fields in REQUEST_PROJECTION are fetched unless
+    `detail` is set. Per-request rows are streamed from the server-side
+    cursor: `requests` keeps the `top_k` best by `sort` (defaults
+    STATS_MAX_REQUESTS / STATS_REQUEST_SORT, top_k=0 keeps all), so memory
+    does not grow with the number of matching requests.
+
+    With STATS_SOURCE=rollups the window totals are summed from
+    dailyRollups (O(days): proofs created in the window) and `requests`
+    from requestRollups. With STATS_SOURCE=snapshot (and a published
+    snapshot) the stats come from the in-process columnar engine instead,
+    even while MongoDB is down; `detail` still needs the full documents
+    from MongoDB.
+    """
+    if _use_snapshot(detail):
+        return _snapshot_stats(intent, top_k, sort)
+
+    # Fallback: no DB, use mock
+    if not is_available():
+        stats_source.inc(source="mock")
+        return _demo_mock_stats(intent)
+
+    # Totals, successes and unique users are computed per request on the
+    # server; only one small document per matching request comes back.
+    requests_coll = get_collection("requests")
+    summary = _request_summary(top_k, sort)
+    from_sketches = _sketch_unique_users(sort)
+    pipeline = _campaign_pipeline(intent, detail, unique_users=not from_sketches)
+    for row in requests_coll.aggregate(pipeline, batchSize=settings.STATS_CURSOR_BATCH_SIZE):
+        summary.add(row)
+    if from_sketches:
+        rows = summary.requests()
+        _fill_unique_users(rows, get_request_unique_users([r.get("requestId") for r in rows]))
+    totals = None
+    if settings.STATS_SOURCE == "rollups":
+        totals = get_daily_totals(*_daily_totals_args(intent))
+    return _campaign_result(intent, summary, totals=totals)
+
+
+async def aget_provider_campaign_stats(intent: dict, detail: bool = False,
+                                       top_k: int = None, sort: str = None) -> dict:
+    """Async variant of get_provider_campaign_stats using the async client."""
+    if _use_snapshot(detail):
+        # The NumPy scan is CPU-bound: keep it off the event loop.
+        return await asyncio.to_thread(_snapshot_stats, intent, top_k, sort)
+
+    if not is_available():
+        stats_source.inc(source="mock")
+        return _demo_mock_stats(intent)
+
+    async def _requests():
+        requests_coll = get_async_collection("requests")
+        summary = _request_summary(top_k, sort)
+        from_sketches = _sketch_unique_users(sort)
+        cursor = await requests_coll.aggregate(
+            _campaign_pipeline(intent, detail, unique_users=not from_sketches),
+            batchSize=settings.STATS_CURSOR_BATCH_SIZE,
+        )
+        async for row in cursor:
+            summary.add(row)
+        if from_sketches:
+            rows = summary.requests()
+            _fill_unique_users(rows, await aget_request_unique_users(
+                [r.get("requestId") for r in rows]))
+        return summary
+
+    async def _query():
+        if settings.STATS_SOURCE != "rollups":
+            return _campaign_result(intent, await _requests())
+        summary, totals = await asyncio.gather(
+            _requests(), aget_daily_totals(*_daily_totals_args(intent))
+        )
+        return _campaign_result(intent, summary, totals=totals)
+
+    # Callers add keys (trend, uniqueDonors) to the result, so each gets
+    # its own top-level dict.
+    key = (_stats_group_key(intent), detail, top_k, sort)
+    stats = await stats_flight.do(key, _query)
+    return dict(stats)
+
+
+def _stats_group_key(intent: dict) -> tuple:
+    """Intents with the same key share one stats query."""
+    return (
+        intent.get("providerName"),
+        intent.get("useCase"),
+        intent.get("timeWindowDays") or 7,
+    )
+
+
+# ---- paginated per-request breakdown ----
+
+# Server-side sort expressions for services.stats_compaction.REQUEST_SORT_KEYS
+_SORT_EXPRESSIONS = {
+    "proofs": "$stats.totalProofs",
+    "successfulProofs": "$stats.successfulProofs",
+    "successRate": {"$cond": [
+        {"$gt": ["$stats.totalProofs", 0]},
+        {"$divide": ["$stats.successfulProofs", "$stats.totalProofs"]},
+        0.0,
+    ]},
+    "uniqueUsers": "$uniqueUserCount",
+    "createdAt": "$createdAt",
+}
+
+
+def encode_page_cursor(value, request_id: str) -> str:
+    """Opaque keyset cursor: the last row's sort value and requestId."""
+    return base64.urlsafe_b64encode(dumps([value, request_id])).decode("ascii")
+
+
+def decode_page_cursor(token: str, sort: str) -> tuple:
+    try:
+        value, request_id = loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        if sort == "createdAt" and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    return value, request_id
+
+
+def _after_cursor(field: str, value, request_id: str, descending: bool) -> dict:
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "requestId": {"$gt": request_id}},
+    ]}
+
+
+def _requests_page_pipeline(intent: dict, sort: str, descending: bool,
+                            limit: int, after: tuple = None) -> list:
+    """
+    One page of matching requests with their proof counters, ordered by
+    `sort` then requestId. Keyset pagination: `after` is the decoded
+    cursor of the previous page, so no page costs more than the first.
+    """
+    direction = -1 if descending else 1
+    stages = [{"$match": _campaign_query(intent)}, {"$project": REQUEST_PROJECTION}]
+
+    if sort == "createdAt":
+        # Stored field: page the requests first and join only the page.
+        if after:
+            stages.append({"$match": _after_cursor("createdAt", *after, descending)})
+        return stages + [
+            {"$sort": {"createdAt": direction, "requestId": 1}},
+            {"$limit": limit + 1},
+        ] + request_stats_stages()
+
+    stages += request_stats_stages()
+    stages.append({"$set": {"_sortKey": _SORT_EXPRESSIONS[sort]}})
+    if after:
+        stages.append({"$match": _after_cursor("_sortKey", *after, descending)})
+    return stages + [
+        {"$sort": {"_sortKey": direction, "requestId": 1}},  # top-k sort on the server
+        {"$limit": limit + 1},
+        {"$unset": "_sortKey"},
+    ]
+
+
+async def aget_campaign_requests_page(intent: dict, sort: str = "proofs", order: str = "desc",
+                                      limit: int = 50, cursor: str = None) -> dict:
+    """
+    Per-request breakdown for an intent, one page at a time.
+
+    Returns `items` (at most `limit` rows shaped like stats["requests"])
+    and `nextCursor`, which is None on the last page. Raises ValueError
+    for an unknown sort key or a malformed cursor.
+    """
+    if sort not in _SORT_EXPRESSIONS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    after = decode_page_cursor(cursor, sort) if cursor else None
+    page = {
+        "providerName": intent.get("providerName"),
+        "useCase": intent.get("useCase"),
+        "timeWindowDays": intent.get("timeWindowDays") or 7,
+        "sort": sort,
+        "order": order,
+    }
+
+    if not is_available():
+        return {**page, "items": _demo_mock_stats(intent)["requests"], "nextCursor": None}
+
+    requests_coll = get_async_collection("requests")
+    rows = await (await requests_coll.aggregate(
+        _requests_page_pipeline(intent, sort, order == "desc", limit, after)
+    )).to_list(length=limit + 1)
+    mongo_documents.inc(len(rows), collection="requests", kind="returned")
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_page_cursor(request_sort_value(last, sort), last.get("requestId"))
+    return {**page, "items": rows, "nextCursor": next_cursor}
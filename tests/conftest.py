@@ -0,0 +1,22 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+# Settings and the ChatOpenAI clients are created at import time. No test
+# talks to OpenAI or MongoDB: LLM chains and collections are replaced per
+# test (see tests/fake_mongo.py).
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fake_mongo import FakeDB  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory database wired into every module that reads collections."""
+    fake = FakeDB()
+    fake.install(monkeypatch)
+    return fake
@@ -0,0 +1,468 @@
+# tests/fake_mongo.py
+#
+# Minimal in-memory stand-in for the pymongo collections the app uses:
+# the query/update operators and bulk/insert semantics the services rely
+# on (upserts, duplicate keys, $inc/$max/$setOnInsert), sync and async.
+# Aggregations only run $match/$project/$sort/$limit; anything else goes
+# through a per-collection `aggregate_handler(pipeline)`.
+
+import copy
+import sys
+
+from pymongo import InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+_MISSING = object()
+
+
+def get_path(doc, path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def set_path(doc: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part, {})
+    doc.pop(parts[-1], None)
+
+
+def _compare(op: str, value, arg) -> bool:
+    if op == "$in":
+        return value in arg
+    if op == "$nin":
+        return value not in arg
+    if op == "$ne":
+        return value != arg
+    if op == "$eq":
+        return value == arg
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {"$gt": value > arg, "$gte": value >= arg,
+                "$lt": value < arg, "$lte": value <= arg}[op]
+    except TypeError:
+        return False
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+            continue
+        value = get_path(doc, key)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$regex":
+                    continue  # regex filters are asserted on, not evaluated
+                v = None if value is _MISSING and op in ("$in", "$nin", "$ne", "$eq") else value
+                if not _compare(op, v, arg):
+                    return False
+        elif (None if value is _MISSING else value) != cond:
+            return False
+    return True
+
+
+def project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {}
+        for k in include:
+            v = get_path(doc, k)
+            if v is not _MISSING:
+                set_path(out, k, copy.deepcopy(v))
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    out = copy.deepcopy(doc)
+    for k, v in projection.items():
+        if not v:
+            unset_path(out, k)
+    return out
+
+
+def sort_docs(docs: list, spec) -> list:
+    if isinstance(spec, str):
+        spec = [(spec, 1)]
+    elif isinstance(spec, dict):
+        spec = list(spec.items())
+    for field, direction in reversed(list(spec)):
+        def key(d, field=field):
+            value = get_path(d, field)
+            return (0, None) if value in (_MISSING, None) else (1, value)
+        docs = sorted(docs, key=key, reverse=direction < 0)
+    return docs
+
+
+class Cursor:
+    def __init__(self, docs: list):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        self._docs = sort_docs(self._docs, [(key, direction)] if isinstance(key, str) else key)
+        return self
+
+    def limit(self, n):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+    def to_list(self, length=None):
+        return self._docs[:length] if length else list(self._docs)
+
+
+class FakeCollection:
+    def __init__(self, name: str, unique: tuple = ()):
+        self.name = name
+        self.docs: list = []
+        self.unique = ("_id",) + tuple(unique)
+        self.indexes: list = []
+        self.pipelines: list = []
+        self.aggregate_handler = None
+        self._next_id = 1
+
+    # ---- helpers ----
+
+    def _check_unique(self, doc: dict, ignore=None):
+        for field in self.unique:
+            value = get_path(doc, field)
+            if value is _MISSING:
+                continue
+            for other in self.docs:
+                if other is not ignore and get_path(other, field) == value:
+                    raise DuplicateKeyError(f"E11000 duplicate key {field}: {value!r}", 11000)
+
+    def _insert(self, doc: dict):
+        doc = copy.deepcopy(doc)
+        if "_id" not in doc:
+            doc["_id"] = self._next_id
+            self._next_id += 1
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return doc["_id"]
+
+    def _apply_update(self, doc: dict, update: dict, inserting: bool):
+        for op, fields in update.items():
+            for path, value in fields.items():
+                current = get_path(doc, path)
+                if op == "$set":
+                    set_path(doc, path, copy.deepcopy(value))
+                elif op == "$setOnInsert":
+                    if inserting:
+                        set_path(doc, path, copy.deepcopy(value))
+                elif op == "$inc":
+                    set_path(doc, path, (0 if current is _MISSING else current) + value)
+                elif op == "$max":
+                    if current is _MISSING or value > current:
+                        set_path(doc, path, value)
+                elif op == "$min":
+                    if current is _MISSING or value < current:
+                        set_path(doc, path, value)
+                elif op == "$unset":
+                    unset_path(doc, path)
+                elif op == "$push":
+                    if current is _MISSING:
+                        set_path(doc, path, [])
+                    get_path(doc, path).append(value)
+                else:
+                    raise NotImplementedError(op)
+
+    def _update(self, query, update, upsert=False, many=False, replace=False) -> dict:
+        hits = [d for d in self.docs if matches(d, query)]
+        if not many:
+            hits = hits[:1]
+        for d in hits:
+            before = copy.deepcopy(d)
+            if replace:
+                keep = d["_id"]
+                d.clear()
+                d.update(copy.deepcopy(update))
+                d["_id"] = keep
+            else:
+                self._apply_update(d, update, inserting=False)
+            d["__modified"] = d != before
+        modified = sum(d.pop("__modified") for d in hits)
+        if hits or not upsert:
+            return {"n": len(hits), "nModified": modified, "upserted": None}
+        doc = {k: v for k, v in (query or {}).items()
+               if not k.startswith("$") and not (isinstance(v, dict) and any(
+                   str(x).startswith("$") for x in v))}
+        new = {}
+        for k, v in doc.items():
+            set_path(new, k, copy.deepcopy(v))
+        if replace:
+            new.update(copy.deepcopy(update))
+        else:
+            self._apply_update(new, update, inserting=True)
+        return {"n": 1, "nModified": 0, "upserted": self._insert(new)}
+
+    # ---- sync API ----
+
+    def find(self, query=None, projection=None, sort=None, batch_size=None, **kwargs):
+        docs = [d for d in self.docs if matches(d, query)]
+        if sort:
+            docs = sort_docs(docs, sort)
+        return Cursor([project(d, projection) for d in docs])
+
+    def find_one(self, query=None, projection=None, sort=None, **kwargs):
+        for d in self.find(query, sort=sort):
+            return project(d, projection)
+        return None
+
+    def distinct(self, field, query=None, **kwargs):
+        values = []
+        for d in self.docs:
+            if matches(d, query):
+                v = get_path(d, field)
+                if v is not _MISSING and v not in values:
+                    values.append(v)
+        return values
+
+    def count_documents(self, query=None, **kwargs):
+        return sum(matches(d, query) for d in self.docs)
+
+    def insert_one(self, doc, **kwargs):
+        return InsertOneResult(self._insert(doc), True)
+
+    def insert_many(self, docs, ordered=True, **kwargs):
+        ids, errors = [], []
+        for i, doc in enumerate(docs):
+            try:
+                ids.append(self._insert(doc))
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(ids)})
+        return InsertManyResult(ids, True)
+
+    def update_one(self, query, update, upsert=False, **kwargs):
+        return UpdateResult(self._update(query, update, upsert), True)
+
+    def update_many(self, query, update, upsert=False, **kwargs):
+        return UpdateResult(self._update(query, update, upsert, many=True), True)
+
+    def replace_one(self, query, doc, upsert=False, **kwargs):
+        return UpdateResult(self._update(query, doc, upsert, replace=True), True)
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0,
+                  "nRemoved": 0, "upserted": [], "writeErrors": []}
+        for i, op in enumerate(requests):
+            try:
+                if isinstance(op, InsertOne):
+                    self._insert(op._doc)
+                    result["nInserted"] += 1
+                    continue
+                raw = self._update(op._filter, op._doc, op._upsert,
+                                   many=isinstance(op, UpdateMany),
+                                   replace=isinstance(op, ReplaceOne))
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+                continue
+            if raw["upserted"] is not None:
+                result["nUpserted"] += 1
+                result["upserted"].append({"index": i, "_id": raw["upserted"]})
+            else:
+                result["nMatched"] += raw["n"]
+                result["nModified"] += raw["nModified"]
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def delete_many(self, query, **kwargs):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not matches(d, query)]
+        return DeleteResult({"n": before - len(self.docs)}, True)
+
+    def drop(self, **kwargs):
+        self.docs = []
+        self.indexes = []
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return "_".join(f"{k}_{v}" for k, v in keys) if isinstance(keys, list) else keys
+
+    def index_information(self):
+        return {f"i{n}": {"key": keys} for n, (keys, _) in enumerate(self.indexes)}
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        if self.aggregate_handler is not None:
+            return Cursor(self.aggregate_handler(pipeline))
+        docs = [copy.deepcopy(d) for d in self.docs]
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if matches(d, arg)]
+            elif op == "$project":
+                docs = [project(d, arg) for d in docs]
+            elif op == "$sort":
+                docs = sort_docs(docs, arg)
+            elif op == "$limit":
+                docs = docs[:arg]
+            else:
+                raise NotImplementedError(f"{op}: set aggregate_handler for {self.name}")
+        return Cursor(docs)
+
+
+class AsyncCursor:
+    def __init__(self, cursor: Cursor):
+        self._docs = list(cursor)
+
+    def __aiter__(self):
+        self._it = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return self._docs[:length] if length else list(self._docs)
+
+
+class FakeAsyncCollection:
+    """pymongo AsyncCollection surface over the same FakeCollection."""
+
+    def __init__(self, sync: FakeCollection):
+        self.sync = sync
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.sync.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        return AsyncCursor(self.sync.aggregate(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self.sync, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class FakeSession:
+    """
+    Runs with_transaction callbacks directly (writes are not rolled back).
+    Without `transactions` it fails like a standalone server.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _check(self):
+        self.db.transactions_started += 1
+        if not self.db.transactions:
+            raise OperationFailure("Transaction numbers are only allowed on a replica set "
+                                   "member or mongos", 20)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def with_transaction(self, callback, **kwargs):
+        self._check()
+        return callback(self)
+
+
+class _AsyncWithTransaction(FakeSession):
+    async def with_transaction(self, callback, **kwargs):
+        self._check()
+        return await callback(self)
+
+
+class FakeClient:
+    def __init__(self, db, session_class=FakeSession):
+        self.db = db
+        self.session_class = session_class
+
+    def start_session(self, **kwargs):
+        return self.session_class(self.db)
+
+
+class FakeDB:
+    """Collections by name; `unique` declares unique keys beyond _id."""
+
+    UNIQUE = {"proofResults": ("proofId",), "requests": ("requestId",), "users": ("userId",)}
+
+    def __init__(self):
+        self.collections: dict = {}
+        self.available = True
+        self.transactions = True  # False behaves like a standalone server
+        self.transactions_started = 0
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name, self.UNIQUE.get(name, ()))
+        return self.collections[name]
+
+    def get_collection(self, name: str) -> FakeCollection:
+        return self[name]
+
+    def get_async_collection(self, name: str) -> FakeAsyncCollection:
+        return FakeAsyncCollection(self[name])
+
+    def is_available(self) -> bool:
+        return self.available
+
+    def get_client(self) -> FakeClient:
+        return FakeClient(self)
+
+    def get_async_client(self) -> FakeClient:
+        return FakeClient(self, _AsyncWithTransaction)
+
+    def install(self, monkeypatch):
+        """Point every loaded app module's collection accessors at this DB."""
+        import main  # noqa: F401  (loads every module the app uses)
+        for name, module in list(sys.modules.items()):
+            if name.split(".")[0] not in ("main", "services", "llm", "db", "scripts"):
+                continue
+            for attr in ("get_collection", "get_async_collection", "is_available",
+                         "get_client", "get_async_client"):
+                if hasattr(module, attr):
+                    monkeypatch.setattr(module, attr, getattr(self, attr))
@@ -0,0 +1,38 @@
+# tests/test_answer_templates.py
+
+from llm.answer_templates import NO_RECORDS, render_template_answer, stats_only_answer
+
+STATS = {"totalProofs": 40, "successfulProofs": 30, "timeWindowDays": 7}
+
+
+def test_blood_donation_answers_talk_about_donors():
+    intent = {"providerName": "City Hospital Blood Drive", "useCase": "blood_donation",
+              "targetCount": 50}
+    answer = render_template_answer("How many donors?", intent, STATS)
+    assert answer.startswith("City Hospital Blood Drive recorded 30 successful donor verifications")
+    assert "target of 50 donors, so 20 more are needed" in answer
+
+
+def test_attendance_answers_talk_about_attendees():
+    intent = {"providerName": "Metro Office Attendance", "useCase": "workplace_attendance",
+              "locality": "L2", "targetCount": 25}
+    answer = render_template_answer("How was attendance?", intent, STATS)
+    assert "verified 30 of 40 attendees" in answer
+    assert "target of 25 attendees" in answer
+    assert "donor" not in answer
+
+
+def test_use_case_falls_back_to_the_stats_then_a_neutral_noun():
+    answer = render_template_answer("", {}, dict(STATS, useCase="workplace_attendance"))
+    assert "attendee verifications" in answer
+    assert "participant verifications" in render_template_answer("", {}, STATS)
+
+
+def test_zero_successful_proofs_are_left_to_the_llm():
+    stats = {"totalProofs": 12, "successfulProofs": 0}
+    assert render_template_answer("How many donors?", {"useCase": "blood_donation"}, stats) is None
+    assert stats_only_answer({"useCase": "blood_donation"}, stats) == NO_RECORDS
+
+
+def test_planning_questions_are_left_to_the_llm():
+    assert render_template_answer("Plan our next drive", {}, STATS) is None
@@ -0,0 +1,78 @@
+# tests/test_bench_pipeline.py
+
+import argparse
+import asyncio
+import tracemalloc
+
+import pytest
+
+import main
+from db import mongo
+from llm import verification_answer, verification_intent
+from scripts import bench_pipeline
+from services import metrics, stats_compaction
+
+
+@pytest.fixture
+def bench(db, monkeypatch):
+    db.available = False  # mock stats
+    monkeypatch.setattr(mongo, "check_health", lambda: False)
+    monkeypatch.setattr(stats_compaction, "count_tokens", lambda text: len(text) // 4)
+    # _install_fake_llms swaps module globals: restore them afterwards.
+    monkeypatch.setattr(verification_intent, "intent_chain", verification_intent.intent_chain)
+    monkeypatch.setattr(verification_answer, "answer_chain", verification_answer.answer_chain)
+    tracing = []
+    real_intent = main.aextract_verification_intent
+
+    async def traced_intent(question):
+        tracing.append(tracemalloc.is_tracing())
+        return await real_intent(question)
+
+    monkeypatch.setattr(main, "aextract_verification_intent", traced_intent)
+    return tracing
+
+
+def _args(**overrides):
+    args = dict(concurrency=4, warmup=2, intent_latency=0.0, answer_latency=0.0,
+                answer_tokens=5, no_cache=False, no_rules=False, memory_requests=3,
+                mock_stats=True)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_timed_pass_runs_without_tracemalloc(bench):
+    args = _args()
+    bench_pipeline._install_fake_llms(args)
+    questions = ["How many B+ donors verified in L1 over the last 7 days?"] * 10
+    results = asyncio.run(bench_pipeline._run(args, questions))
+
+    assert results["requests"] == 10 and results["errors"] == 0
+    assert results["latencyMs"]["p50"] >= 0 and "total" in results["stageMs"]
+    assert results["memory"]["tracemallocRequests"] == 3
+    assert results["memory"]["maxRssMB"] > 0
+    # warmup and timed pass untraced, then only the memory pass is traced
+    assert bench == [False] * 12 + [True] * 3
+
+
+def test_memory_pass_can_be_skipped(bench):
+    args = _args(memory_requests=0)
+    bench_pipeline._install_fake_llms(args)
+    results = asyncio.run(bench_pipeline._run(args, ["What's the weather like today?"] * 3))
+    assert "tracemallocPeakMB" not in results["memory"]
+
+
+def test_fake_models_report_token_usage(bench):
+    args = _args(no_rules=True, memory_requests=0)
+    bench_pipeline._install_fake_llms(args)
+    before = dict(metrics.llm_tokens._values)
+    asyncio.run(bench_pipeline._run(args, ["How did City Hospital Blood Drive do this week?"] * 3))
+    for chain in ("intent", "answer"):
+        key = (chain, "completion")
+        assert metrics.llm_tokens._values.get(key, 0) > before.get(key, 0)
+
+
+def test_refuses_to_benchmark_mock_stats_silently(bench):
+    args = _args(mock_stats=False)
+    bench_pipeline._install_fake_llms(args)
+    with pytest.raises(SystemExit, match="--mock-stats"):
+        asyncio.run(bench_pipeline._run(args, ["What's the weather like today?"]))
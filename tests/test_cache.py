@@ -0,0 +1,73 @@
+# tests/test_cache.py
+
+import time
+
+from llm.cache import LRUCache, normalize_question
+
+
+def test_normalize_question_ignores_case_punctuation_and_spacing():
+    assert normalize_question("  How many O+ donors,  last WEEK?? ") == \
+        normalize_question("how many o+ donors last week")
+    # blood type signs are meaningful
+    assert normalize_question("O+ donors") != normalize_question("O- donors")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache("test-lru", max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = LRUCache("test-ttl", ttl_seconds=10)
+    cache.set("a", 1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_invalidate_tag_drops_related_entries():
+    cache = LRUCache("test-tags")
+    cache.set("q1", "x", tag="Institution A")
+    cache.set("q2", "y", tag="Institution A")
+    cache.set("q3", "z", tag="Institution B")
+    assert cache.invalidate_tag("Institution A") == 2
+    assert cache.get("q3") == "z"
+
+
+def test_persisted_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LRUCache("test-persist", persist_path=path)
+    cache.set("q", {"providerName": "P"})
+    cache.flush()
+    assert LRUCache("test-persist", persist_path=path).get("q") == {"providerName": "P"}
+
+
+def test_persisted_writes_are_queued_and_committed_in_batches(tmp_path, monkeypatch):
+    cache = LRUCache("test-behind", max_size=2, persist_path=str(tmp_path / "cache.sqlite"))
+    commits = []
+    monkeypatch.setattr(cache, "_conn", CountingConnection(cache._conn, commits))
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert commits == []  # set() never touches SQLite
+    cache.flush()
+    assert commits == [1]
+    rows = cache._conn.execute("SELECT key FROM cache WHERE name = 'test-behind'").fetchall()
+    assert sorted(k for k, in rows) == ["b", "c"]  # "a" was evicted
+
+
+class CountingConnection:
+    def __init__(self, conn, commits):
+        self._conn, self._commits = conn, commits
+
+    def commit(self):
+        self._commits.append(1)
+        self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
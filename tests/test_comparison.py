@@ -0,0 +1,63 @@
+# tests/test_comparison.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import settings
+from services import comparison
+
+INTENT = {"providerNames": ["Institution A", "Institution B"], "useCase": "blood_donation",
+          "timeWindowsDays": [7, 30]}
+
+
+def test_every_combination_is_one_facet_of_one_pipeline():
+    now = datetime(2025, 6, 1)
+    cells = comparison._cells(INTENT)
+    assert cells == [("Institution A", None, 7), ("Institution A", None, 30),
+                     ("Institution B", None, 7), ("Institution B", None, 30)]
+    pipeline = comparison._comparison_pipeline(INTENT, cells, now)
+    match = pipeline[0]["$match"]
+    assert match["createdAt"] == {"$gte": now - timedelta(days=30)}
+    assert match["providerName"] == {"$in": ["Institution A", "Institution B"]}
+    assert match["useCase"] == "blood_donation"
+    facets = pipeline[-1]["$facet"]
+    assert list(facets) == ["c0", "c1", "c2", "c3"]
+    assert facets["c2"][0]["$match"] == {"createdAt": {"$gte": now - timedelta(days=7)},
+                                         "providerName": "Institution B"}
+
+
+def test_localities_match_the_request_description():
+    cells = comparison._cells({"localities": ["L1", "L2"]})
+    facets = comparison._comparison_pipeline({"localities": ["L1", "L2"]}, cells,
+                                             datetime(2025, 6, 1))[-1]["$facet"]
+    assert facets["c1"][0]["$match"]["description"]["$regex"] == r"\bL2\b"
+
+
+def test_too_many_combinations_are_refused(monkeypatch):
+    monkeypatch.setattr(settings, "COMPARISON_MAX_CELLS", 3)
+    with pytest.raises(ValueError):
+        comparison._cells(INTENT)
+
+
+def test_facet_totals_become_table_rows(db):
+    db["requests"].aggregate_handler = lambda pipeline: [{
+        "c0": [{"requests": 2, "totalProofs": 10, "successfulProofs": 9}],
+        "c1": [{"requests": 5, "totalProofs": 40, "successfulProofs": 30}],
+        "c2": [],
+    }]
+    stats = asyncio.run(comparison.aget_comparison_stats(INTENT))
+    assert len(db["requests"].pipelines) == 1
+    assert stats["comparison"]["columns"] == comparison.COLUMNS
+    rows = stats["comparison"]["rows"]
+    assert rows[0] == ["Institution A", None, 7, 2, 10, 9, 0.9]
+    assert rows[2] == ["Institution B", None, 7, 0, 0, 0, 0.0]
+    assert stats["timeWindowsDays"] == [7, 30]
+
+
+def test_mock_table_without_a_database(db):
+    db.available = False
+    stats = asyncio.run(comparison.aget_comparison_stats(INTENT))
+    assert len(stats["comparison"]["rows"]) == 4
+    assert not db["requests"].pipelines
@@ -0,0 +1,96 @@
+# tests/test_generate_zkloci_data.py
+
+import random
+from datetime import datetime
+
+import pytest
+
+from scripts import generate_zkloci_data as gen
+from tests.fake_mongo import FakeDB
+
+
+class _Client:
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return self.db
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDB()
+    batches = db.batches = []
+    insert_many = db["proofResults"].insert_many
+
+    def record(docs, **kwargs):
+        batches.append(len(docs))
+        return insert_many(docs, **kwargs)
+
+    db["proofResults"].insert_many = record
+    db.rebuilt = []
+    monkeypatch.setattr(gen, "MongoClient", lambda *args, **kwargs: _Client(db))
+    monkeypatch.setattr(gen, "rebuild_derived", lambda *args: db.rebuilt.append(args))
+    return db
+
+
+def _job(**overrides):
+    job = dict(seed=1, uri="mongodb://fake", db_name="zk", providers=[0, 3], days=30,
+               requests_per_provider=4, proofs_per_request=25, proof_distribution="fixed",
+               users=50, success_alpha=8, success_beta=2, batch_size=40)
+    job.update(overrides)
+    return job
+
+
+def test_worker_streams_bounded_batches(fake_db):
+    n_requests, n_proofs = gen._worker(_job())
+    assert (n_requests, n_proofs) == (8, 200)
+    assert max(fake_db.batches) <= 40 and sum(fake_db.batches) == 200
+    names = {r["providerName"] for r in fake_db["requests"].docs}
+    assert names == {"City Hospital Blood Drive", "Community Blood Drive 3"}
+    proof = fake_db["proofResults"].docs[0]
+    assert proof["proofId"] == "req-000000-0000000-0000000"
+    assert proof["createdAt"] >= fake_db["requests"].find_one({"requestId": proof["requestId"]})["createdAt"]
+
+
+def test_recent_requests_get_no_future_proofs(fake_db):
+    start = datetime.utcnow()
+    gen._worker(_job(days=0))
+    latest = max(p["createdAt"] for p in fake_db["proofResults"].docs)
+    assert start <= latest <= datetime.utcnow()
+
+
+def test_same_seed_generates_the_same_data(fake_db):
+    gen._worker(_job())
+    first = [(p["proofId"], p["userId"], p["result"]) for p in fake_db["proofResults"].docs]
+    fake_db["proofResults"].docs.clear()
+    fake_db["requests"].docs.clear()
+    gen._worker(_job())
+    assert [(p["proofId"], p["userId"], p["result"]) for p in fake_db["proofResults"].docs] == first
+
+
+@pytest.mark.parametrize("distribution", ["fixed", "uniform", "lognormal"])
+def test_proof_counts_average_near_the_mean(distribution):
+    rng = random.Random(0)
+    counts = [gen._proof_count(rng, 100, distribution) for _ in range(4000)]
+    assert min(counts) >= 0
+    assert 85 <= sum(counts) / len(counts) <= 115
+
+
+def test_seed_scaled_uses_the_generator(fake_db):
+    from scripts.seed_zkloci import seed_scaled
+
+    fake_db["proofResults"].aggregate_handler = lambda pipeline: []
+    fake_db["requests"].insert_one({"requestId": "stale"})
+    fake_db[gen.rollups.DAILY_ROLLUPS].insert_one({"_id": "stale"})
+    seed_scaled(2, 3, 5, n_users=1, days=2, uri="mongodb://fake", db_name="zk")
+    requests = fake_db["requests"].docs
+    assert len(requests) == 6 and "stale" not in {r["requestId"] for r in requests}
+    assert {p["userId"] for p in fake_db["proofResults"].docs} == {"0xUSER0"}
+    assert len(fake_db["proofResults"].docs) == 30
+    assert len(fake_db["proofResults"].pipelines) == 2  # requests.stats and users.stats
+    assert fake_db[gen.rollups.DAILY_ROLLUPS].docs == []
+    assert fake_db.rebuilt == [("mongodb://fake", "zk")]
@@ -0,0 +1,41 @@
+# tests/test_intent_rules.py
+
+from llm.intent_rules import _Gazetteer, extract_intent_rules
+from services.provider_index import ProviderIndex
+
+
+def test_common_question_shape_is_fully_explained():
+    intent, confidence = extract_intent_rules("B+ donors in L1 last 7 days")
+    assert intent["bloodType"] == "B+"
+    assert intent["locality"] == "L1"
+    assert intent["timeWindowDays"] == 7
+    assert intent["useCase"] == "blood_donation"
+    assert confidence >= 0.7
+
+
+def test_known_provider_is_canonicalized():
+    intent, _ = extract_intent_rules("how many donors did city hospital blood drive get this week")
+    assert intent["providerName"] == "City Hospital Blood Drive"
+
+
+def test_unknown_names_lower_the_confidence():
+    _, confident = extract_intent_rules("O- donors in L2 last 30 days")
+    _, unsure = extract_intent_rules("O- donors for Riverside Clinic in L2 last 30 days")
+    assert unsure < confident
+
+
+def test_nothing_recognized_means_zero_confidence():
+    assert extract_intent_rules("hello there")[1] == 0.0
+
+
+def test_gazetteer_follows_the_provider_index(db):
+    index = ProviderIndex(min_score=0.6)
+    gazetteer = _Gazetteer(index)
+    pattern, canonical = gazetteer.pattern()
+    assert "city hospital blood drive" in canonical
+    assert gazetteer.pattern()[0] is pattern  # not recompiled while the index is unchanged
+
+    db["requests"].insert_one({"providerName": "Riverside Clinic Plasma Drive"})
+    index.refresh()
+    assert "riverside clinic plasma drive" in gazetteer.pattern()[1]
+    assert gazetteer.pattern()[0].search("Riverside Clinic Plasma Drive donors")
@@ -0,0 +1,108 @@
+# tests/test_main_batch.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from config import settings
+from tests.test_main_query import INTENT
+
+OTHER = dict(INTENT, providerName="Metro Office Attendance", useCase="workplace_attendance")
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    intents = {
+        "blood donors at City Hospital": dict(INTENT),
+        "how did blood donors at City Hospital change day by day": dict(INTENT),
+        "how many blood donors did City Hospital get": dict(INTENT),
+        "attendance campaign at Metro office": dict(OTHER),
+        "donation drive nobody can parse": ValueError("bad intent"),
+    }
+
+    async def fake_intents(questions):
+        return [intents[q] for q in questions]
+
+    async def fake_intent(question):
+        return intents[question]
+
+    async def fake_answers(items, modes=None):
+        return [f"{stats['providerName']}: {stats['totalProofs']}" for _, _, stats in items]
+
+    async def fake_answer(question, intent, stats, mode=None):
+        return (await fake_answers([(question, intent, stats)]))[0]
+
+    monkeypatch.setattr(main, "aextract_verification_intents", fake_intents)
+    monkeypatch.setattr(main, "aextract_verification_intent", fake_intent)
+    monkeypatch.setattr(main, "abuild_verification_answers", fake_answers)
+    monkeypatch.setattr(main, "abuild_verification_answer", fake_answer)
+    db["requests"].aggregate_handler = lambda pipeline: [{
+        "requestId": "r1", "providerName": pipeline[0]["$match"].get("providerName"),
+        "useCase": "x", "stats": {"totalProofs": 3, "successfulProofs": 2}, "uniqueUserCount": 2,
+    }]
+    return TestClient(main.app)
+
+
+def test_batch_shares_stats_queries_and_keeps_order(client, db):
+    questions = ["blood donors at City Hospital", "What is the weather?",
+                 "how many blood donors did City Hospital get", "attendance campaign at Metro office",
+                 "donation drive nobody can parse"]
+    body = client.post("/analytics/query/batch", json=[{"question": q} for q in questions]).json()
+
+    assert [r["route"] for r in body] == ["verification_analytics", "generic",
+                                          "verification_analytics", "verification_analytics",
+                                          "verification_analytics"]
+    assert body[0]["answer"] == body[2]["answer"] == "City Hospital Blood Drive: 3"
+    assert body[3]["answer"] == "Metro Office Attendance: 3"
+    assert body[4]["error"] == "bad intent"
+    # Two distinct provider/use-case/window groups -> two aggregations.
+    assert len(db["requests"].pipelines) == 2
+
+
+def test_batch_over_the_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_ITEMS", 2)
+    response = client.post("/analytics/query/batch", json=[{"question": "q"}] * 3)
+    assert response.status_code == 413
+
+
+def test_batch_stats_match_the_query_endpoint(client, db, monkeypatch):
+    async def fake_unique(provider, use_case, days, exact=False):
+        return {"uniqueUsers": 7}
+
+    async def fake_trend(intent, granularity=None):
+        return {"granularity": "day"}
+
+    monkeypatch.setattr(settings, "USER_SKETCHES", True)
+    monkeypatch.setattr(main, "aestimate_unique_users", fake_unique)
+    monkeypatch.setattr(main, "aget_proof_trend", fake_trend)
+    db["requests"].aggregate_handler = lambda pipeline: [
+        {"requestId": f"r{i}", "providerName": "City Hospital Blood Drive", "useCase": "x",
+         "stats": {"totalProofs": i, "successfulProofs": i}, "uniqueUserCount": 10 - i}
+        for i in range(3)
+    ]
+    payload = {"question": "blood donors at City Hospital", "top_k": 1, "request_sort": "uniqueUsers"}
+    single = client.post("/analytics/query", json=payload).json()["raw_stats"]
+    [batched] = [r["raw_stats"] for r in client.post("/analytics/query/batch", json=[payload]).json()]
+    assert batched == single
+    assert [r["requestId"] for r in batched["requests"]] == ["r0"]
+    assert batched["uniqueDonors"] == {"uniqueUsers": 7}
+
+    trend_question = {"question": "how did blood donors at City Hospital change day by day"}
+    body = client.post("/analytics/query/batch", json=[payload, trend_question]).json()
+    assert "trend" not in body[0]["raw_stats"]
+    assert body[1]["raw_stats"]["trend"] == {"granularity": "day"}
+
+
+def test_batch_items_with_other_request_options_get_their_own_stats(client, db):
+    db["requests"].aggregate_handler = lambda pipeline: [
+        {"requestId": f"r{i}", "providerName": "City Hospital Blood Drive", "useCase": "x",
+         "stats": {"totalProofs": i, "successfulProofs": i}, "uniqueUserCount": 10 - i}
+        for i in range(3)
+    ]
+    question = "blood donors at City Hospital"
+    body = client.post("/analytics/query/batch", json=[
+        {"question": question, "top_k": 1},
+        {"question": question, "top_k": 2, "request_sort": "uniqueUsers"},
+    ]).json()
+    assert [r["requestId"] for r in body[0]["raw_stats"]["requests"]] == ["r2"]
+    assert [r["requestId"] for r in body[1]["raw_stats"]["requests"]] == ["r0", "r1"]
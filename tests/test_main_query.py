@@ -0,0 +1,60 @@
+# tests/test_main_query.py
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+INTENT = {"providerName": "City Hospital Blood Drive", "useCase": "blood_donation",
+          "timeWindowDays": 7, "targetCount": None, "locality": None, "bloodType": None}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    calls = {"intent": [], "answer": []}
+
+    async def fake_intent(question):
+        calls["intent"].append(question)
+        return dict(INTENT)
+
+    async def fake_answer(question, intent, stats, mode=None):
+        calls["answer"].append((question, intent, stats, mode))
+        return f"{stats['totalProofs']} proofs"
+
+    monkeypatch.setattr(main, "aextract_verification_intent", fake_intent)
+    monkeypatch.setattr(main, "abuild_verification_answer", fake_answer)
+    db["requests"].aggregate_handler = lambda pipeline: [{
+        "requestId": "r1", "providerName": INTENT["providerName"], "useCase": "blood_donation",
+        "createdAt": datetime(2025, 1, 1), "stats": {"totalProofs": 12, "successfulProofs": 9},
+        "uniqueUserCount": 8,
+    }]
+    test_client = TestClient(main.app)
+    test_client.calls = calls
+    return test_client
+
+
+def test_query_awaits_intent_stats_and_answer(client):
+    response = client.post("/analytics/query",
+                           json={"question": "How many blood donors did City Hospital get?"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["route"] == "verification_analytics"
+    assert body["answer"] == "12 proofs"
+    assert body["raw_stats"]["successfulProofs"] == 9
+    assert body["raw_stats"]["requests"][0]["createdAt"] == "2025-01-01T00:00:00"
+    assert client.calls["intent"] == ["How many blood donors did City Hospital get?"]
+
+
+def test_query_outside_the_domain_skips_the_pipeline(client):
+    response = client.post("/analytics/query", json={"question": "What is the weather in Paris?"})
+    assert response.json()["route"] == "generic"
+    assert response.json()["raw_stats"] is None
+    assert client.calls["intent"] == []
+
+
+def test_debug_adds_stage_timings(client):
+    body = client.post("/analytics/query",
+                       json={"question": "blood donors at City Hospital", "debug": True}).json()
+    assert {"route", "intent", "stats", "answer", "total"} <= set(body["timings"])
@@ -0,0 +1,105 @@
+# tests/test_main_stream.py
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from config import settings
+from tests.test_main_query import INTENT
+
+
+def _events(text: str) -> list:
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], orjson.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    async def fake_intent(question):
+        return dict(INTENT)
+
+    async def fake_stream(question, intent, stats, mode=None):
+        for chunk in ("12 ", "proofs"):
+            yield chunk
+
+    monkeypatch.setattr(main, "aextract_verification_intent", fake_intent)
+    monkeypatch.setattr(main, "astream_verification_answer", fake_stream)
+    db["requests"].aggregate_handler = lambda pipeline: [{
+        "requestId": "r1", "providerName": INTENT["providerName"], "useCase": "blood_donation",
+        "stats": {"totalProofs": 12, "successfulProofs": 9}, "uniqueUserCount": 8,
+    }]
+    return TestClient(main.app)
+
+
+def test_stream_emits_stages_then_tokens_then_done(client):
+    response = client.post("/analytics/query/stream", json={"question": "blood donors at City Hospital"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [name for name, _ in events] == ["route", "intent", "stats", "token", "token", "done"]
+    assert events[2][1]["totalProofs"] == 12
+    assert events[-1][1] == {"answer": "12 proofs", "route": "verification_analytics"}
+
+
+def test_stream_generic_question_answers_without_llm(client):
+    events = _events(client.post("/analytics/query/stream", json={"question": "weather in Paris?"}).text)
+    assert [name for name, _ in events] == ["route", "token", "done"]
+    assert events[-1][1]["route"] == "generic"
+
+
+def test_stream_failure_becomes_an_error_event(client, monkeypatch):
+    async def broken(question):
+        raise RuntimeError("intent failed")
+
+    monkeypatch.setattr(main, "aextract_verification_intent", broken)
+    events = _events(client.post("/analytics/query/stream", json={"question": "blood donors at City Hospital"}).text)
+    assert events[-1] == ("error", {"detail": "intent failed"})
+
+
+def test_stream_stats_include_trend_and_unique_donors(client, monkeypatch):
+    async def fake_unique(provider, use_case, days, exact=False):
+        return {"uniqueUsers": 7}
+
+    async def fake_trend(intent, granularity=None):
+        return {"granularity": "day"}
+
+    monkeypatch.setattr(settings, "USER_SKETCHES", True)
+    monkeypatch.setattr(main, "aestimate_unique_users", fake_unique)
+    monkeypatch.setattr(main, "aget_proof_trend", fake_trend)
+    events = dict(_events(client.post(
+        "/analytics/query/stream",
+        json={"question": "how did blood donors at City Hospital change day by day", "top_k": 0},
+    ).text))
+    assert events["stats"]["uniqueDonors"] == {"uniqueUsers": 7}
+    assert events["stats"]["trend"] == {"granularity": "day"}
+
+
+def test_stream_cut_off_mid_answer_ends_with_the_stats_fallback(client, monkeypatch):
+    from llm import verification_answer
+    from llm.answer_templates import stats_only_answer
+
+    class ServerError(Exception):
+        status_code = 503
+
+    class BrokenChain:
+        async def astream(self, inputs):
+            yield "12 proofs so"
+            raise ServerError("upstream overloaded")
+
+    monkeypatch.setattr(verification_answer, "answer_chain", BrokenChain())
+    monkeypatch.setattr(main, "astream_verification_answer",
+                        verification_answer.astream_verification_answer)
+    monkeypatch.setattr(settings, "ANSWER_MODE", "llm")
+    monkeypatch.setattr("services.stats_compaction.count_tokens", lambda text: len(text) // 4)
+    verification_answer.answer_cache.clear()
+    events = _events(client.post("/analytics/query/stream",
+                                 json={"question": "blood donors at City Hospital"}).text)
+    stats = dict(events)["stats"]
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert tokens == ["12 proofs so", f"\n\n{stats_only_answer(INTENT, stats)}"]
+    assert events[-1] == ("done", {"answer": "".join(tokens), "route": "verification_analytics",
+                                   "fallback": True})
+    assert verification_answer.answer_cache.stats()["size"] == 0
@@ -0,0 +1,55 @@
+# tests/test_metrics.py
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+import main
+from services import metrics
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    counter = metrics.Counter("t_total", "Test counter.", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    assert counter.render()[-1] == 't_total{kind="a"} 3'
+
+    hist = metrics.Histogram("t_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    hist.observe(0.5)
+    lines = hist.render()
+    assert 't_seconds_bucket{le="0.1"} 0' in lines
+    assert 't_seconds_bucket{le="1.0"} 1' in lines
+    assert 't_seconds_bucket{le="+Inf"} 1' in lines
+    assert "t_seconds_count 1" in lines
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("t_escaped_total", "Test counter.", ("name",))
+    counter.inc(name='C:\\ "Main"\nHospital')
+    assert counter.render()[-1] == 't_escaped_total{name="C:\\\\ \\"Main\\"\\nHospital"} 1'
+
+
+def test_stage_records_into_the_request_breakdown():
+    timings = metrics.start_request_timings()
+    with metrics.stage("unit"):
+        pass
+    with metrics.stage("unit"):
+        pass
+    assert set(timings) == {"unit"} and timings["unit"] >= 0
+
+
+def test_token_handler_counts_usage_and_reports_it():
+    reported = []
+    handler = metrics.TokenUsageHandler("unit_chain", on_usage=reported.append)
+    message = AIMessage(content="ok", usage_metadata={
+        "input_tokens": 7, "output_tokens": 3, "total_tokens": 10})
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+    assert reported == [10]
+    text = metrics.render_prometheus()
+    assert 'zkloci_llm_tokens_total{chain="unit_chain",kind="prompt"} 7' in text
+
+
+def test_metrics_endpoint_serves_the_registry(db):
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE zkloci_stage_seconds histogram" in response.text
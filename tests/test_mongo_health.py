@@ -0,0 +1,69 @@
+# tests/test_mongo_health.py
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from config import settings
+from db import mongo
+
+
+class _Admin:
+    def __init__(self):
+        self.up = True
+
+    def command(self, name):
+        if not self.up:
+            raise ServerSelectionTimeoutError("no servers")
+        return {"ok": 1}
+
+
+class _Client:
+    def __init__(self):
+        self.admin = _Admin()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = _Client()
+    monkeypatch.setattr(mongo, "_client", fake)
+    monkeypatch.setattr(mongo, "_health", dict(mongo._health, available=False))
+    monkeypatch.setattr(mongo, "_on_connect", [])
+    monkeypatch.setattr(mongo, "ensure_indexes", lambda: True)
+    return fake
+
+
+def test_client_is_created_without_connecting(monkeypatch):
+    monkeypatch.setattr(mongo, "_client", None)
+    monkeypatch.setattr(settings, "MONGO_URI", "mongodb://unreachable.invalid:27017")
+    client = mongo.get_client()  # no server: would raise if it connected here
+    assert client is mongo.get_client()
+    client.close()
+
+
+def test_availability_flips_both_ways_and_runs_hooks_on_connect(client):
+    connects = []
+    mongo.on_connect(lambda: connects.append(1))
+
+    assert mongo.check_health() and mongo.is_available()
+    assert mongo.check_health()
+    assert connects == [1]  # only on the unavailable -> available transition
+
+    client.admin.up = False
+    assert not mongo.check_health()
+    assert "no servers" in mongo.health_status()["lastError"]
+
+    client.admin.up = True
+    assert mongo.check_health()
+    assert connects == [1, 1]
+
+
+def test_failing_hook_does_not_block_the_others(client):
+    ran = []
+
+    def broken():
+        raise RuntimeError("boom")
+
+    mongo.on_connect(broken)
+    mongo.on_connect(lambda: ran.append(1))
+    assert mongo.check_health()
+    assert ran == [1]
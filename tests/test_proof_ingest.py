@@ -0,0 +1,125 @@
+# tests/test_proof_ingest.py
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from config import settings
+from services import proof_ingest
+from services.trends import TIMESERIES_COLL
+from services.user_sketches import SKETCHES
+from services.proof_ingest import ingest_proofs, parse_proofs_body, validate_proofs
+
+
+@pytest.fixture
+def ingest_db(db, monkeypatch):
+    monkeypatch.setattr(proof_ingest, "_use_transactions", True)
+    db["requests"].insert_many([{"requestId": "r1", "stats": {"totalProofs": 0, "successfulProofs": 0}}])
+    return db
+
+
+def _items(*specs):
+    return [{"proofId": pid, "requestId": "r1", "userId": "u1", "result": ok,
+             "proofType": "bloodGroup", "createdAt": ts} for pid, ok, ts in specs]
+
+
+def _request_stats(db):
+    return db["requests"].find_one({"requestId": "r1"})["stats"]
+
+
+def test_aware_and_naive_timestamps_are_stored_as_naive_utc(ingest_db):
+    proofs, errors = validate_proofs(_items(("p1", True, "2025-03-01T12:00:00+02:00"),
+                                            ("p2", True, "2025-03-01T09:30:00Z"),
+                                            ("p3", False, "2025-03-01T09:45:00")))
+    assert not errors
+    assert [p["createdAt"] for p in proofs] == [datetime(2025, 3, 1, 10), datetime(2025, 3, 1, 9, 30),
+                                                datetime(2025, 3, 1, 9, 45)]
+    assert asyncio.run(ingest_proofs(proofs)) == (3, 0)
+    user = ingest_db["users"].find_one({"userId": "u1"})
+    assert user["lastActive"] == datetime(2025, 3, 1, 10)
+    assert user["stats"]["proofsByType"]["bloodGroup"] == 3
+
+
+@pytest.mark.parametrize("transactions", [True, False])
+def test_retry_after_a_failed_counter_write_counts_once(ingest_db, monkeypatch, transactions):
+    ingest_db.transactions = transactions
+    proofs, _ = validate_proofs(_items(("p1", True, None), ("p2", False, None)))
+    users = ingest_db["users"]
+    real_bulk_write = users.bulk_write
+
+    def fail_once(*args, **kwargs):
+        users.bulk_write = real_bulk_write
+        raise ConnectionError("connection reset")
+
+    count_pending = proof_ingest._count_pending
+
+    async def fail_before_counters(*args, **kwargs):
+        proof_ingest._count_pending = count_pending
+        raise ConnectionError("connection reset")
+
+    if transactions:
+        # A failed transaction writes nothing: fail before the claim.
+        monkeypatch.setattr(proof_ingest, "_count_pending", fail_before_counters)
+    else:
+        users.bulk_write = fail_once
+    with pytest.raises(ConnectionError):
+        asyncio.run(ingest_proofs(proofs))
+
+    # Proofs are stored; the retry finds them and counts only what is pending.
+    assert asyncio.run(ingest_proofs(proofs)) == (0, 2)
+    assert asyncio.run(ingest_proofs(proofs)) == (0, 2)
+    assert _request_stats(ingest_db) == {"totalProofs": 2, "successfulProofs": 1}
+    user = users.find_one({"userId": "u1"})
+    if transactions:
+        assert user["stats"]["totalProofs"] == 2
+    else:
+        # Claimed before the failed write: lost rather than counted twice.
+        assert user is None
+
+
+def test_redelivered_proofs_are_duplicates(ingest_db):
+    proofs, _ = validate_proofs(_items(("p1", True, None), ("p1", True, None), ("p2", True, None)))
+    assert asyncio.run(ingest_proofs(proofs)) == (2, 1)
+    assert asyncio.run(ingest_proofs(proofs[:1])) == (0, 1)
+    assert _request_stats(ingest_db) == {"totalProofs": 2, "successfulProofs": 2}
+
+
+def test_retry_after_a_failed_mirror_write_applies_it_once(ingest_db, monkeypatch):
+    monkeypatch.setattr(settings, "TRENDS_TIMESERIES", True)
+    monkeypatch.setattr(settings, "USER_SKETCHES", True)
+    proofs, _ = validate_proofs(_items(("p1", True, None), ("p2", False, None)))
+    mirror = ingest_db[TIMESERIES_COLL]
+    real_insert_many = mirror.insert_many
+
+    def fail_once(*args, **kwargs):
+        mirror.insert_many = real_insert_many
+        raise ConnectionError("connection reset")
+
+    mirror.insert_many = fail_once
+    with pytest.raises(ConnectionError):
+        asyncio.run(ingest_proofs(proofs))
+    assert mirror.docs == [] and ingest_db[SKETCHES].docs == []
+
+    # Counters are done; the retry still writes the mirror and the sketches.
+    assert asyncio.run(ingest_proofs(proofs)) == (0, 2)
+    assert asyncio.run(ingest_proofs(proofs)) == (0, 2)
+    assert len(mirror.docs) == 2
+    assert ingest_db[SKETCHES].docs
+    assert _request_stats(ingest_db) == {"totalProofs": 2, "successfulProofs": 1}
+
+
+def test_bulk_endpoint_reports_invalid_items(ingest_db):
+    body = b'{"proofId": "p1", "requestId": "r1", "result": true}\n{"proofId": "p2"}\n'
+    response = TestClient(main.app).post("/proofs/bulk", content=body,
+                                         headers={"content-type": "application/x-ndjson"})
+    assert response.json()["inserted"] == 1
+    assert response.json()["errors"][0]["index"] == 1
+
+
+def test_parse_accepts_arrays_and_wrapped_arrays():
+    assert parse_proofs_body(b'{"proofs": [{"a": 1}]}', "application/json") == [{"a": 1}]
+    with pytest.raises(ValueError):
+        parse_proofs_body(b'{"a": 1, "proofs": 3}', "application/json")
@@ -0,0 +1,69 @@
+# tests/test_provider_index.py
+
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import main
+from services import comparison
+from services.provider_index import ProviderIndex, normalize_locality
+from services.verification_analytics import _campaign_query
+
+
+def _index(db=None):
+    index = ProviderIndex(min_score=0.6)
+    if db is not None:
+        index.refresh()
+    return index
+
+
+def test_names_resolve_to_the_stored_spelling():
+    index = _index()
+    assert index.resolve("City Hospital Blood Drive") == "City Hospital Blood Drive"
+    assert index.resolve("city hospital") == "City Hospital Blood Drive"
+    assert index.resolve("Metro office") == "Metro Office Attendance"
+    assert index.resolve("Institution") is None  # A or B: ambiguous, not guessed
+    assert index.resolve("Riverside Clinic") is None
+
+
+def test_campaigns_sharing_an_address_stay_apart(db):
+    db["requests"].insert_many([
+        {"requestId": "r1", "providerId": "0xCITY", "providerName": "City Hospital Blood Drive"},
+        {"requestId": "r2", "providerId": "0xCITY", "providerName": "City Hospital Staff Attendance"},
+    ])
+    intent = _index(db).resolve_intent({"providerName": "city hospital blood drive"})
+    assert intent == {"providerName": "City Hospital Blood Drive"}
+    assert _index(db).resolve("staff attendance") == "City Hospital Staff Attendance"
+    query = _campaign_query(dict(intent, providerId="0xCITY"))
+    assert query["providerName"] == "City Hospital Blood Drive"
+    assert "providerId" not in query
+
+
+def test_comparisons_filter_on_the_resolved_names():
+    intent = _index().resolve_intent({"providerNames": ["Institution A", "institution b"],
+                                      "localities": ["locality 1", "l2"]})
+    assert intent["providerNames"] == ["Institution A", "Institution B"]
+    assert intent["localities"] == ["L1", "L2"]
+    assert "providerIds" not in intent
+    match = comparison._comparison_pipeline(intent, comparison._cells(intent),
+                                            datetime.utcnow())[0]["$match"]
+    assert match["providerName"] == {"$in": ["Institution A", "Institution B"]}
+    # one provider spelled twice is not a comparison
+    same = _index().resolve_intent({"providerNames": ["City Hospital", "City Hospital Blood Drive"]})
+    assert same["providerNames"] is None
+    assert normalize_locality("near Locality 12") == "L12"
+
+
+def test_unique_donors_resolves_the_provider(db, monkeypatch):
+    calls = []
+
+    async def fake_estimate(provider_name, use_case, days, exact):
+        calls.append((provider_name, use_case, days, exact))
+        return {"uniqueUsers": 3}
+
+    monkeypatch.setattr(main, "aestimate_unique_users", fake_estimate)
+    response = TestClient(main.app).post("/analytics/unique-donors",
+                                         json={"providerName": "city hospital",
+                                               "useCase": "blood_donation"})
+    assert response.json() == {"uniqueUsers": 3}
+    assert calls == [("City Hospital Blood Drive", "blood_donation", 7, False)]
@@ -0,0 +1,70 @@
+# tests/test_request_pages.py
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.stats_compaction import RequestSummary
+from services.verification_analytics import decode_page_cursor, encode_page_cursor
+
+
+def _row(rid, total, successful, unique=0):
+    return {"requestId": rid, "stats": {"totalProofs": total, "successfulProofs": successful},
+            "uniqueUserCount": unique}
+
+
+def test_summary_keeps_the_top_k_and_exact_totals():
+    summary = RequestSummary(top_k=2, sort="proofs")
+    for i, (total, ok) in enumerate([(5, 5), (20, 10), (1, 0), (20, 2), (8, 4)]):
+        summary.add(_row(f"r{i}", total, ok))
+    assert [r["requestId"] for r in summary.requests()] == ["r1", "r3"]  # ties in arrival order
+    assert (summary.count, summary.total_proofs, summary.successful_proofs) == (5, 54, 21)
+    assert summary.truncated
+    distribution = summary.distribution()
+    assert (distribution["totalProofs"]["min"], distribution["totalProofs"]["max"]) == (1, 20)
+    assert distribution["successRate"]["max"] == 1.0
+
+
+def test_summary_with_top_k_zero_keeps_every_row():
+    summary = RequestSummary(top_k=0, sort="successRate")
+    for i in range(5):
+        summary.add(_row(f"r{i}", 10, i))
+    assert [r["requestId"] for r in summary.requests()] == ["r4", "r3", "r2", "r1", "r0"]
+    assert not summary.truncated
+    with pytest.raises(ValueError):
+        RequestSummary(top_k=1, sort="colour")
+
+
+def test_page_cursor_round_trips():
+    created = datetime(2025, 3, 1, 12, 30)
+    assert decode_page_cursor(encode_page_cursor(created, "r7"), "createdAt") == (created, "r7")
+    assert decode_page_cursor(encode_page_cursor(0.5, "r2"), "successRate") == (0.5, "r2")
+    with pytest.raises(ValueError):
+        decode_page_cursor("not-a-cursor", "proofs")
+
+
+@pytest.fixture
+def client(db):
+    rows = [_row(f"r{i}", 10 - i, 5) for i in range(3)]
+    db["requests"].aggregate_handler = lambda pipeline: rows[:pipeline[-2]["$limit"]]
+    return TestClient(main.app)
+
+
+def test_requests_pages_with_a_keyset_cursor(client, db):
+    page = client.post("/analytics/requests", json={"providerName": "City Hospital Blood Drive",
+                                                    "limit": 2}).json()
+    assert [r["requestId"] for r in page["items"]] == ["r0", "r1"]
+    assert decode_page_cursor(page["nextCursor"], "proofs") == (9, "r1")
+    assert db["requests"].pipelines[0][-3] == {"$sort": {"_sortKey": -1, "requestId": 1}}
+
+    last = client.post("/analytics/requests", json={"limit": 5, "cursor": page["nextCursor"]}).json()
+    assert last["nextCursor"] is None
+    after = db["requests"].pipelines[1][-4]["$match"]["$or"]
+    assert after == [{"_sortKey": {"$lt": 9}}, {"_sortKey": 9, "requestId": {"$gt": "r1"}}]
+
+
+def test_requests_rejects_a_bad_cursor(client):
+    response = client.post("/analytics/requests", json={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+# tests/test_rollups.py
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from config import settings
+from services import rollups
+from services import verification_analytics as va
+
+
+@pytest.fixture
+def rollup_db(db, monkeypatch):
+    monkeypatch.setattr(rollups, "_use_transactions", True)
+    db["requests"].insert_many([
+        {"requestId": "r1", "providerName": "City Hospital Blood Drive", "useCase": "blood_donation"},
+    ])
+    return db
+
+
+def _proofs(*specs):
+    day = datetime(2025, 3, 1, 10)
+    return [{"proofId": pid, "requestId": "r1", "userId": user, "result": ok, "createdAt": day}
+            for pid, user, ok in specs]
+
+
+def _request_rollup(db):
+    return db[rollups.REQUEST_ROLLUPS].find_one({"_id": "r1"})
+
+
+@pytest.mark.parametrize("transactions", [True, False])
+def test_replayed_batch_is_not_counted_twice(rollup_db, transactions):
+    rollup_db.transactions = transactions
+    batch = _proofs(("p1", "u1", True), ("p2", "u1", False), ("p3", "u2", True))
+    rollups.record_proofs(batch)
+    rollups.record_proofs(batch)  # e.g. the watcher restarted before saving its token
+    rollups.record_proofs(batch + _proofs(("p4", "u3", True)))
+
+    r = _request_rollup(rollup_db)
+    assert (r["totalProofs"], r["successfulProofs"], r["uniqueUsers"]) == (4, 3, 3)
+    daily = rollup_db[rollups.DAILY_ROLLUPS].find_one({})
+    assert daily["day"] == datetime(2025, 3, 1)
+    assert (daily["totalProofs"], daily["uniqueUsers"]) == (4, 3)
+
+
+def test_standalone_server_falls_back_once(rollup_db):
+    rollup_db.transactions = False
+    rollups.record_proofs(_proofs(("p1", "u1", True)))
+    rollups.record_proofs(_proofs(("p2", "u1", True)))
+    assert rollup_db.transactions_started == 1
+    assert _request_rollup(rollup_db)["totalProofs"] == 2
+
+
+def test_daily_totals_sum_one_document_per_day(db):
+    db[rollups.DAILY_ROLLUPS].aggregate_handler = lambda pipeline: [
+        {"_id": None, "totalProofs": 30, "successfulProofs": 20, "days": 3}]
+    totals = rollups.get_daily_totals("P", "blood_donation", 3)
+    assert totals == {"totalProofs": 30, "successfulProofs": 20, "days": 3}
+    match = db[rollups.DAILY_ROLLUPS].pipelines[0][0]["$match"]
+    assert match["providerName"] == "P" and match["useCase"] == "blood_donation"
+    assert "$group" in db[rollups.DAILY_ROLLUPS].pipelines[0][1]
+
+
+def test_rollup_stats_take_window_totals_from_daily_rollups(db, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_SOURCE", "rollups")
+    db["requests"].aggregate_handler = lambda pipeline: [{
+        "requestId": "r1", "providerName": "P", "useCase": "blood_donation",
+        "stats": {"totalProofs": 5, "successfulProofs": 4}, "uniqueUserCount": 4,
+    }]
+    db[rollups.DAILY_ROLLUPS].aggregate_handler = lambda pipeline: [
+        {"_id": None, "totalProofs": 12, "successfulProofs": 9, "days": 7}]
+    intent = {"providerName": "P", "useCase": "blood_donation", "timeWindowDays": 7}
+
+    for stats in (va.get_provider_campaign_stats(intent),
+                  asyncio.run(va.aget_provider_campaign_stats(intent))):
+        assert (stats["totalProofs"], stats["successfulProofs"]) == (12, 9)
+        assert stats["requests"][0]["requestId"] == "r1"
@@ -0,0 +1,36 @@
+# tests/test_router.py
+
+import json
+
+from llm.router import DEFAULT_ROUTE, RouteEngine, load_routes, route_many, route_question
+
+
+def test_domain_questions_route_to_analytics():
+    assert route_question("How many B+ donors in L1 this week?") == "verification_analytics"
+    assert route_question("Turnout   for the Institution  A campaign") == "verification_analytics"
+    assert route_question("What is the capital of France?") == DEFAULT_ROUTE
+
+
+def test_keywords_only_match_whole_words():
+    assert route_question("flight l10 delayed") == DEFAULT_ROUTE
+    assert route_question("bloodhound puppies") == DEFAULT_ROUTE
+
+
+def test_scores_grow_with_distinct_keywords():
+    engine = RouteEngine({"a": ["blood", "donor"], "b": ["weather"]})
+    assert engine.scores("blood blood weather") == {"a": 0.5, "b": 0.5}
+    assert engine.scores("blood donor weather") == {"a": 2 / 3, "b": 0.5}
+    assert engine.route("blood donor weather") == "a"
+    assert engine.route("nothing here") == DEFAULT_ROUTE
+
+
+def test_route_many_matches_route_question():
+    questions = ["blood donors", "hello", "campaign target"]
+    assert route_many(questions) == [route_question(q) for q in questions]
+
+
+def test_routes_load_from_a_config_file(tmp_path):
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps({"billing": ["invoice"]}))
+    assert RouteEngine(load_routes(str(path))).route("where is my invoice") == "billing"
+    assert load_routes(str(tmp_path / "missing.json"))["verification_analytics"]
@@ -0,0 +1,93 @@
+# tests/test_scheduler.py
+
+import asyncio
+
+import pytest
+
+from llm import scheduler
+from llm.scheduler import LLMScheduler, LLMUnavailable
+from llm.verification_answer import llm_answer
+from llm.verification_intent import llm_intent
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(scheduler.random, "uniform", lambda a, b: 0.0)
+
+
+def _scheduler(concurrency=2, hedge_after=0.0, attempts=3):
+    return LLMScheduler(concurrency, tokens_per_minute=0,
+                        hedge_after_seconds=hedge_after, max_attempts=attempts)
+
+
+def _flaky(*errors, result="ok", delay=0.0):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return fn, calls
+
+
+def test_transient_errors_are_retried():
+    fn, calls = _flaky(APIStatusError(503), APITimeoutError(), ConnectionError())
+    assert asyncio.run(_scheduler(attempts=4).run("answer", fn, deadline=5)) == "ok"
+    assert len(calls) == 4
+
+
+def test_client_errors_fail_fast_without_retry():
+    fn, calls = _flaky(APIStatusError(400))
+    with pytest.raises(APIStatusError):
+        asyncio.run(_scheduler().run("answer", fn, deadline=5))
+    assert len(calls) == 1
+
+
+def test_exhausted_retries_raise_llm_unavailable():
+    fn, calls = _flaky(*[APIStatusError(429)] * 3)
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(_scheduler(attempts=3).run("answer", fn, deadline=5))
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("concurrency, expected_calls", [(1, 1), (2, 2)])
+def test_hedges_only_on_a_free_slot(concurrency, expected_calls):
+    fn, calls = _flaky(delay=0.1)
+    llm = _scheduler(concurrency, hedge_after=0.02, attempts=2)
+    assert asyncio.run(llm.run("answer", fn, deadline=5)) == "ok"
+    assert len(calls) == expected_calls
+
+
+def _stream(error):
+    async def chunks():
+        yield "first "
+        raise error
+    return chunks
+
+
+async def _drain(llm, make_stream):
+    return [chunk async for chunk in llm.stream("answer", make_stream, deadline=5)]
+
+
+def test_stream_maps_transient_errors_to_llm_unavailable():
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(_drain(_scheduler(), _stream(APIStatusError(502))))
+    with pytest.raises(APIStatusError):
+        asyncio.run(_drain(_scheduler(), _stream(APIStatusError(401))))
+
+
+def test_both_clients_report_streamed_usage():
+    assert llm_answer.stream_usage and llm_intent.stream_usage
@@ -0,0 +1,71 @@
+# tests/test_serialization.py
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import asyncio
+
+import pytest
+from bson import Decimal128, ObjectId
+
+from models.api import QueryResponse
+from models.serialization import FastJSONResponse, dumps, dumps_str, loads
+from models.stats import CampaignStats, ComparisonStats
+from services.comparison import aget_comparison_stats
+from services.stats_compaction import RequestSummary
+from services.trends import aget_proof_trend
+from services.verification_analytics import _campaign_result
+
+
+def test_mongo_types_encode_in_one_pass():
+    oid = ObjectId("65f000000000000000000001")
+    doc = {"_id": oid, "amount": Decimal128("1.50"), "fee": Decimal("0.25"),
+           "createdAt": datetime(2025, 1, 2, 3, 4, 5), "tags": {"a"}, "pair": (1, 2),
+           "blob": b"\x00\x01", 3: "non-str key"}
+    assert loads(dumps(doc)) == {
+        "_id": str(oid), "amount": "1.50", "fee": "0.25", "createdAt": "2025-01-02T03:04:05",
+        "tags": ["a"], "pair": [1, 2], "blob": "AAE=", "3": "non-str key",
+    }
+
+
+def test_constructed_response_serializes_like_a_validated_one():
+    stats = {"providerName": "P", "totalProofs": 3, "successfulProofs": 2, "successRate": 2 / 3,
+             "requests": [{"requestId": "r1", "createdAt": datetime(2025, 1, 1),
+                           "stats": {"totalProofs": 3, "successfulProofs": 2}}],
+             "trend": {"granularity": "day"}}
+    constructed = QueryResponse.model_construct(answer="a", route="r", raw_stats=stats)
+    body = loads(FastJSONResponse(dict(constructed)).body)
+    assert body["raw_stats"]["requests"][0]["createdAt"] == "2025-01-01T00:00:00"
+    validated = CampaignStats.model_validate(stats).model_dump(exclude_unset=True)
+    assert loads(dumps_str(validated)) == body["raw_stats"]
+
+
+def _campaign_payload() -> dict:
+    intent = {"providerName": "Institution A", "useCase": "blood_donation", "timeWindowDays": 7}
+    summary = RequestSummary(top_k=1)
+    for i in range(3):
+        summary.add({"requestId": f"r{i}", "providerName": "Institution A", "description": "B+ near L1",
+                     "createdAt": datetime(2025, 1, 1) + timedelta(days=i), "status": "active",
+                     "stats": {"totalProofs": 10 * i, "successfulProofs": 9 * i}, "uniqueUserCount": i})
+    stats = _campaign_result(intent, summary, source="raw")
+    stats["trend"] = asyncio.run(aget_proof_trend(intent))
+    return stats
+
+
+def _comparison_payload() -> dict:
+    return asyncio.run(aget_comparison_stats({"providerNames": ["Institution A", "Institution B"],
+                                              "useCase": "blood_donation",
+                                              "timeWindowsDays": [7, 30]}))
+
+
+@pytest.mark.parametrize("payload, model", [(_campaign_payload, CampaignStats),
+                                            (_comparison_payload, ComparisonStats)])
+def test_raw_stats_models_match_the_pipeline_payloads(db, payload, model):
+    db.available = False  # demo trend and comparison totals, real shaping
+    stats = payload()
+    response = QueryResponse.model_validate({"answer": "a", "route": "r", "raw_stats": stats})
+    assert type(response.raw_stats) is model
+    # Every key the pipeline returns is a declared field, not an extra.
+    assert set(stats) <= set(model.model_fields)
+    dumped = response.raw_stats.model_dump(exclude_unset=True)
+    assert loads(dumps_str(dumped)) == loads(dumps_str(stats))
@@ -0,0 +1,68 @@
+# tests/test_singleflight.py
+
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    flight, calls = SingleFlight("test"), []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(calls)}
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("k", compute) for _ in range(5)),
+                                       flight.do("other", compute))
+        assert len(flight) == 0  # nothing is kept after completion
+        again = await flight.do("k", compute)
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert calls == [1, 1, 1]
+    assert all(r is results[0] for r in results[:5])
+    assert again == {"n": 3}
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def main():
+        return await asyncio.gather(flight.do("k", fail), flight.do("k", fail),
+                                    return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(main())] == ["down", "down"]
+
+
+def test_shared_work_is_cancelled_only_when_every_caller_left():
+    flight, finished = SingleFlight("test"), []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        alone = asyncio.ensure_future(flight.do("k2", slow))
+        await asyncio.sleep(0)
+        alone.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert finished == [1]
@@ -0,0 +1,134 @@
+# tests/test_snapshot.py
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from config import settings
+from services import verification_analytics as va
+from services import snapshot
+from services.snapshot import SnapshotEngine, export_snapshot
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def _oid(seconds_ago: int, counter: int = 0) -> ObjectId:
+    stamp = ObjectId.from_datetime(NOW - timedelta(seconds=seconds_ago)).binary[:4]
+    return ObjectId(stamp + counter.to_bytes(8, "big"))
+
+
+def _seed(db):
+    requests = db["requests"]
+    for i, (provider, use_case) in enumerate([("City Hospital Blood Drive", "blood_donation"),
+                                              ("Metro Office Attendance", "workplace_attendance"),
+                                              ("City Hospital Blood Drive", "blood_donation")]):
+        requests.insert_one({"_id": _oid(600 - i), "requestId": f"r{i}", "providerName": provider,
+                             "useCase": use_case, "description": f"campaign {i}", "status": "open",
+                             "createdAt": NOW - timedelta(days=1)})
+    proofs = [("r0", "u1", True), ("r0", "u1", True), ("r0", "u2", False), ("r1", "u3", True),
+              ("r2", "u2", True), ("r2", None, False), ("gone", "u9", True)]
+    for i, (rid, user, result) in enumerate(proofs):
+        db["proofResults"].insert_one({"_id": _oid(500 - i), "proofId": f"p{i}", "requestId": rid,
+                                       "userId": user, "result": result, "createdAt": NOW})
+
+
+def _engine(db, tmp_path, batch_size=2):
+    _seed(db)
+    path = export_snapshot(str(tmp_path), batch_size=batch_size)
+    engine = SnapshotEngine(str(tmp_path))
+    engine.refresh()
+    return path, engine
+
+
+def _rows(engine, **intent):
+    return {r["requestId"]: r for r in engine.campaign_rows(intent)}
+
+
+def test_export_groups_proofs_by_request_in_small_batches(db, tmp_path):
+    path, engine = _engine(db, tmp_path)
+    rows = _rows(engine)
+    assert rows["r0"]["stats"] == {"totalProofs": 3, "successfulProofs": 2}
+    assert rows["r0"]["uniqueUserCount"] == 2
+    assert rows["r2"]["stats"] == {"totalProofs": 2, "successfulProofs": 1}
+    assert rows["r2"]["uniqueUserCount"] == 1
+    assert set(_rows(engine, providerName="City Hospital Blood Drive")) == {"r0", "r2"}
+    # no scratch columns or JSON rows left behind
+    assert not [f for f in os.listdir(path) if f.startswith("scratch_") or f == "requests.json"]
+
+
+def test_request_metadata_is_read_back_from_columns(db, tmp_path):
+    _, engine = _engine(db, tmp_path, batch_size=100_000)
+    row = _rows(engine)["r1"]
+    assert row["providerName"] == "Metro Office Attendance"
+    assert row["useCase"] == "workplace_attendance"
+    assert row["description"] == "campaign 1"
+    assert row["status"] == "open"
+    assert row["createdAt"] == NOW - timedelta(days=1)
+    assert "expiresAt" not in row
+
+
+def test_delta_counts_late_commits_once(db, tmp_path):
+    _, engine = _engine(db, tmp_path)
+    # Committed after the export, with an _id below the watermark.
+    db["proofResults"].insert_one({"_id": _oid(497, counter=1), "proofId": "late",
+                                   "requestId": "r1", "userId": "u4", "result": True,
+                                   "createdAt": NOW})
+    db["proofResults"].insert_one({"_id": _oid(10), "proofId": "new", "requestId": "r1",
+                                   "userId": "u3", "result": False, "createdAt": NOW})
+    engine.refresh()
+    engine.refresh()
+    row = _rows(engine)["r1"]
+    assert row["stats"] == {"totalProofs": 3, "successfulProofs": 2}
+    assert row["uniqueUserCount"] == 2
+
+
+def test_requests_added_after_the_export_are_merged(db, tmp_path):
+    _, engine = _engine(db, tmp_path)
+    db["requests"].insert_one({"_id": _oid(5), "requestId": "r9", "providerName": "Institution A",
+                               "useCase": "blood_donation", "createdAt": NOW})
+    db["proofResults"].insert_one({"_id": _oid(4), "proofId": "p9", "requestId": "r9",
+                                   "userId": "u1", "result": True, "createdAt": NOW})
+    engine.refresh()
+    engine.refresh()
+    assert _rows(engine, providerName="Institution A")["r9"]["stats"]["totalProofs"] == 1
+
+
+def test_request_ids_are_looked_up_in_the_mapped_sorted_index(db, tmp_path):
+    _, engine = _engine(db, tmp_path)
+    snap = engine._state[0]
+    assert isinstance(snap.req_id, snapshot.np.memmap)
+    assert snap.request_codes(["r2", "gone", "r0", None, "r1"]).tolist() == [2, -1, 0, -1, 1]
+    assert snap.request(2)["requestId"] == "r2"
+
+
+def test_delta_cursors_are_read_in_batches(db, tmp_path, monkeypatch):
+    _, engine = _engine(db, tmp_path)
+    monkeypatch.setattr(snapshot, "_DELTA_BATCH", 2)
+    db["requests"].insert_one({"_id": _oid(6), "requestId": "r9", "providerName": "Institution A",
+                               "useCase": "blood_donation", "createdAt": NOW})
+    for i in range(5):
+        db["proofResults"].insert_one({"_id": _oid(5 - i), "proofId": f"n{i}", "requestId": "r9",
+                                       "userId": f"u{i % 3}", "result": i % 2 == 0, "createdAt": NOW})
+    engine.refresh()
+    engine.refresh()
+    row = _rows(engine, providerName="Institution A")["r9"]
+    assert row["stats"] == {"totalProofs": 5, "successfulProofs": 3}
+    assert row["uniqueUserCount"] == 3
+
+
+def test_async_stats_scan_the_snapshot_in_a_thread(db, tmp_path, monkeypatch):
+    _, engine = _engine(db, tmp_path)
+    monkeypatch.setattr(settings, "STATS_SOURCE", "snapshot")
+    monkeypatch.setattr(va, "snapshot_engine", engine)
+    calls = []
+
+    async def fake_to_thread(fn, *args):
+        calls.append(fn)
+        return fn(*args)
+
+    monkeypatch.setattr(va.asyncio, "to_thread", fake_to_thread)
+    stats = asyncio.run(va.aget_provider_campaign_stats({"useCase": "blood_donation"}))
+    assert calls == [va._snapshot_stats]
+    assert stats["totalProofs"] == 5
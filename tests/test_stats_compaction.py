@@ -0,0 +1,88 @@
+# tests/test_stats_compaction.py
+
+import pytest
+
+from config import settings
+from models.serialization import dumps_str
+from services import stats_compaction
+from services.stats_compaction import compact_stats
+
+
+@pytest.fixture(autouse=True)
+def tokenizer(monkeypatch):
+    # The real encoding is downloaded on first use; ~4 characters per token.
+    monkeypatch.setattr(stats_compaction, "count_tokens", lambda text: len(text) // 4)
+
+
+def _stats(n: int) -> dict:
+    return {
+        "providerName": "City Hospital Blood Drive",
+        "totalProofs": sum(range(n)),
+        "requests": [
+            {"requestId": f"r{i}", "description": "x" * 500, "status": "open",
+             "attributeRequirements": {"requiredBloodGroup": 5},
+             "stats": {"totalProofs": i, "successfulProofs": i // 2}, "uniqueUserCount": i}
+            for i in range(n)
+        ],
+    }
+
+
+def test_summary_keeps_totals_and_largest_requests_first():
+    summary = compact_stats(_stats(5), token_budget=10_000)
+    assert summary["totalProofs"] == 10
+    assert summary["requestCount"] == 5
+    assert [r["requestId"] for r in summary["topRequests"]] == ["r4", "r3", "r2", "r1", "r0"]
+    row = summary["topRequests"][0]
+    assert len(row["description"]) == 80
+    assert "attributeRequirements" not in row and row["successRate"] == 0.5
+    assert summary["requestDistribution"]["totalProofs"]["max"] == 4
+
+
+@pytest.mark.parametrize("budget", [150, 300, 600])
+def test_top_requests_shrink_to_fit_the_budget(budget, monkeypatch):
+    monkeypatch.setattr(settings, "ANSWER_STATS_TOP_K", 50)
+    summary = compact_stats(_stats(200), token_budget=budget)
+    assert len(dumps_str(summary)) // 4 <= budget
+    assert summary["requestCount"] == 200
+    bigger = compact_stats(_stats(200), token_budget=budget * 2)
+    assert len(bigger["topRequests"]) >= len(summary["topRequests"])
+
+
+def test_stats_without_requests_pass_through():
+    assert compact_stats({"totalProofs": 0, "requests": []}) == {"totalProofs": 0}
+
+
+def _trend(buckets: int) -> dict:
+    starts = [f"2026-01-01T{i % 24:02d}:00:00" for i in range(buckets)]
+    series = {"totalProofs": [3] * buckets, "successfulProofs": [2] * buckets,
+              "total": 3 * buckets, "successful": 2 * buckets}
+    return {"granularity": "hour", "bucketStarts": starts, "current": series,
+            "previousBucketStarts": starts, "previous": dict(series),
+            "change": {"totalProofs": 0.0, "successfulProofs": 0.0}}
+
+
+@pytest.mark.parametrize("buckets", [64, 720])
+def test_large_trends_are_coarsened_to_fit_the_budget(buckets):
+    stats = dict(_stats(20), trend=_trend(buckets))
+    summary = compact_stats(stats, token_budget=600)
+    assert len(dumps_str(summary)) // 4 <= 600
+    assert summary["topRequests"]
+    trend = summary["trend"]
+    assert trend["current"]["total"] == 3 * buckets
+    if "bucketStarts" in trend:
+        assert sum(trend["current"]["totalProofs"]) == 3 * buckets
+        assert trend["bucketsPerPoint"] > 1
+
+
+def test_comparison_rows_with_most_proofs_are_kept():
+    columns = ["provider", "locality", "windowDays", "requests",
+               "totalProofs", "successfulProofs", "successRate"]
+    rows = [[f"Institution {i}", f"L{i}", 7, 1, i, i, 1.0] for i in range(300)]
+    stats = {"useCase": "blood_donation", "comparison": {"columns": columns, "rows": rows}}
+    summary = compact_stats(stats, token_budget=400)
+    assert len(dumps_str(summary)) // 4 <= 400
+    table = summary["comparison"]
+    assert table["rowCount"] == 300
+    kept = [row[4] for row in table["rows"]]
+    assert kept == sorted(kept) and kept[-1] == 299
+    assert compact_stats(stats, token_budget=100_000) == stats
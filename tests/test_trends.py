@@ -0,0 +1,72 @@
+# tests/test_trends.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import settings
+from services import trends
+
+INTENT = {"providerName": "City Hospital Blood Drive", "providerId": "0xCITY",
+          "useCase": "blood_donation", "timeWindowDays": 7}
+
+
+def test_trend_questions_are_detected():
+    assert trends.wants_trend("How did donations change day by day?")
+    assert not trends.wants_trend("How many donors in L1?")
+
+
+@pytest.mark.parametrize("window,unit", [(1, "hour"), (7, "day"), (120, "week"), (30, "week")])
+def test_previous_buckets_cover_the_previous_window(db, window, unit):
+    db.available = False
+    trend = asyncio.run(trends.aget_proof_trend(dict(INTENT, timeWindowDays=window), unit))
+    previous = [datetime.fromisoformat(b) for b in trend["previousBucketStarts"]]
+    current = [datetime.fromisoformat(b) for b in trend["bucketStarts"]]
+    step = trends._step(unit)
+    assert all(b - a == step for a, b in zip(previous, previous[1:]))
+    # Contiguous with the current window, which starts in the last previous bucket.
+    assert previous[-1] == current[0]
+    assert previous[0] == trends._truncate(datetime.utcnow() - timedelta(days=2 * window), unit)
+    if unit == "week":
+        assert all(b.weekday() == 0 for b in previous)
+
+
+@pytest.fixture
+def facets(db):
+    def handler(pipeline):
+        return [{"current": [], "previous": []}]
+    db["proofResults"].aggregate_handler = handler
+    db[trends.TIMESERIES_COLL].aggregate_handler = handler
+    db["requests"].insert_many([
+        {"requestId": "r1", "providerId": "0xCITY", "providerName": INTENT["providerName"],
+         "useCase": "blood_donation"},
+        {"requestId": "r2", "providerId": "0xCITY", "providerName": "City Hospital Staff Drive",
+         "useCase": "blood_donation"},
+    ])
+    return db
+
+
+def test_timeseries_and_raw_paths_filter_on_the_same_provider(facets, monkeypatch):
+    monkeypatch.setattr(settings, "TRENDS_TIMESERIES", True)
+    asyncio.run(trends.aget_proof_trend(INTENT))
+    ts_match = facets[trends.TIMESERIES_COLL].pipelines[0][0]["$match"]
+    assert ts_match["meta.providerName"] == INTENT["providerName"]
+    assert "meta.providerId" not in ts_match
+    assert ts_match["meta.useCase"] == "blood_donation"
+
+    monkeypatch.setattr(settings, "TRENDS_TIMESERIES", False)
+    asyncio.run(trends.aget_proof_trend(INTENT))
+    raw_match = facets["proofResults"].pipelines[0][0]["$match"]
+    assert raw_match["requestId"] == {"$in": ["r1"]}
+
+
+def test_mirror_documents_carry_the_provider_name():
+    proof = {"requestId": "r1", "createdAt": datetime(2025, 3, 1), "result": True, "userId": "u1",
+             "provider": "City (from proof)", "providerAddress": "0xCITY"}
+    [doc] = trends.timeseries_docs([proof], {"r1": {"providerName": "City",
+                                                    "useCase": "blood_donation"}})
+    # Trends filter on the canonical name only; the address is not mirrored.
+    assert doc["meta"] == {"requestId": "r1", "providerName": "City", "useCase": "blood_donation"}
+    [doc] = trends.timeseries_docs([proof], {})
+    assert doc["meta"]["providerName"] == "City (from proof)"
@@ -0,0 +1,109 @@
+# tests/test_user_sketches.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import settings
+from services import user_sketches as us
+from services import verification_analytics as va
+from services.hll import HyperLogLog, count_many, standard_error
+
+META = {"r1": {"providerName": "City", "useCase": "blood_donation"},
+        "r2": {"providerName": "City", "useCase": "blood_donation"}}
+
+
+def _proofs(request_id, users, day=None):
+    day = day or datetime.utcnow()
+    return [{"requestId": request_id, "userId": f"u{u}", "createdAt": day} for u in users]
+
+
+def _count(db, **key):
+    doc = db[us.SKETCHES].find_one({"_id": key})
+    return HyperLogLog.from_bytes(doc["registers"]).count()
+
+
+def test_vectorized_estimates_match_merged_sketches():
+    small, large = HyperLogLog(), HyperLogLog()
+    for i in range(50):
+        small.add(f"u{i}")
+    for i in range(20_000):
+        large.add(f"u{i}")
+    assert small.count() == 50  # linear counting range
+    assert abs(large.count() - 20_000) <= 3 * standard_error() * 20_000
+    assert count_many([small.to_bytes(), large.to_bytes(), bytes(4096)]) == [
+        small.count(), large.count(), 0]
+    merged = HyperLogLog.from_bytes(small.to_bytes()).merge(large)
+    assert merged.covers(small) and merged.covers(large) and not small.covers(large)
+    assert merged.count() == large.count()
+
+
+def test_batches_merge_into_request_provider_and_day_sketches(db):
+    asyncio.run(us.aupdate_sketches(_proofs("r1", range(100)), META))
+    asyncio.run(us.aupdate_sketches(_proofs("r1", range(50, 150)) + _proofs("r2", range(10)), META))
+    assert abs(_count(db, k="request", r="r1") - 150) <= 5
+    assert abs(_count(db, k="provider", p="City", c="blood_donation") - 150) <= 5
+    assert len(db[us.SKETCHES].docs) == 4  # two requests, one provider, one day
+
+
+def test_lost_write_races_are_retried(db):
+    coll = db[us.SKETCHES]
+    asyncio.run(us.aupdate_sketches(_proofs("r1", range(20)), META))
+    real_bulk_write = coll.bulk_write
+    calls = []
+
+    def lose_first_race(ops, **kwargs):
+        calls.append(len(ops))
+        if len(calls) == 1:
+            # Another writer bumps every version between our read and write.
+            coll.update_many({}, {"$inc": {"version": 1}})
+        return real_bulk_write(ops, **kwargs)
+
+    coll.bulk_write = lose_first_race
+    asyncio.run(us.aupdate_sketches(_proofs("r1", range(20, 60)), META))
+    assert calls == [3, 3]  # one bulk write per round, not one round trip per key
+    assert abs(_count(db, k="request", r="r1") - 60) <= 3
+
+
+def test_unique_users_all_time_come_from_provider_sketches(db):
+    old = datetime.utcnow() - timedelta(days=60)
+    asyncio.run(us.aupdate_sketches(_proofs("r1", range(30), old) + _proofs("r1", range(30, 40)), META))
+    window = asyncio.run(us.aestimate_unique_users("City", "blood_donation", 7))
+    all_time = asyncio.run(us.aestimate_unique_users("City", "blood_donation", None))
+    assert window["uniqueUsers"] == 10
+    assert all_time["uniqueUsers"] == 40
+
+
+def test_rebuild_keeps_the_index_and_bounds_held_sketches(db, monkeypatch):
+    db["requests"].insert_many([{"requestId": rid, **m} for rid, m in META.items()])
+    db["proofResults"].insert_many(_proofs("r1", range(30)) + _proofs("r2", range(20, 40)))
+    coll = db[us.SKETCHES]
+    coll.create_index([("_id.k", 1)])
+    coll.insert_one({"_id": {"k": "request", "r": "stale"}, "registers": bytes(4096), "version": 1})
+    held = []
+    merge = us.merge_sketches
+    monkeypatch.setattr(us, "merge_sketches", lambda sketches: (held.append(len(sketches)), merge(sketches)))
+
+    us.rebuild_sketches(max_keys=2)
+    assert coll.indexes
+    assert max(held) <= 2 + 2  # the limit, plus the keys of the proof that crossed it
+    assert coll.find_one({"_id": {"k": "request", "r": "stale"}}) is None
+    assert _count(db, k="request", r="r2") == 20
+    assert _count(db, k="provider", p="City", c="blood_donation") == 40
+
+
+@pytest.mark.parametrize("sort,from_sketches", [(None, True), ("uniqueUsers", False)])
+def test_stats_fill_unique_users_from_request_sketches(db, monkeypatch, sort, from_sketches):
+    monkeypatch.setattr(settings, "USER_SKETCHES", True)
+    monkeypatch.setattr(settings, "STATS_SOURCE", "raw")
+    asyncio.run(us.aupdate_sketches(_proofs("r1", range(25)), META))
+    db["requests"].aggregate_handler = lambda pipeline: [{
+        "requestId": "r1", "stats": {"totalProofs": 30, "successfulProofs": 25},
+        "uniqueUserCount": None if from_sketches else 24}]
+    stats = asyncio.run(va.aget_provider_campaign_stats({"providerName": "City"}, sort=sort))
+    group = db["requests"].pipelines[0][2]["$lookup"]["pipeline"][0]["$group"]
+    assert ("users" not in group) == from_sketches
+    assert stats["requests"][0]["uniqueUserCount"] == (25 if from_sketches else 24)
+    assert va.get_provider_campaign_stats({"providerName": "City"}, sort=sort)[
+        "requests"][0]["uniqueUserCount"] == (25 if from_sketches else 24)
@@ -0,0 +1,62 @@
+# tests/test_verification_analytics.py
+
+from datetime import datetime, timedelta
+
+from db import mongo
+from services import verification_analytics as va
+
+
+def _rows(*counts):
+    return [
+        {"requestId": f"r{i}", "providerName": "City Hospital Blood Drive",
+         "useCase": "blood_donation", "createdAt": datetime.utcnow(),
+         "stats": {"totalProofs": total, "successfulProofs": ok},
+         "uniqueUserCount": ok}
+        for i, (total, ok) in enumerate(counts)
+    ]
+
+
+def test_campaign_query_filters_provider_use_case_and_window():
+    before = datetime.utcnow()
+    query = va._campaign_query({"providerName": "City Hospital Blood Drive",
+                                "useCase": "blood_donation", "timeWindowDays": 3})
+    assert query["providerName"] == "City Hospital Blood Drive"
+    assert query["useCase"] == "blood_donation"
+    cutoff = query["createdAt"]["$gte"]
+    assert before - timedelta(days=3, seconds=5) < cutoff <= datetime.utcnow() - timedelta(days=3)
+
+
+def test_campaign_pipeline_projects_and_joins_proof_counters():
+    stages = va._campaign_pipeline({"providerName": "P"})
+    assert list(stages[0]) == ["$match"]
+    assert stages[1] == {"$project": va.REQUEST_PROJECTION}
+    lookup = next(s["$lookup"] for s in stages if "$lookup" in s)
+    assert lookup["from"] == "proofResults"
+    assert lookup["foreignField"] == "requestId"
+    # detail keeps the full request documents
+    assert {"$project": va.REQUEST_PROJECTION} not in va._campaign_pipeline({}, detail=True)
+
+
+def test_stats_totals_come_from_server_side_aggregation(db):
+    db["requests"].aggregate_handler = lambda pipeline: _rows((10, 9), (5, 1))
+    stats = va.get_provider_campaign_stats({"providerName": "City Hospital Blood Drive"})
+    assert stats["totalProofs"] == 15
+    assert stats["successfulProofs"] == 10
+    assert stats["successRate"] == 10 / 15
+    assert stats["requestCount"] == 2
+    assert db["requests"].pipelines[0][0]["$match"]["providerName"] == "City Hospital Blood Drive"
+
+
+def test_stats_fall_back_to_mock_without_database(db):
+    db.available = False
+    stats = va.get_provider_campaign_stats({"providerName": "Institution A"})
+    assert stats["providerName"] == "Institution A"
+    assert stats["requests"][0]["requestId"] == "demo-request-1"
+
+
+def test_ensure_indexes_creates_the_compound_indexes(db):
+    assert mongo.ensure_indexes()
+    assert (mongo.REQUIRED_INDEXES["requests"], {"unique": False}) in db["requests"].indexes
+    assert (mongo.REQUIRED_INDEXES["proofResults"], {"unique": False}) in db["proofResults"].indexes
+    assert ([("createdAt", 1)], {"unique": False}) in db["proofResults"].indexes
+    assert ([("proofId", 1)], {"unique": True}) in db["proofResults"].indexes
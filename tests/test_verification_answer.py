@@ -0,0 +1,80 @@
+# tests/test_verification_answer.py
+
+import asyncio
+
+import pytest
+
+from llm import verification_answer as va
+
+INTENT = {"providerName": "City Hospital Blood Drive", "useCase": "blood_donation",
+          "timeWindowDays": 7}
+
+
+def _stats(total=40, ok=30):
+    return {**INTENT, "targetCount": 50, "requests": [], "requestCount": 1,
+            "totalProofs": total, "successfulProofs": ok, "successRate": ok / total}
+
+
+class FakeChain:
+    def __init__(self, chunks=("On track ", "for the target.")):
+        self.chunks = list(chunks)
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return "".join(self.chunks)
+
+    async def astream(self, inputs):
+        self.calls += 1
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    fake = FakeChain()
+    monkeypatch.setattr(va, "answer_chain", fake)
+    va.answer_cache.clear()
+    yield fake
+    va.answer_cache.clear()
+
+
+def test_same_question_and_stats_hit_the_cache(chain):
+    first = asyncio.run(va.abuild_verification_answer("How is City Hospital doing?", INTENT, _stats()))
+    second = asyncio.run(va.abuild_verification_answer("how is city hospital doing", INTENT, _stats()))
+    assert first == second == "On track for the target."
+    assert chain.calls == 1
+
+
+def test_new_stats_change_the_fingerprint(chain):
+    asyncio.run(va.abuild_verification_answer("How is City Hospital doing?", INTENT, _stats()))
+    asyncio.run(va.abuild_verification_answer("How is City Hospital doing?", INTENT, _stats(41, 31)))
+    assert chain.calls == 2
+
+
+def test_invalidating_a_provider_drops_its_answers(chain):
+    asyncio.run(va.abuild_verification_answer("How is City Hospital doing?", INTENT, _stats()))
+    assert va.invalidate_provider_answers("City Hospital Blood Drive") == 1
+    asyncio.run(va.abuild_verification_answer("How is City Hospital doing?", INTENT, _stats()))
+    assert chain.calls == 2
+
+
+def test_stream_falls_back_to_the_stats_on_a_server_error(chain, monkeypatch):
+    class ServerError(Exception):
+        status_code = 503
+
+    async def failing(inputs):
+        raise ServerError("upstream overloaded")
+        yield
+
+    monkeypatch.setattr(chain, "astream", failing)
+
+    async def collect():
+        return [c async for c in va.astream_verification_answer("How is City Hospital doing?",
+                                                                 INTENT, _stats())]
+
+    chunks = asyncio.run(collect())
+    assert chunks == [va.stats_only_answer(INTENT, _stats())]
+    assert "30 successful donor verifications" in chunks[0]
@@ -0,0 +1,51 @@
+# tests/test_verification_intent.py
+
+import asyncio
+
+import pytest
+
+from llm import verification_intent as vi
+
+LLM_JSON = '{"providerName": "City Hospital Blood Drive", "useCase": "blood_donation", ' \
+           '"timeWindowDays": 7, "targetCount": null, "locality": null, "bloodType": null}'
+
+
+class FakeChain:
+    def __init__(self, reply=LLM_JSON):
+        self.reply = reply
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.reply
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    fake = FakeChain()
+    monkeypatch.setattr(vi, "intent_chain", fake)
+    monkeypatch.setattr(vi, "_rules_intent", lambda question: None)
+    vi.intent_cache.clear()
+    yield fake
+    vi.intent_cache.clear()
+
+
+def test_cosmetic_variants_share_one_llm_call(chain):
+    first = asyncio.run(vi.aextract_verification_intent("How is City Hospital doing?"))
+    second = asyncio.run(vi.aextract_verification_intent("  how is city hospital doing  "))
+    assert chain.calls == 1
+    assert first == second
+    assert first["providerName"] == "City Hospital Blood Drive"
+
+
+def test_cached_intents_are_copies(chain):
+    intent = asyncio.run(vi.aextract_verification_intent("How is City Hospital doing?"))
+    intent["providerName"] = "changed"
+    again = asyncio.run(vi.aextract_verification_intent("How is City Hospital doing?"))
+    assert again["providerName"] != "changed"
+
+
+def test_invalid_llm_output_yields_empty_intent():
+    intent = vi._parse_intent("not json")
+    assert intent["providerName"] is None and intent["useCase"] is None